@@ -0,0 +1,76 @@
+"""
+Compare the aiohttp and HTTP/2 transports on the same multi-target scan.
+
+Each transport checks the same usernames against the same sites on a fresh session, with
+the result cache off and an empty DNS cache, so every run pays its own connection setup and
+lookups instead of replaying the one before. Run it with the package installed, HTTP/2 needs
+httpx[http2] too.
+
+    python benchmarks/transport_benchmark.py --targets 20 --filter "cat=social"
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from rich.console import Console
+
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.core.scan import USERNAME, ScanEngine, ScanTarget
+from onfire_blackbird.modules.core.username import load_username_sites
+from onfire_blackbird.modules.utils.session import close_session
+from onfire_blackbird.modules.utils.transport import TRANSPORTS
+from onfire_blackbird.modules.utils.user_agent import get_random_user_agent
+
+
+async def measure(transport: str, usernames: list, cache_dir: str) -> dict:
+    config.transport = transport
+    config.concurrency_limiter = None
+    config.retry_policy = None
+    # The sites are loaded already, a directory of its own gives each transport a cold DNS cache
+    config.base_dir = Path(cache_dir)
+    targets = [ScanTarget(USERNAME, username, config.username_sites) for username in usernames]
+    start = time.perf_counter()
+    try:
+        await ScanEngine(config, announce=False).run(targets)
+    finally:
+        await close_session()
+    elapsed = time.perf_counter() - start
+    results = [result for target in targets for result in target.results]
+    return {
+        "transport": transport,
+        "elapsed": elapsed,
+        "requests": len(results),
+        "errors": sum(1 for result in results if result["status"] == "ERROR"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", type=int, default=10, help="Usernames checked per transport. Default is 10.")
+    parser.add_argument("--filter", help='Sites to check, e.g. "cat=social". Default is every site.')
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    args = parser.parse_args()
+
+    config.console = Console(quiet=True)
+    config.user_agent = get_random_user_agent(config)
+    config.filter = args.filter
+    config.site_history = False
+    config.use_cache = False
+    config.rescan = False
+    load_username_sites(config)
+    usernames = [f"blackbird-benchmark-{index}" for index in range(args.targets)]
+
+    for transport in args.transports:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            result = asyncio.run(measure(transport, usernames, cache_dir))
+        print(
+            f"{result['transport']:>8}: {result['elapsed']:.1f}s, {result['requests']} requests "
+            f"({result['requests'] / result['elapsed']:.1f} req/s), {result['errors']} errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
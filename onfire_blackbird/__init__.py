@@ -1,5 +1,5 @@
 from onfire_blackbird.modules.core.email import verify_email
 from onfire_blackbird.modules.core.username import verify_username
-from onfire_blackbird.run import run
+from onfire_blackbird.run import ScanOptions, run, scan
 
-__all__ = ["verify_username", "verify_email", "run"]
+__all__ = ["verify_username", "verify_email", "run", "scan", "ScanOptions"]
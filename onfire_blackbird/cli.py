@@ -1,23 +1,38 @@
 import argparse
-import logging
 import os
 import sys
 from datetime import datetime
-from pathlib import Path
 
 from dotenv import load_dotenv
-from rich.console import Console
 
-from onfire_blackbird.config import BASE_DIR, LOG_DIRECTORY, config
-from onfire_blackbird.modules.core.email import verify_email
-from onfire_blackbird.modules.core.username import verify_username
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.core.email import load_email_sites
+from onfire_blackbird.modules.core.scan import EMAIL, USERNAME, ScanTarget, create_engine, print_run_summary
+from onfire_blackbird.modules.core.username import load_username_sites
 from onfire_blackbird.modules.export.csv import save_to_csv
 from onfire_blackbird.modules.export.file_operations import create_save_directory
+from onfire_blackbird.modules.export.ndjson_output import stream_ndjson
 from onfire_blackbird.modules.export.pdf import save_to_pdf
 from onfire_blackbird.modules.ner.entity_extraction import inialize_nlp_model
 from onfire_blackbird.modules.utils.console import print_if_not_json
 from onfire_blackbird.modules.utils.file_operations import get_lines_from_file, is_file
+from onfire_blackbird.modules.utils.log import setup_logging
+from onfire_blackbird.modules.utils.output import create_console
 from onfire_blackbird.modules.utils.permute import Permute
+from onfire_blackbird.modules.utils.profile import (
+    ASYNCIO_LOOP,
+    AUTO_LOOP,
+    BALANCED,
+    PROFILE_SETTINGS,
+    PROFILES,
+    UVLOOP,
+    apply_profile,
+    clamp_to_file_descriptors,
+    install_event_loop,
+)
+from onfire_blackbird.modules.utils.proxy_pool import PROXY_STRATEGIES, ROUND_ROBIN
+from onfire_blackbird.modules.utils.session import run_sync
+from onfire_blackbird.modules.utils.transport import AIOHTTP, TRANSPORTS
 from onfire_blackbird.modules.utils.user_agent import get_random_user_agent
 from onfire_blackbird.modules.whatsmyname.list_operations import check_updates
 
@@ -25,13 +40,7 @@ load_dotenv()
 
 
 def initialize():
-    log_dir = Path(BASE_DIR) / LOG_DIRECTORY
-    if not log_dir.exists():
-        log_dir.mkdir(parents=True, exist_ok=True)
-
-    logging.basicConfig(
-        filename=config.log_path, level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    setup_logging(config)
 
     parser = argparse.ArgumentParser(
         prog="blackbird", description="An OSINT tool to search for accounts by username in social networks."
@@ -51,9 +60,24 @@ def initialize():
     parser.add_argument(
         "--json", default=False, action=argparse.BooleanOptionalAction, help="Output results as JSON to stdout."
     )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Stream results to stdout as JSON lines as they complete: found accounts (every site with --verbose) "
+        "and a line per completed target. Implies --silent.",
+    )
     parser.add_argument(
         "-v", "--verbose", default=False, action=argparse.BooleanOptionalAction, help="Show verbose output."
     )
+    parser.add_argument(
+        "--silent", action="store_true", help="Print nothing, the console is never initialized. Exports still run."
+    )
+    parser.add_argument(
+        "--progress",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Show a live line of checked, found and failed sites while scanning.",
+    )
     parser.add_argument(
         "-ai", "--ai", default=False, action=argparse.BooleanOptionalAction, help="Extract Metadata with AI."
     )
@@ -61,6 +85,37 @@ def initialize():
     parser.add_argument("--no-nsfw", action="store_true", help="Removes NSFW sites from the search.")
     parser.add_argument("--dump", action="store_true", help="Dump HTML content for found accounts.")
     parser.add_argument("--proxy", help="Proxy to send HTTP requests though.")
+    parser.add_argument(
+        "--proxy-file", help="File with one proxy per line, requests are spread over all of them and --proxy."
+    )
+    parser.add_argument(
+        "--proxy-strategy",
+        choices=PROXY_STRATEGIES,
+        default=ROUND_ROBIN,
+        help="How a proxy of --proxy-file is picked for each request. Default is round-robin.",
+    )
+    parser.add_argument(
+        "--proxy-concurrency",
+        type=int,
+        default=16,
+        help="Maximum number of requests in flight through each proxy of --proxy-file. Default is 16.",
+    )
+    parser.add_argument(
+        "--proxy-sticky", action="store_true", help="Send every request to a host through the same proxy."
+    )
+    parser.add_argument(
+        "--proxy-eject-after",
+        type=int,
+        default=3,
+        help="Consecutive failures before a proxy is taken out of rotation. Default is 3.",
+    )
+    parser.add_argument(
+        "--proxy-eject-seconds",
+        type=float,
+        default=30.0,
+        help="Seconds a failing proxy stays out of rotation before it is probed again, "
+        "doubling each time it fails again. Default is 30.",
+    )
     parser.add_argument(
         "--timeout", type=int, default=30, help="Timeout in seconds for each HTTP request (Default is 30)."
     )
@@ -70,9 +125,197 @@ def initialize():
         default=30,
         help="Specify the maximum number of concurrent requests allowed. Default is 30.",
     )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        default=BALANCED,
+        help="Preset of event loop, concurrency, connection, timeout and retry settings, flags passed explicitly "
+        "take precedence. Default is balanced.",
+    )
+    parser.add_argument(
+        "--event-loop",
+        choices=(AUTO_LOOP, ASYNCIO_LOOP, UVLOOP),
+        default=AUTO_LOOP,
+        help="Event loop implementation, auto uses uvloop when it is installed. Default is auto.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes the scan is spread over, each with its own concurrency limits. Default is 1.",
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Tune the number of concurrent requests to latency and errors, starting from --max-concurrent-requests.",
+    )
+    parser.add_argument(
+        "--concurrency-floor",
+        type=int,
+        default=4,
+        help="Lowest number of concurrent requests adaptive concurrency may back off to. Default is 4.",
+    )
+    parser.add_argument(
+        "--pre-check-ttl",
+        type=int,
+        default=600,
+        help="Seconds a cookie or token acquired by a site pre-check is reused across emails. Default is 600.",
+    )
+    parser.add_argument(
+        "--site-history",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Keep per-site latency and error history to set per-site timeouts and send slow sites first.",
+    )
+    parser.add_argument(
+        "--timeout-multiplier",
+        type=float,
+        default=4.0,
+        help="Per-site connect/read timeout as a multiple of the site's p99 latency, capped at --timeout. Default is 4.",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Retries of a GET request after a timeout, connection error or overload status. Default is 2.",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=0.5,
+        help="Base delay in seconds between retries, doubled and jittered on every retry. Default is 0.5.",
+    )
+    parser.add_argument(
+        "--retry-budget",
+        type=float,
+        default=0.1,
+        help="Retries and hedges allowed per run, as a fraction of the requests sent. Default is 0.1.",
+    )
+    parser.add_argument(
+        "--hedge",
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Send a duplicate of GET requests that run past the site's usual latency and keep the first answer.",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=95.0,
+        help="Latency percentile after which a request is hedged. Default is 95.",
+    )
+    parser.add_argument(
+        "--concurrency-ceiling",
+        type=int,
+        default=100,
+        help="Highest number of concurrent requests adaptive concurrency may grow to. Default is 100.",
+    )
+    parser.add_argument(
+        "--max-requests-per-host",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent requests sent to the same host. Default is 4.",
+    )
+    parser.add_argument(
+        "--host-rate-limit",
+        type=float,
+        default=5.0,
+        help="Maximum requests per second sent to the same host, 0 for no limit. Default is 5.",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=AIOHTTP,
+        help="HTTP client used for site checks, http2 multiplexes requests per host and needs httpx[http2]. Default is aiohttp.",
+    )
+    parser.add_argument(
+        "--connection-limit",
+        type=int,
+        default=100,
+        help="Maximum number of pooled connections shared by all targets. Default is 100.",
+    )
+    parser.add_argument(
+        "--connection-limit-per-host",
+        type=int,
+        default=8,
+        help="Maximum number of pooled connections per host. Default is 8.",
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=int,
+        default=30,
+        help="Seconds an idle connection is kept open for reuse. Default is 30.",
+    )
+    parser.add_argument("--dns-cache-ttl", type=int, default=300, help="Seconds to cache DNS answers. Default is 300.")
+    parser.add_argument(
+        "--dns-negative-ttl",
+        type=int,
+        default=30,
+        help="Seconds a domain that doesn't exist is remembered during the run, its checks fail at once. Default is 30.",
+    )
+    parser.add_argument(
+        "--dns-prefetch",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Resolve every host of a target concurrently as soon as it is queued.",
+    )
+    parser.add_argument(
+        "--streaming",
+        default=True,
+        action=argparse.BooleanOptionalAction,
+        help="Stream response bodies and stop reading once the result is known.",
+    )
+    parser.add_argument(
+        "--max-response-bytes",
+        type=int,
+        default=5 * 1024 * 1024,
+        help="Maximum number of body bytes read per response, 0 for no limit. Default is 5 MB.",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Don't reuse or store site check results.")
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=86400,
+        help="Seconds a found account is reused from the results cache. Default is 86400 (one day).",
+    )
+    parser.add_argument(
+        "--cache-not-found-ttl",
+        type=int,
+        default=21600,
+        help="Seconds a site where the account wasn't found is reused from the results cache. Default is 21600.",
+    )
+    parser.add_argument(
+        "--cache-error-ttl",
+        type=int,
+        default=300,
+        help="Seconds a failed site check is reused from the results cache, 0 to always retry. Default is 300.",
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="Only check sites whose definition changed, whose last result is too old or was an error, "
+        "and reuse the stored results of the others. Results are stored in cache/scan_history.sqlite3, "
+        "nothing is kept without this option.",
+    )
+    parser.add_argument(
+        "--rescan-max-age",
+        type=float,
+        default=168.0,
+        help="Hours a stored result is reused by --rescan. Default is 168 (one week).",
+    )
     parser.add_argument("--no-update", action="store_true", help="Don't update sites lists.")
+    parser.add_argument(
+        "--update-interval",
+        type=float,
+        default=24.0,
+        help="Hours between checks for a new sites list, 0 to check on every run. Default is 24.",
+    )
     parser.add_argument("--about", action="store_true", help="Show about information and exit.")
     args = parser.parse_args()
+    # Parse again with the profile settings unset, whatever gets a value was passed explicitly
+    unset = object()
+    probe = parser.parse_args(namespace=argparse.Namespace(**{name: unset for name in PROFILE_SETTINGS[BALANCED]}))
+    explicit = {name for name in PROFILE_SETTINGS[BALANCED] if getattr(probe, name) is not unset}
 
     # Update config with parsed arguments
     config.username = args.username
@@ -84,19 +327,61 @@ def initialize():
     config.csv = args.csv
     config.pdf = args.pdf
     config.json_output = args.json
+    config.ndjson_output = args.ndjson
     config.filter = args.filter
     config.no_nsfw = args.no_nsfw
     config.dump = args.dump
     config.proxy = args.proxy
+    config.proxy_file = args.proxy_file
+    config.proxy_strategy = args.proxy_strategy
+    config.proxy_concurrency = args.proxy_concurrency
+    config.proxy_sticky = args.proxy_sticky
+    config.proxy_eject_after = args.proxy_eject_after
+    config.proxy_eject_seconds = args.proxy_eject_seconds
     config.verbose = args.verbose
+    # Anything else written to stdout would break the stream of JSON lines
+    config.silent = args.silent or args.ndjson
+    config.progress = args.progress
     config.ai = args.ai
     config.timeout = args.timeout
     config.max_concurrent_requests = args.max_concurrent_requests
+    config.workers = args.workers
+    config.adaptive_concurrency = args.adaptive_concurrency
+    config.concurrency_floor = args.concurrency_floor
+    config.concurrency_ceiling = args.concurrency_ceiling
+    config.pre_check_ttl = args.pre_check_ttl
+    config.site_history = args.site_history
+    config.timeout_multiplier = args.timeout_multiplier
+    config.retries = args.retries
+    config.retry_backoff = args.retry_backoff
+    config.retry_budget = args.retry_budget
+    config.hedge = args.hedge
+    config.hedge_percentile = args.hedge_percentile
+    config.max_requests_per_host = args.max_requests_per_host
+    config.host_rate_limit = args.host_rate_limit
+    config.transport = args.transport
+    config.connection_limit = args.connection_limit
+    config.connection_limit_per_host = args.connection_limit_per_host
+    config.keepalive_timeout = args.keepalive_timeout
+    config.dns_cache_ttl = args.dns_cache_ttl
+    config.dns_negative_ttl = args.dns_negative_ttl
+    config.dns_prefetch = args.dns_prefetch
+    config.stream_responses = args.streaming
+    config.max_response_bytes = args.max_response_bytes
+    config.use_cache = not args.no_cache
+    config.cache_ttl = args.cache_ttl
+    config.cache_not_found_ttl = args.cache_not_found_ttl
+    config.cache_error_ttl = args.cache_error_ttl
+    config.rescan = args.rescan
+    config.rescan_max_age = args.rescan_max_age
     config.no_update = args.no_update
+    config.event_loop = args.event_loop
+    apply_profile(config, args.profile, explicit)
+    config.update_interval = args.update_interval
     config.about = args.about
     config.instagram_session_id = os.getenv("INSTAGRAM_SESSION_ID")
 
-    config.console = Console()
+    config.console = create_console(config)
 
     config.date_raw = datetime.now().strftime("%m_%d_%Y")
     config.date_pretty = datetime.now().strftime("%B %d, %Y")
@@ -110,6 +395,44 @@ def initialize():
     config.current_email = None
 
 
+def set_current_target(target):
+    if target.kind == USERNAME:
+        config.current_user = target.value
+    else:
+        config.current_email = target.value
+
+
+def clear_current_target():
+    config.current_user = None
+    config.current_email = None
+    config.username_found_accounts = None
+    config.email_found_accounts = None
+
+
+# Save the results of a target as soon as all of its sites were checked
+def export_target(target, engine):
+    found_accounts = target.found_accounts
+    set_current_target(target)
+    try:
+        if config.dump or config.csv or config.pdf or (config.ai and target.kind == USERNAME):
+            create_save_directory(config)
+        if config.csv and found_accounts:
+            save_to_csv(found_accounts, config)
+        if config.pdf and found_accounts:
+            save_to_pdf(found_accounts, target.kind, config)
+        if config.json_output and found_accounts:
+            from onfire_blackbird.modules.export.json_output import output_json
+
+            output_json(found_accounts, config)
+            # Stop after JSON output
+            engine.stop()
+    finally:
+        clear_current_target()
+    if config.ndjson_output:
+        # Streamed targets aren't read again, don't hold their results for the rest of the run
+        target.results = []
+
+
 def main():
     initialize()
 
@@ -180,23 +503,6 @@ def main():
                 print_if_not_json(
                     f":glasses: Successfully loaded {len(permuted_usernames)} usernames from permuting {elements}"
                 )
-        for user in config.username:
-            config.current_user = user
-            if config.dump or config.csv or config.pdf or config.ai:
-                create_save_directory(config)
-            found_accounts = verify_username(config.current_user, config)
-            if config.csv and found_accounts:
-                save_to_csv(found_accounts, config)
-            if config.pdf and found_accounts:
-                save_to_pdf(found_accounts, "username", config)
-            if config.json_output and found_accounts:
-                from onfire_blackbird.modules.export.json_output import output_json
-
-                output_json(found_accounts, config)
-                # Exit after JSON output
-                return
-            config.current_user = None
-            config.username_found_accounts = None
 
     if config.email_file:
         if is_file(config.email_file):
@@ -208,21 +514,37 @@ def main():
             print_if_not_json(f'❌ Could not read file "{config.email_file}"')
             sys.exit()
 
+    if config.proxy_file:
+        if is_file(config.proxy_file):
+            proxies = [line.strip() for line in get_lines_from_file(config.proxy_file) or [] if line.strip()]
+            if proxies:
+                config.proxies = ([config.proxy] if config.proxy else []) + proxies
+                print_if_not_json(f':glasses: Successfully loaded {len(proxies)} proxies from "{config.proxy_file}"')
+        else:
+            print_if_not_json(f'❌ Could not read file "{config.proxy_file}"')
+            sys.exit()
+
+    targets = []
+    if config.username:
+        load_username_sites(config)
+        targets.extend(ScanTarget(USERNAME, user, config.username_sites) for user in config.username)
     if config.email:
-        for email in config.email:
-            config.current_email = email
-            if config.dump or config.csv or config.pdf:
-                create_save_directory(config)
-            email_found_accounts = verify_email(email, config)
-            if config.csv and email_found_accounts:
-                save_to_csv(email_found_accounts, config)
-            if config.pdf and email_found_accounts:
-                save_to_pdf(email_found_accounts, "email", config)
-            if config.json_output and email_found_accounts:
-                from onfire_blackbird.modules.export.json_output import output_json
-
-                output_json(email_found_accounts, config)
-                # Exit after JSON output
-                return
-            config.current_email = None
-            config.email_found_accounts = None
+        load_email_sites(config)
+        targets.extend(ScanTarget(EMAIL, email, config.email_sites) for email in config.email)
+
+    # Dumps are written while the scan runs, so their directories must exist up front
+    if config.dump:
+        for target in targets:
+            set_current_target(target)
+            create_save_directory(config)
+            clear_current_target()
+
+    clamp_to_file_descriptors(config)
+    install_event_loop(config)
+    engine = create_engine(config, on_target_complete=lambda target: export_target(target, engine))
+    if config.ndjson_output:
+        run_sync(stream_ndjson(engine, targets, config))
+    else:
+        run_sync(engine.run(targets))
+
+    print_run_summary(config)
@@ -1,9 +1,7 @@
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
-import spacy
 from pydantic import BaseModel
-from rich.console import Console
 
 # Base directory for relative paths
 BASE_DIR = Path(__file__).parent.parent
@@ -12,10 +10,12 @@ BASE_DIR = Path(__file__).parent.parent
 LIST_DIRECTORY = "data"
 USERNAME_LIST_URL = "https://raw.githubusercontent.com/WebBreacher/WhatsMyName/main/wmn-data.json"
 USERNAME_LIST_FILENAME = "wmn-data.json"
+USERNAME_LIST_STATE_FILENAME = "wmn-data.state.json"
 USERNAME_METADATA_LIST_FILENAME = "wmn-metadata.json"
 EMAIL_LIST_FILENAME = "email-data.json"
 LOG_DIRECTORY = "logs"
 LOG_FILENAME = "blackbird.log"
+CACHE_DIRECTORY = "cache"
 ASSETS_DIRECTORY = "assets"
 FONTS_DIRECTORY = "fonts"
 IMAGES_DIRECTORY = "img"
@@ -36,20 +36,66 @@ class Config(BaseModel):
     csv: bool = False
     pdf: bool = False
     json_output: bool = False
+    ndjson_output: bool = False
     verbose: bool = False
+    silent: bool = False
+    progress: bool = True
     ai: bool = False
     filter: Optional[str] = None
     no_nsfw: bool = False
     dump: bool = False
     proxy: Optional[str] = None
+    proxy_file: Optional[str] = None
+    proxies: Optional[list[str]] = None
+    proxy_strategy: str = "round-robin"
+    proxy_concurrency: int = 16
+    proxy_sticky: bool = False
+    proxy_eject_after: int = 3
+    proxy_eject_seconds: float = 30.0
     timeout: int = 30
+    profile: str = "balanced"
+    event_loop: str = "auto"
     max_concurrent_requests: int = 30
+    workers: int = 1
+    adaptive_concurrency: bool = True
+    concurrency_floor: int = 4
+    concurrency_ceiling: int = 100
+    retries: int = 2
+    retry_backoff: float = 0.5
+    retry_budget: float = 0.1
+    hedge: bool = False
+    hedge_percentile: float = 95.0
+    site_history: bool = True
+    timeout_multiplier: float = 4.0
+    pre_check_ttl: int = 600
+    max_requests_per_host: int = 4
+    host_rate_limit: float = 5.0
+    host_burst: int = 5
+    connection_limit: int = 100
+    connection_limit_per_host: int = 8
+    keepalive_timeout: int = 30
+    dns_cache_ttl: int = 300
+    dns_negative_ttl: int = 30
+    dns_prefetch: bool = True
+    transport: str = "aiohttp"
+    use_cache: bool = True
+    stream_responses: bool = True
+    max_response_bytes: Optional[int] = 5 * 1024 * 1024
+    cache_ttl: int = 86400
+    cache_not_found_ttl: int = 21600
+    cache_error_ttl: int = 300
+    rescan: bool = False
+    rescan_max_age: float = 168.0
     no_update: bool = False
+    update_interval: float = 24.0
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backups: int = 5
     about: bool = False
 
     # Runtime values
     instagram_session_id: Optional[str] = None
-    console: Optional[Console] = None
+    console: Optional[Any] = None
+    output: Optional[Any] = None
     date_raw: Optional[str] = None
     date_pretty: Optional[str] = None
     user_agent: Optional[str] = None
@@ -58,17 +104,24 @@ class Config(BaseModel):
     current_user: Optional[str] = None
     current_email: Optional[str] = None
     ai_model: bool = False
-    nlp: Optional[spacy.Language] = None
+    nlp: Optional[Any] = None
+    concurrency_limiter: Optional[Any] = None
+    retry_policy: Optional[Any] = None
+    site_ledger: Optional[Any] = None
+    proxy_pool: Optional[Any] = None
     username_sites: Optional[list] = None
     email_sites: Optional[list] = None
     metadata_params: Optional[dict] = None
-    use_cache: bool = True
     base_dir: Path = BASE_DIR
 
     @property
     def username_list_path(self) -> Path:
         return self.base_dir / LIST_DIRECTORY / USERNAME_LIST_FILENAME
 
+    @property
+    def username_list_state_path(self) -> Path:
+        return self.base_dir / LIST_DIRECTORY / USERNAME_LIST_STATE_FILENAME
+
     @property
     def username_metadata_list_path(self) -> Path:
         return self.base_dir / LIST_DIRECTORY / USERNAME_METADATA_LIST_FILENAME
@@ -81,6 +134,10 @@ class Config(BaseModel):
     def log_path(self) -> Path:
         return self.base_dir / LOG_DIRECTORY / LOG_FILENAME
 
+    @property
+    def cache_path(self) -> Path:
+        return self.base_dir / CACHE_DIRECTORY
+
     @property
     def assets_path(self) -> Path:
         return self.base_dir / ASSETS_DIRECTORY
@@ -1,55 +1,70 @@
-import asyncio
 import time
 from pathlib import Path
 
-import aiohttp
-
 from onfire_blackbird.modules.export.dump import dump_content
 from onfire_blackbird.modules.utils.console import print_if_not_json
-from onfire_blackbird.modules.utils.filter import apply_filters, filter_found_accounts
+from onfire_blackbird.modules.utils.filter import filter_found_accounts
 from onfire_blackbird.modules.utils.http_client import do_async_request
+from onfire_blackbird.modules.utils.images import download_images
 from onfire_blackbird.modules.utils.input import process_input
+from onfire_blackbird.modules.utils.ledger import site_key
 from onfire_blackbird.modules.utils.log import log_error
+from onfire_blackbird.modules.utils.matcher import FOUND, INCONCLUSIVE, SiteMatcher
 from onfire_blackbird.modules.utils.parse import extract_metadata
 from onfire_blackbird.modules.utils.precheck import perform_pre_check
-from onfire_blackbird.modules.whatsmyname.list_operations import read_list
+from onfire_blackbird.modules.utils.session import run_sync
+from onfire_blackbird.modules.whatsmyname.registry import get_registry
 
 
 # Verify account existence based on list args
-async def check_site(site, method, url, session, semaphore, config, data=None, headers=None):
+async def check_site(site, method, url, session, semaphore, config, data=None, headers=None, email=None):
+    email = email or config.current_email
     return_data = {"name": site["name"], "url": url, "category": site["cat"], "status": "NONE", "metadata": None}
     async with semaphore:
         if site["pre_check"]:
-            authenticated_headers = perform_pre_check(site["pre_check"], headers, config)
-            headers = authenticated_headers
-            if headers is False:
+            headers = await perform_pre_check(site["pre_check"], headers, session, config)
+            if headers is None:
                 return_data["status"] = "ERROR"
                 return return_data
 
-        response = await do_async_request(method, url, session, config, data, headers)
+        matcher = SiteMatcher(site, strict_codes=True)
+        response = await do_async_request(
+            method,
+            url,
+            session,
+            config,
+            data,
+            headers,
+            matcher=matcher,
+            max_bytes=site.get("max_bytes"),
+            site_key=site_key("email", site["name"]),
+        )
         if response is None:
             return_data["status"] = "ERROR"
             return return_data
         try:
             if response:
-                if (site["e_string"] in response["content"]) and (site["e_code"] == response["status_code"]):
-                    if (site["m_string"] not in response["content"]) and (site["m_code"] != response["status_code"]):
-                        return_data["status"] = "FOUND"
-                        print_if_not_json(
-                            f"  ✔️  \[[cyan1]{site['name']}[/cyan1]] [bright_white]{response['url']}[/bright_white]"
-                        )
-                        if site["metadata"]:
-                            extracted_metadata = extract_metadata(site["metadata"], response, site["name"], config)
-                            if extracted_metadata is not None:
-                                extracted_metadata.sort(key=lambda x: x["name"])
-                                return_data["metadata"] = extracted_metadata
-                        # Save response content to a .HTML file
-                        if config.dump:
-                            path = Path(config.save_directory) / f"dump_{config.current_email}"
-
-                            result = dump_content(path, site, response, config)
-                            if result is True and config.verbose:
-                                print_if_not_json("      💾  Saved HTML data from found account")
+                if matcher.verdict == FOUND:
+                    return_data["status"] = "FOUND"
+                    print_if_not_json(
+                        f"  ✔️  \[[cyan1]{site['name']}[/cyan1]] [bright_white]{response['url']}[/bright_white]"
+                    )
+                    if site.metadata:
+                        extracted_metadata = extract_metadata(site.metadata, response, site["name"], config)
+                        if extracted_metadata is not None:
+                            extracted_metadata.sort(key=lambda x: x["name"])
+                            if config.pdf:
+                                await download_images(extracted_metadata, session, config)
+                            return_data["metadata"] = extracted_metadata
+                    # Save response content to a .HTML file
+                    if config.dump:
+                        path = Path(config.save_directory) / f"dump_{email}"
+
+                        result = dump_content(path, site, response, config)
+                        if result is True and config.verbose:
+                            print_if_not_json("      💾  Saved HTML data from found account")
+                elif matcher.verdict == INCONCLUSIVE:
+                    return_data["status"] = "ERROR"
                 else:
                     return_data["status"] = "NOT-FOUND"
                     if config.verbose:
@@ -58,55 +73,43 @@ async def check_site(site, method, url, session, semaphore, config, data=None, h
                         )
                 return return_data
         except Exception as e:
-            log_error(e, f"Coudn't check {site['name']} {url}", config)
+            log_error(e, f"Coudn't check {site['name']} {url}", config, site=site["name"], url=url)
             return return_data
 
 
+# Resolve the sites to search, compiled once through the site registry
+def load_email_sites(config):
+    config.email_sites = get_registry(config).filtered("email", config)
+
+
+# Build the URL, body and headers of a site request for the given email
+def build_request(site, email, config):
+    if site["input_operation"] is not None:
+        account = process_input(email, site["input_operation"], config)
+    else:
+        account = email
+    headers = site["headers"] if site["headers"] else None
+    return site.url_for(account), site.data_for(account), headers
+
+
 # Control survey on list sites
 async def fetch_results(email, config):
-    original_email = email
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        semaphore = asyncio.Semaphore(config.max_concurrent_requests)
-        for site in config.email_sites:
-            if site["input_operation"] is not None:
-                email = process_input(original_email, site["input_operation"], config)
-            else:
-                email = original_email
-            url = site["uri_check"].replace("{account}", email)
-            site_data = site["data"].replace("{account}", email) if site["data"] else None
-            headers = site["headers"] if site["headers"] else None
-            tasks.append(
-                check_site(
-                    site=site,
-                    method=site["method"],
-                    url=url,
-                    session=session,
-                    semaphore=semaphore,
-                    config=config,
-                    data=site_data,
-                    headers=headers,
-                )
-            )
-        tasks_results = await asyncio.gather(*tasks, return_exceptions=True)
-        results = {"results": tasks_results, "email": email}
+    from onfire_blackbird.modules.core.scan import EMAIL, ScanEngine, ScanTarget, scan_stream
+
+    target = ScanTarget(EMAIL, email, config.email_sites)
+    async for _ in scan_stream(ScanEngine(config, announce=False), [target]):
+        pass
+    results = {"results": target.results, "email": email}
     return results
 
 
 # Start email check and presents results to user
 def verify_email(email, config):
-    data = read_list("email", config)
-    if data and isinstance(data, dict):
-        sites_to_search = data["sites"]
-    else:
-        # Handle the case where data is False or not a dict
-        sites_to_search = []
-
-    config.email_sites = apply_filters(sites_to_search, config)
+    load_email_sites(config)
 
     print_if_not_json(f':play_button: Enumerating accounts with email "[cyan1]{email}[/cyan1]"')
     start_time = time.time()
-    results = asyncio.run(fetch_results(email, config))
+    results = run_sync(fetch_results(email, config))
     end_time = time.time()
 
     print_if_not_json(
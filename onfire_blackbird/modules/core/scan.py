@@ -0,0 +1,453 @@
+import asyncio
+import contextlib
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from onfire_blackbird.modules.core import email as email_check
+from onfire_blackbird.modules.core import username as username_check
+from onfire_blackbird.modules.utils.concurrency import AdaptiveLimiter
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.filter import filter_found_accounts
+from onfire_blackbird.modules.utils.http_client import transfer_stats
+from onfire_blackbird.modules.utils.images import download_images
+from onfire_blackbird.modules.utils.ledger import get_ledger, site_key
+from onfire_blackbird.modules.utils.log import log_error
+from onfire_blackbird.modules.utils.output import start_output, stop_output
+from onfire_blackbird.modules.utils.proxy_pool import uses_proxy
+from onfire_blackbird.modules.utils.resolver import get_resolver
+from onfire_blackbird.modules.utils.result_cache import get_result_cache, result_key
+from onfire_blackbird.modules.utils.retry import RetryPolicy
+from onfire_blackbird.modules.utils.scan_history import get_scan_history
+from onfire_blackbird.modules.utils.scheduler import HostScheduler
+from onfire_blackbird.modules.utils.session import get_session
+
+USERNAME = "username"
+EMAIL = "email"
+
+# Results a scan_stream() consumer may fall behind by before site checks wait for it
+SCAN_BUFFER = 256
+
+
+def error_result(site, url=None) -> dict:
+    return {"name": site["name"], "url": url, "category": site["cat"], "status": "ERROR", "metadata": None}
+
+
+class ScanTarget:
+    """
+    A username or email and the results of its site checks, kept in site order.
+
+    The results list is only allocated once the target starts, so queued targets cost
+    next to nothing however many there are.
+    """
+
+    __slots__ = ("kind", "value", "sites", "results", "pending", "start_time", "end_time")
+
+    def __init__(self, kind: str, value: str, sites: list):
+        self.kind = kind
+        self.value = value
+        self.sites = sites
+        self.results = []
+        self.pending = len(sites)
+        self.start_time = None
+        self.end_time = None
+
+    def start(self):
+        self.start_time = time.time()
+        self.results = [None] * len(self.sites)
+
+    @property
+    def found_accounts(self) -> list:
+        return list(filter(filter_found_accounts, self.results))
+
+    @property
+    def elapsed(self) -> float:
+        return (self.end_time or time.time()) - (self.start_time or time.time())
+
+
+class ScanResult(NamedTuple):
+    """The result of one site check, yielded by scan_stream() as soon as it completes."""
+
+    kind: str
+    target: str
+    site: str
+    status: str
+    metadata: Optional[list]
+    url: Optional[str]
+    category: Optional[str]
+
+    @classmethod
+    def of(cls, target: ScanTarget, result: dict) -> "ScanResult":
+        return cls(
+            target.kind,
+            target.value,
+            result["name"],
+            result["status"],
+            result["metadata"],
+            result["url"],
+            result["category"],
+        )
+
+
+class ScanEngine:
+    """
+    Checks many targets against their sites under one global concurrency budget.
+
+    A fixed pool of workers pulls (target, site) requests from a per-host scheduler, so as
+    soon as a target only has slow sites left the free workers move on to the next target
+    instead of waiting for its stragglers, while no host receives more than its share.
+    Targets are admitted lazily as the queue drains, and each one is reported through
+    ``on_target_complete`` the moment its last site finishes. With a ``results`` queue
+    every (target, site index, result) is put in it as it completes, a full queue holding
+    the scan back, and with ``completions`` a (target, None, None) follows each target's
+    last result.
+
+    Args:
+        config: The configuration object
+        on_target_complete: Called with each ScanTarget once all of its sites were checked
+        announce: Print a line when each target starts and completes
+        persist: Save the site statistics and DNS cache at the end, off in worker processes
+    """
+
+    def __init__(self, config, on_target_complete=None, announce=True, persist=True):
+        self.config = config
+        self.on_target_complete = on_target_complete
+        self.announce = announce
+        self.persist = persist
+        self._stopped = False
+        self._scheduler = None
+        self._orders = {}
+        self._resolver = None
+        self._cache = None
+        self._history = None
+        self._session = None
+        self._prefetches = set()
+        self.results = None
+        self.completions = False
+
+    def stop(self):
+        """Stop handing out work, site checks already in flight still finish."""
+        self._stopped = True
+        if self._scheduler is not None:
+            self._scheduler.close()
+
+    async def run(self, targets: list) -> list:
+        session = self._session = await get_session(self.config)
+        semaphore = self._concurrency_limit()
+        ledger = self.config.site_ledger = get_ledger(self.config) if self.config.site_history else None
+        if self.config.retry_policy is None:
+            self.config.retry_policy = RetryPolicy(
+                attempts=self.config.retries,
+                backoff=self.config.retry_backoff,
+                budget=self.config.retry_budget,
+                hedge=self.config.hedge,
+                hedge_percentile=self.config.hedge_percentile,
+                history=ledger,
+            )
+        # Behind a proxy names are resolved by the proxy, so local answers say nothing about a host
+        self._resolver = get_resolver(self.config) if not uses_proxy(self.config) else None
+        self._cache = get_result_cache(self.config) if self.config.use_cache else None
+        # Results are only kept on disk when --rescan asked for them
+        self._history = get_scan_history(self.config) if self.config.rescan else None
+        self._scheduler = HostScheduler(
+            rate=self.config.host_rate_limit,
+            burst=self.config.host_burst,
+            max_in_flight=self.config.max_requests_per_host,
+        )
+        # With an adaptive limit there is one worker per slot the limit may grow to
+        worker_count = (
+            semaphore.ceiling if isinstance(semaphore, AdaptiveLimiter) else self.config.max_concurrent_requests
+        )
+        output = start_output(self.config, total=sum(len(target.sites) for target in targets))
+        workers = [asyncio.create_task(self._worker(session, semaphore)) for _ in range(worker_count)]
+        try:
+            await self._feed(targets)
+            await asyncio.gather(*workers)
+        finally:
+            for task in (*workers, *self._prefetches):
+                task.cancel()
+            stop_output(self.config, output)
+            # Worker processes send theirs to the coordinator, which saves them once
+            if ledger is not None and self.persist:
+                ledger.save(self.config)
+            if self._resolver is not None and self.persist:
+                self._resolver.save(self.config)
+            if self._cache is not None:
+                self._cache.flush(self.config)
+            if self._history is not None:
+                self._history.flush(self.config)
+        return targets
+
+    def _concurrency_limit(self):
+        config = self.config
+        if not config.adaptive_concurrency:
+            config.concurrency_limiter = None
+            return asyncio.Semaphore(config.max_concurrent_requests)
+        # Keep what was learned about the network between runs of the same process
+        if config.concurrency_limiter is None:
+            config.concurrency_limiter = AdaptiveLimiter(
+                initial=config.max_concurrent_requests,
+                floor=config.concurrency_floor,
+                ceiling=config.concurrency_ceiling,
+            )
+        return config.concurrency_limiter
+
+    async def _feed(self, targets):
+        scheduler = self._scheduler
+        try:
+            for target in targets:
+                if self._stopped:
+                    return
+                # Admit the next target once less than a target's worth of work is queued
+                await scheduler.wait_for_demand(max(1, len(target.sites)))
+                self._start(target)
+                if not target.sites:
+                    await self._complete(target)
+                hosts = []
+                previous = (
+                    self._history.previous(target.kind, target.value, self.config) if self.config.rescan else None
+                )
+                for index in self._dispatch_order(target):
+                    site = target.sites[index]
+                    if previous is not None:
+                        stored = self._history.reusable(
+                            previous.get(site["name"]), site, self.config.rescan_max_age * 3600
+                        )
+                        if stored is not None:
+                            self._history.reused += 1
+                            await self._record(target, index, await self._replay(stored))
+                            continue
+                        self._history.rescanned += 1
+                    try:
+                        request = self._build_request(target, site)
+                    except Exception as e:
+                        log_error(
+                            e,
+                            f"Coudn't build request to {site['name']} for {target.value}",
+                            self.config,
+                            site=site["name"],
+                        )
+                        await self._record(target, index, error_result(site))
+                        continue
+                    key = self._cache_key(target, site, request)
+                    cached = await self._cached_result(key)
+                    if cached is not None:
+                        await self._record(target, index, cached)
+                        continue
+                    host = urlsplit(request[1]).hostname or ""
+                    hosts.append(host)
+                    scheduler.add(host, (target, index, site, request, key))
+                self._prefetch(hosts)
+        finally:
+            scheduler.close()
+
+    def _prefetch(self, hosts):
+        """Resolve the hosts of a target in the background, the first requests join the same lookups."""
+        if self._resolver is None or not self.config.dns_prefetch:
+            return
+        task = asyncio.ensure_future(self._resolver.prefetch(hosts))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    def _cache_key(self, target, site, request):
+        if self._cache is None:
+            return None
+        method, url, data, _ = request
+        # AI extraction adds metadata a plain check doesn't have
+        return result_key(target.kind, site["name"], method, url, data, variant="ai" if self.config.ai else "")
+
+    async def _cached_result(self, key):
+        """Return the cached result of a site check, or None."""
+        # Dumps need the response body, which isn't cached
+        if key is None or self.config.dump:
+            return None
+        result = await self._cache.fetch(key, self.config)
+        if result is None:
+            return None
+        return await self._replay(result)
+
+    async def _replay(self, result):
+        """Report a result that wasn't checked now as if it just was."""
+        if result["status"] == "FOUND":
+            print_if_not_json(f"  ✔️  \\[[cyan1]{result['name']}[/cyan1]] [bright_white]{result['url']}[/bright_white]")
+            if self.config.pdf and result["metadata"]:
+                await download_images(result["metadata"], self._session, self.config)
+        elif result["status"] == "NOT-FOUND" and self.config.verbose:
+            print_if_not_json(f"  ❌ [[blue]{result['name']}[/blue]] [bright_white]{result['url']}[/bright_white]")
+        return result
+
+    def _dispatch_order(self, target):
+        """Site indexes of a target, historically slowest site first so it doesn't finish last."""
+        ledger = self.config.site_ledger
+        if ledger is None:
+            return range(len(target.sites))
+        # Targets of a run share their site list, so the order is worked out once per list
+        cache_key = (target.kind, id(target.sites))
+        if cache_key not in self._orders:
+            keys = [site_key(target.kind, site["name"]) for site in target.sites]
+            self._orders[cache_key] = (target.sites, ledger.longest_first(keys))
+        return self._orders[cache_key][1]
+
+    async def _worker(self, session, semaphore):
+        host = None
+        while not self._stopped:
+            picked = await self._scheduler.next(prefer=host)
+            if picked is None:
+                return
+            host, (target, index, site, request, key) = picked
+            try:
+                if self._stopped:
+                    return
+                if self._resolver is not None and self._resolver.is_missing(host):
+                    # The domain doesn't exist, no need to spend a request slot finding out
+                    result = error_result(site, request[1])
+                else:
+                    result = await self._check(target, site, request, session, semaphore)
+            finally:
+                self._scheduler.done(host)
+            if key is not None:
+                self._cache.put(key, result, self.config)
+            if self._history is not None:
+                self._history.record(target.kind, target.value, site, result, self.config)
+            await self._record(target, index, result)
+
+    async def _record(self, target, index, result):
+        if self.config.output is not None:
+            self.config.output.advance(result["status"])
+        target.results[index] = result
+        target.pending -= 1
+        if self.results is not None:
+            # Waits while the consumer is behind, so this worker takes no new request meanwhile
+            await self.results.put((target, index, result))
+        if target.pending == 0:
+            await self._complete(target)
+
+    def _build_request(self, target, site):
+        if target.kind == USERNAME:
+            return "GET", site.url_for(target.value), None, None
+        url, data, headers = email_check.build_request(site, target.value, self.config)
+        return site["method"], url, data, headers
+
+    async def _check(self, target, site, request, session, semaphore):
+        method, url, data, headers = request
+        try:
+            if target.kind == USERNAME:
+                return await username_check.check_site(
+                    site=site,
+                    method=method,
+                    url=url,
+                    session=session,
+                    semaphore=semaphore,
+                    config=self.config,
+                    username=target.value,
+                )
+            return await email_check.check_site(
+                site=site,
+                method=method,
+                url=url,
+                session=session,
+                semaphore=semaphore,
+                config=self.config,
+                data=data,
+                headers=headers,
+                email=target.value,
+            )
+        except Exception as e:
+            log_error(e, f"Coudn't check {site['name']} for {target.value}", self.config, site=site["name"])
+            return error_result(site, url)
+
+    def _start(self, target):
+        target.start()
+        if self.announce:
+            print_if_not_json(f':play_button: Enumerating accounts with {target.kind} "[cyan1]{target.value}[/cyan1]"')
+
+    async def _complete(self, target):
+        target.end_time = time.time()
+        if self.announce:
+            found_accounts = target.found_accounts
+            print_if_not_json(
+                f':chequered_flag: Check of "[cyan1]{target.value}[/cyan1]" completed in {round(target.elapsed, 1)} '
+                f"seconds ({len(target.sites)} sites, {len(found_accounts)} found)"
+            )
+            if len(found_accounts) <= 0:
+                print_if_not_json(f"⭕ No accounts were found for the given {target.kind}")
+        if self.on_target_complete is not None:
+            self.on_target_complete(target)
+        if self.results is not None and self.completions:
+            await self.results.put((target, None, None))
+
+
+# Return the engine of a scan, spread over worker processes with --workers
+def create_engine(config, on_target_complete=None, announce=True) -> ScanEngine:
+    if config.workers > 1:
+        from onfire_blackbird.modules.core.workers import ParallelScanEngine
+
+        return ParallelScanEngine(config, config.workers, on_target_complete, announce)
+    return ScanEngine(config, on_target_complete, announce)
+
+
+async def stream_results(engine: ScanEngine, targets: list, buffer: int = SCAN_BUFFER, completions: bool = False):
+    """
+    Check every target on the engine, yielding (target, site index, result) as each site check completes.
+
+    Results come in completion order, so found accounts show up while slow sites are still
+    being checked. At most ``buffer`` results are held for a consumer that falls behind,
+    then the scan waits for it. Closing the generator early cancels the rest of the scan.
+    With ``completions`` a (target, None, None) is yielded once all of a target's sites
+    were checked, also for targets without sites.
+    """
+    results = engine.results = asyncio.Queue(max(1, buffer))
+    engine.completions = completions
+
+    async def produce():
+        try:
+            await engine.run(targets)
+        except Exception as e:
+            await results.put(e)
+        else:
+            await results.put(None)
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not task.done():
+            engine.stop()
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+# Check every target on the engine, yielding a ScanResult as each site check completes
+async def scan_stream(engine: ScanEngine, targets: list, buffer: int = SCAN_BUFFER):
+    async with contextlib.aclosing(stream_results(engine, targets, buffer)) as results:
+        async for target, _, result in results:
+            yield ScanResult.of(target, result)
+
+
+# Check every target against its sites, interleaving them under one concurrency budget
+async def scan_targets(targets: list, config, on_target_complete=None) -> list:
+    async for _ in scan_stream(create_engine(config, on_target_complete), targets):
+        pass
+    return targets
+
+
+# Print the transfer, concurrency and retry figures of a finished run
+def print_run_summary(config):
+    print_if_not_json(f":package: {transfer_stats.summary()}")
+    if config.concurrency_limiter is not None:
+        print_if_not_json(f":control_knobs:  {config.concurrency_limiter.summary()}")
+    if config.retry_policy is not None:
+        print_if_not_json(f":repeat: {config.retry_policy.summary()}")
+    if config.use_cache:
+        print_if_not_json(f":card_file_box:  {get_result_cache(config).summary()}")
+    if config.proxy_pool is not None:
+        print_if_not_json(f":shuffle_tracks_button: {config.proxy_pool.summary()}")
+    if config.rescan:
+        print_if_not_json(f":recycling_symbol:  {get_scan_history(config).summary()}")
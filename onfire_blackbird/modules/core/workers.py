@@ -0,0 +1,277 @@
+import asyncio
+import logging.handlers
+import math
+import multiprocessing
+import queue
+import time
+
+from onfire_blackbird.config import config as process_config
+from onfire_blackbird.modules.core.scan import EMAIL, USERNAME, ScanEngine, ScanTarget, error_result, stream_results
+from onfire_blackbird.modules.utils.http_client import transfer_stats
+from onfire_blackbird.modules.utils.ledger import get_ledger
+from onfire_blackbird.modules.utils.log import forward_logging, log_error, log_handlers
+from onfire_blackbird.modules.utils.output import create_console, start_output, stop_output
+from onfire_blackbird.modules.utils.profile import install_event_loop
+from onfire_blackbird.modules.utils.proxy_pool import uses_proxy
+from onfire_blackbird.modules.utils.resolver import get_resolver
+from onfire_blackbird.modules.utils.result_cache import get_result_cache
+from onfire_blackbird.modules.utils.scan_history import get_scan_history
+from onfire_blackbird.modules.utils.session import close_session, run_sync
+
+# Messages sent by worker processes to the coordinator
+SITES_DONE = "sites"
+WORKER_DONE = "done"
+WORKER_FAILED = "failed"
+
+# Seconds the coordinator waits for a message before checking that workers are still alive
+POLL_INTERVAL = 0.5
+
+# Site results a worker sends at once, found accounts and completed units go out right away
+RESULT_BATCH = 64
+
+# Runtime values rebuilt by each worker rather than copied from the coordinator
+WORKER_LOCAL_FIELDS = frozenset(
+    (
+        "console",
+        "nlp",
+        "ai_model",
+        "concurrency_limiter",
+        "retry_policy",
+        "site_ledger",
+        "proxy_pool",
+        "username_sites",
+        "email_sites",
+        "metadata_params",
+        "username_found_accounts",
+        "email_found_accounts",
+    )
+)
+
+
+def worker_settings(config) -> dict:
+    return {name: getattr(config, name) for name in type(config).model_fields if name not in WORKER_LOCAL_FIELDS}
+
+
+def plan_units(targets: list, workers: int) -> list:
+    """
+    Split the work into (target index, first site, last site) units.
+
+    With at least as many targets as workers every target is one unit, otherwise the
+    sites of each target are split so every worker gets a share of them.
+    """
+    if len(targets) >= workers:
+        return [(index, 0, len(target.sites)) for index, target in enumerate(targets)]
+    units = []
+    for index, target in enumerate(targets):
+        size = max(1, math.ceil(len(target.sites) / workers))
+        units.extend(
+            (index, start, min(start + size, len(target.sites))) for start in range(0, len(target.sites), size)
+        )
+        if not target.sites:
+            units.append((index, 0, 0))
+    return units
+
+
+def _worker_stats(config) -> dict:
+    stats = {
+        "transfer": {name: getattr(transfer_stats, name) for name in type(transfer_stats).__slots__},
+        "cache": None,
+        "history": None,
+        "ledger": get_ledger(config).changes() if config.site_history else None,
+        "dns": get_resolver(config).answers() if not uses_proxy(config) else None,
+    }
+    if config.use_cache:
+        cache = get_result_cache(config)
+        stats["cache"] = {"hits": cache.hits, "disk_hits": cache.disk_hits, "misses": cache.misses}
+    if config.rescan:
+        history = get_scan_history(config)
+        stats["history"] = {"reused": history.reused, "rescanned": history.rescanned}
+    return stats
+
+
+# Entry point of a worker process: check the units of its shard and stream their site results back in batches
+def run_worker(worker_index: int, settings: dict, shard: list, results, log_records=None):
+    from onfire_blackbird.modules.core.email import load_email_sites
+    from onfire_blackbird.modules.core.username import load_username_sites
+    from onfire_blackbird.modules.ner.entity_extraction import inialize_nlp_model
+
+    config = process_config
+    if log_records is not None:
+        forward_logging(log_records)
+    try:
+        for name, value in settings.items():
+            setattr(config, name, value)
+        # The coordinator shows the progress of the whole scan
+        config.console = create_console(config)
+        config.progress = False
+        install_event_loop(config)
+        if config.ai:
+            inialize_nlp_model(config)
+            config.ai_model = True
+
+        kinds = {kind for _, kind, _, _, _ in shard}
+        if USERNAME in kinds:
+            load_username_sites(config)
+        if EMAIL in kinds:
+            load_email_sites(config)
+
+        units = {}
+        targets = []
+        for unit_id, kind, value, start, stop in shard:
+            sites = config.username_sites if kind == USERNAME else config.email_sites
+            # Whole targets share the site list, so its dispatch order is worked out once
+            target = ScanTarget(kind, value, sites if (start, stop) == (0, len(sites)) else sites[start:stop])
+            units[id(target)] = unit_id
+            targets.append(target)
+
+        batch = []
+        flushed = time.monotonic()
+
+        def flush():
+            nonlocal flushed
+            if batch:
+                results.put((SITES_DONE, worker_index, batch.copy()))
+                batch.clear()
+            flushed = time.monotonic()
+
+        async def stream():
+            received = {}
+            engine = ScanEngine(config, announce=False, persist=False)
+            async for target, offset, result in stream_results(engine, targets):
+                batch.append((units[id(target)], offset, result))
+                received[id(target)] = received.get(id(target), 0) + 1
+                if (
+                    result["status"] == "FOUND"
+                    or received[id(target)] == len(target.sites)
+                    or len(batch) >= RESULT_BATCH
+                    or time.monotonic() - flushed >= POLL_INTERVAL
+                ):
+                    flush()
+            flush()
+
+        try:
+            run_sync(stream())
+        finally:
+            run_sync(close_session())
+        results.put((WORKER_DONE, worker_index, _worker_stats(config)))
+    except BaseException as e:
+        log_error(e, f"Worker {worker_index} failed", config)
+        results.put((WORKER_FAILED, worker_index, repr(e)))
+
+
+class ParallelScanEngine(ScanEngine):
+    """
+    Checks targets in several worker processes, each with its own event loop and session.
+
+    The (target, site) work is split into units dealt round-robin to the workers, which
+    stream site results back in small batches, found accounts at once. Targets are
+    reported through ``on_target_complete`` in this process, so exports run here exactly
+    as in a single process scan. Concurrency and connection limits apply to each worker.
+
+    Args:
+        config: The configuration object
+        workers: Number of worker processes
+        on_target_complete: Called with each ScanTarget once all of its sites were checked
+        announce: Print a line when each target completes
+    """
+
+    def __init__(self, config, workers: int, on_target_complete=None, announce=True):
+        super().__init__(config, on_target_complete, announce)
+        self.workers = workers
+        self._processes = []
+
+    def stop(self):
+        self._stopped = True
+        self._terminate()
+
+    def _terminate(self):
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+
+    async def run(self, targets: list) -> list:
+        units = plan_units(targets, self.workers)
+        for target in targets:
+            target.start()
+
+        shards = [[] for _ in range(min(self.workers, len(units)))]
+        for unit_id, (index, start, stop) in enumerate(units):
+            target = targets[index]
+            shards[unit_id % len(shards)].append((unit_id, target.kind, target.value, start, stop))
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        settings = worker_settings(self.config)
+        # Workers log through the file handlers of this process, so they share one rotating log
+        handlers = log_handlers()
+        log_records = context.Queue() if handlers else None
+        log_listener = logging.handlers.QueueListener(log_records, *handlers) if handlers else None
+        if log_listener is not None:
+            log_listener.start()
+        self._processes = [
+            context.Process(target=run_worker, args=(worker_index, settings, shard, results, log_records), daemon=True)
+            for worker_index, shard in enumerate(shards)
+        ]
+        for process in self._processes:
+            process.start()
+
+        running = set(range(len(shards)))
+        output = start_output(self.config, total=sum(len(target.sites) for target in targets))
+        for target in targets:
+            if not target.sites:
+                await self._complete(target)
+        try:
+            while running:
+                try:
+                    kind, worker_index, payload = await asyncio.to_thread(results.get, True, POLL_INTERVAL)
+                except queue.Empty:
+                    for worker_index in list(running):
+                        if not self._processes[worker_index].is_alive():
+                            running.discard(worker_index)
+                    continue
+                if kind == SITES_DONE:
+                    for unit_id, offset, result in payload:
+                        index, start, _ = units[unit_id]
+                        await self._record(targets[index], start + offset, result)
+                elif kind == WORKER_DONE:
+                    running.discard(worker_index)
+                    self._merge_stats(payload)
+                else:
+                    running.discard(worker_index)
+                    log_error(payload, f"Worker {worker_index} failed", self.config)
+        finally:
+            self._terminate()
+            for process in self._processes:
+                process.join()
+            if log_listener is not None:
+                log_listener.stop()
+            stop_output(self.config, output)
+            # Workers only sent what they recorded, so their shards don't overwrite each other on disk
+            if self.config.site_history:
+                get_ledger(self.config).save(self.config)
+            if not uses_proxy(self.config):
+                get_resolver(self.config).save(self.config)
+
+        # Sites of a worker that died never came back, they count as errors
+        if not self._stopped:
+            for target in targets:
+                for index, result in enumerate(target.results):
+                    if result is None:
+                        await self._record(target, index, error_result(target.sites[index]))
+        return targets
+
+    def _merge_stats(self, stats: dict):
+        for name, value in stats["transfer"].items():
+            setattr(transfer_stats, name, getattr(transfer_stats, name) + value)
+        if stats["cache"] is not None:
+            cache = get_result_cache(self.config)
+            for name, value in stats["cache"].items():
+                setattr(cache, name, getattr(cache, name) + value)
+        if stats["history"] is not None:
+            history = get_scan_history(self.config)
+            for name, value in stats["history"].items():
+                setattr(history, name, getattr(history, name) + value)
+        if stats["ledger"] is not None:
+            get_ledger(self.config).merge(stats["ledger"])
+        if stats["dns"] is not None:
+            get_resolver(self.config).merge(stats["dns"])
@@ -23,13 +23,6 @@ def create_save_directory(config):
         if config.currentEmail:
             create_dump_directory(config.currentEmail, config)
 
-    if config.pdf:
-        if config.currentUser:
-            create_images_directory(config.currentUser, config)
-
-        if config.currentEmail:
-            create_images_directory(config.currentEmail, config)
-
     return True
 
 
@@ -38,16 +31,7 @@ def create_dump_directory(identifier, config):
     strPath = Path(config.saveDirectory) / folderName
     if not strPath.exists():
         if config.verbose:
-            config.console.print(escape(f"🆕 Created directory to save dump data [{folderName}]"))
-        strPath.mkdir(parents=True, exist_ok=True)
-
-
-def create_images_directory(identifier, config):
-    folderName = f"images_{identifier}"
-    strPath = Path(config.saveDirectory) / folderName
-    if not strPath.exists():
-        if config.verbose:
-            config.console.print(escape(f"🆕 Created directory to save images [{folderName}]"))
+            print_if_not_json(escape(f"🆕 Created directory to save dump data [{folderName}]"))
         strPath.mkdir(parents=True, exist_ok=True)
 
 
@@ -0,0 +1,110 @@
+import contextlib
+import json
+import os
+import sys
+import time
+
+from onfire_blackbird.modules.core.scan import stream_results
+
+# Lines written at once, and seconds a line may wait for the rest of its batch
+NDJSON_BATCH = 100
+NDJSON_INTERVAL = 0.5
+
+
+class NdjsonWriter:
+    """
+    Writes JSON lines to a stream, flushed in batches.
+
+    Lines are buffered until ``batch`` of them are waiting or ``interval`` seconds passed
+    since the last flush, so a pipe gets steady output without a write per line. Once the
+    reader went away ``closed`` is set and further lines are dropped.
+
+    Args:
+        stream: The text stream to write to
+        batch: Lines written at once
+        interval: Seconds a line may wait for the rest of its batch
+    """
+
+    def __init__(self, stream, batch: int = NDJSON_BATCH, interval: float = NDJSON_INTERVAL):
+        self.stream = stream
+        self.batch = batch
+        self.interval = interval
+        self.closed = False
+        self._lines = []
+        self._flushed = time.monotonic()
+
+    def write(self, entry: dict):
+        self._lines.append(json.dumps(entry))
+        if len(self._lines) >= self.batch or time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._flushed = time.monotonic()
+        if not self._lines or self.closed:
+            self._lines.clear()
+            return
+        try:
+            self.stream.write("\n".join(self._lines) + "\n")
+            self.stream.flush()
+        except BrokenPipeError:
+            self.closed = True
+        self._lines.clear()
+
+
+def result_entry(target, result: dict) -> dict:
+    entry = {
+        "type": "result",
+        "kind": target.kind,
+        "target": target.value,
+        "name": result["name"],
+        "url": result["url"],
+        "category": result["category"],
+        "status": result["status"],
+    }
+    if result["metadata"]:
+        entry["metadata"] = {data["name"]: data["value"] for data in result["metadata"]}
+    return entry
+
+
+def target_entry(target, found: int, config) -> dict:
+    return {
+        "type": "target",
+        "kind": target.kind,
+        "target": target.value,
+        "date": config.date_pretty,
+        "sites": len(target.sites),
+        "total_found": found,
+        "elapsed": round(target.elapsed, 1),
+    }
+
+
+async def stream_ndjson(engine, targets: list, config, stream=None):
+    """
+    Scan the targets on the engine, writing each result to stdout as a JSON line as soon as it completes.
+
+    Found accounts are written, every site check with --verbose, and a target line follows
+    the last result of each target. Found accounts are flushed right away, the rest in batches.
+    """
+    writer = NdjsonWriter(stream or sys.stdout)
+    # Only counts of unfinished targets are kept, so memory doesn't grow with the run
+    found = {}
+    async with contextlib.aclosing(stream_results(engine, targets, completions=True)) as results:
+        async for target, _, result in results:
+            key = id(target)
+            if result is None:
+                writer.write(target_entry(target, found.pop(key, 0), config))
+                writer.flush()
+            elif result["status"] == "FOUND":
+                found[key] = found.get(key, 0) + 1
+                writer.write(result_entry(target, result))
+                writer.flush()
+            elif config.verbose:
+                writer.write(result_entry(target, result))
+            if writer.closed:
+                break
+    writer.flush()
+    if writer.closed and writer.stream is sys.stdout:
+        # The reader is gone, keep the interpreter from failing to flush stdout at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
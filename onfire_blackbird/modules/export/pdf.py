@@ -7,6 +7,7 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
 from onfire_blackbird.modules.export.file_operations import generate_name
+from onfire_blackbird.modules.utils.console import print_if_not_json
 from onfire_blackbird.modules.utils.log import log_error
 
 
@@ -150,11 +151,7 @@ def save_to_pdf(foundAccounts, resultType, config):
                                     try:
                                         y_position -= 25
                                         canva.drawImage(
-                                            str(
-                                                Path(config.saveDirectory)
-                                                / f"images_{identifier}"
-                                                / f"{result['name']}_image.jpg"
-                                            ),
+                                            data["image_path"],
                                             90,
                                             y_position,
                                             width=35,
@@ -170,7 +167,7 @@ def save_to_pdf(foundAccounts, resultType, config):
                 except Exception as e:
                     print(e)
         canva.save()
-        config.console.print(f"💾  Saved results to '[cyan1]{fileName}[/cyan1]'")
+        print_if_not_json(f"💾  Saved results to '[cyan1]{fileName}[/cyan1]'")
         return True
     except Exception as e:
         log_error(e, "Coudn't saved results to PDF file!", config)
@@ -3,21 +3,23 @@ import sys
 import traceback
 import warnings
 
-import spacy
 from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 
-from onfire_blackbird.modules.utils.parse import download_image
+from onfire_blackbird.modules.utils.console import print_if_not_json
 
 warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
 
 
 def inialize_nlp_model(config):
     try:
+        # spaCy is heavy to import and only needed for --ai
+        import spacy
+
         config.nlp = spacy.load("en_blackbird_osint_ner")
-        config.console.print("✔️  Successfully loaded AI model (en_blackbird_osint_ner)")
+        print_if_not_json("✔️  Successfully loaded AI model (en_blackbird_osint_ner)")
     except Exception:
-        config.console.print("❌ Could not load AI model (en_blackbird_osint_ner)")
-        config.console.print("Please install the model with `pip install en_blackbird_osint_ner`")
+        print_if_not_json("❌ Could not load AI model (en_blackbird_osint_ner)")
+        print_if_not_json("Please install the model with `pip install en_blackbird_osint_ner`")
         sys.exit()
 
 
@@ -83,19 +85,16 @@ def extract_data_with_ai(config, site, html_content=None, json_content=None):
                             continue
                         metadata_item["type"] = "Image"
 
-                        if config.pdf:
-                            metadata_item = download_image(metadata_item, site["name"], config)
-
                     if metadata_item["name"] == "Name":
                         metadata_item["type"] = "String"
 
                     if not any(item["name"] == d.label_.capitalize() for item in extractedMetadata):
-                        config.console.print(
+                        print_if_not_json(
                             f"      :right_arrow:  {metadata_item['name']}: {metadata_item['value']} (🤖)"
                         )
                         extractedMetadata.append(metadata_item)
         return extractedMetadata
     except Exception as e:
-        config.console.print("❌ Could not extract data with AI")
-        config.console.print(e)
+        print_if_not_json("❌ Could not extract data with AI")
+        print_if_not_json(e)
         traceback.print_exc()
@@ -1,10 +1,15 @@
+import asyncio
 from json import dumps
 from urllib.parse import urlencode
 
-from onfire_blackbird.modules.utils.http_client import do_sync_request
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.http_client import do_async_request
 from onfire_blackbird.modules.utils.log import log_error
 from onfire_blackbird.modules.utils.parse import extract_metadata
 
+# Instagram API requests allowed at once, apart from the scan's own concurrency limit
+INSTAGRAM_CONCURRENCY = 2
+
 metadataParams = [
     {"schema": "JSON", "type": "String", "name": "User ID", "path": ["user", "pk_id"]},
     {"schema": "JSON", "type": "String", "name": "Full Name", "path": ["user", "full_name"]},
@@ -32,21 +37,47 @@ metadataParams2 = [
 ]
 
 
-def get_user_id(username, session_id, config):
+# User IDs already looked up, by username
+_user_ids = {}
+
+_semaphores = {}
+
+
+def _limit():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores.clear()
+        _semaphores[loop] = asyncio.Semaphore(INSTAGRAM_CONCURRENCY)
+    return _semaphores[loop]
+
+
+async def _request(method, url, session, config, headers, session_id=None, data=None):
+    if session_id:
+        headers = {**headers, "Cookie": f"sessionid={session_id}"}
+    async with _limit():
+        response = await do_async_request(method, url, session, config, data, headers)
+    if response is None:
+        raise ConnectionError(f"No response from {url}")
+    return response
+
+
+async def get_user_id(username, session_id, session, config):
+    if username in _user_ids:
+        return _user_ids[username]
     try:
         headers = {"User-Agent": "iphone_ua", "x-ig-app-id": "936619743392459"}
-        cookies = {"sessionid": session_id}
-        response = do_sync_request(
-            method="GET",
-            url=f"https://i.instagram.com/api/v1/users/web_profile_info/?username={username}",
-            config=config,
-            data=None,
-            customHeaders=headers,
-            cookies=cookies,
+        response = await _request(
+            "GET",
+            f"https://i.instagram.com/api/v1/users/web_profile_info/?username={username}",
+            session,
+            config,
+            headers,
+            session_id,
         )
-        user_id = response.json()["data"]["user"]["id"]
+        user_id = response.json["data"]["user"]["id"]
         if config.verbose:
-            config.console.print(f"[Instagram] Acquired {username} user ID")
+            print_if_not_json(f"[Instagram] Acquired {username} user ID")
+        _user_ids[username] = user_id
         return user_id
 
     except Exception as e:
@@ -54,52 +85,54 @@ def get_user_id(username, session_id, config):
         return False
 
 
-def get_instagram_account_info(username, session_id, config):
-    extractedMetadata = []
+async def get_account_details(username, session_id, session, config):
+    user_id = await get_user_id(username, session_id, session, config)
+    if not user_id:
+        return []
+    response = await _request(
+        "GET",
+        f"https://i.instagram.com/api/v1/users/{user_id}/info/",
+        session,
+        config,
+        {"User-Agent": "Instagram 55.0.0.00.0"},
+        session_id,
+    )
+    if not response.json:
+        return []
+    return extract_metadata(metadataParams, response, "Instagram", config) or []
+
+
+async def get_recovery_options(username, session, config):
+    json_data = dumps({"q": username, "skip_recovery": "1"}, separators=(",", ":"))
+    data = urlencode({"signed_body": f"SIGNATURE.{json_data}"})
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "X-IG-App-ID": "124024574287414",
+        "User-Agent": "Instagram 103.0.0.0.1",
+    }
+    response = await _request(
+        "POST", "https://i.instagram.com/api/v1/users/lookup/", session, config, headers, data=data
+    )
+    if not response.json:
+        return []
+    return extract_metadata(metadataParams2, response, "Instagram", config) or []
+
+
+async def get_instagram_account_info(username, session_id, session, config):
     try:
-        user_id = get_user_id(username, session_id, config)
-
-        if user_id:
-            url = f"https://i.instagram.com/api/v1/users/{user_id}/info/"
-            response = do_sync_request(
-                method="GET",
-                url=url,
-                config=config,
-                data=None,
-                customHeaders={"User-Agent": "Instagram 55.0.0.00.0"},
-                cookies={"sessionid": session_id},
-            )
-            data = response.json()
-            response = {"json": data}
-
-            if data:
-                metadata = extract_metadata(metadataParams, response, "Instagram", config)
+        # The lookup doesn't need the user ID, so it runs alongside the ID and info requests
+        details, recovery = await asyncio.gather(
+            get_account_details(username, session_id, session, config),
+            get_recovery_options(username, session, config),
+            return_exceptions=True,
+        )
+        extractedMetadata = []
+        for metadata in (details, recovery):
+            if isinstance(metadata, Exception):
+                log_error(metadata, "[Instagram] Coudn't acquire more metadata", config)
+            else:
                 extractedMetadata.extend(metadata)
-
-                json_data = dumps({"q": username, "skip_recovery": "1"}, separators=(",", ":"))
-                data = urlencode({"signed_body": f"SIGNATURE.{json_data}"})
-
-                headers = {
-                    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                    "X-IG-App-ID": "124024574287414",
-                    "User-Agent": "Instagram 103.0.0.0.1",
-                }
-
-                response = do_sync_request(
-                    method="POST",
-                    url="https://i.instagram.com/api/v1/users/lookup/",
-                    config=config,
-                    data=data,
-                    customHeaders=headers,
-                )
-                data = response.json()
-                response = {"json": data}
-
-                if data:
-                    metadata = extract_metadata(metadataParams2, response, "Instagram", config)
-                    extractedMetadata.extend(metadata)
-
-                return extractedMetadata
+        return extractedMetadata
     except Exception as e:
         log_error(e, "[Instagram] Coudn't acquire more metadata", config)
         return False
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+# Request outcomes reported to the limiter
+OK = "ok"
+TIMEOUT = "timeout"
+CONNECTION_ERROR = "connection_error"
+THROTTLED = "throttled"
+
+CONGESTION_OUTCOMES = (TIMEOUT, CONNECTION_ERROR, THROTTLED)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit tuned at runtime with AIMD (additive increase, multiplicative decrease).
+
+    Every healthy response grows the limit by ``increase / limit`` (about +1 per round of
+    requests) as long as its latency stays within ``latency_tolerance`` times the running
+    average. A timeout, a 429/503 or a connection error from a host that answered before
+    multiplies the limit by ``decrease``, at most once per cooldown so a burst of failures
+    from one incident only backs off once. Hosts that never answered are left out, their
+    errors come from the host rather than from load.
+    Used as an async context manager in place of ``asyncio.Semaphore``.
+
+    Args:
+        initial: Starting limit
+        floor: Lowest limit the backoff may reach
+        ceiling: Highest limit the growth may reach
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        floor: int,
+        ceiling: int,
+        increase: float = 1.0,
+        decrease: float = 0.7,
+        latency_tolerance: float = 2.0,
+    ):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._limit = float(min(max(initial, self.floor), self.ceiling))
+        self.peak = self.limit
+        self.backoffs = 0
+        self._latency: Optional[float] = None
+        self._last_backoff = 0.0
+        self._waiters = deque()
+        self._answered = set()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self):
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def record(self, latency: float, outcome: str, host: Optional[str] = None):
+        """Feed the latency and outcome of a finished request to the given host into the limit."""
+        if outcome == CONNECTION_ERROR and host is not None and host not in self._answered:
+            return
+        if outcome in CONGESTION_OUTCOMES:
+            now = time.monotonic()
+            cooldown = max(1.0, self._latency or 0.0)
+            if now - self._last_backoff >= cooldown:
+                self._limit = max(float(self.floor), self._limit * self.decrease)
+                self._last_backoff = now
+                self.backoffs += 1
+            return
+
+        if host is not None:
+            self._answered.add(host)
+        healthy = self._latency is None or latency <= self._latency * self.latency_tolerance
+        self._latency = latency if self._latency is None else self._latency * 0.95 + latency * 0.05
+        if healthy:
+            self._limit = min(float(self.ceiling), self._limit + self.increase / self._limit)
+            self.peak = max(self.peak, self.limit)
+            self._wake()
+
+    def summary(self) -> str:
+        return f"Concurrency limit {self.limit} (peak {self.peak}, {self.backoffs} backoffs)"
+
+    def _wake(self):
+        available = self.limit - self.in_flight
+        for waiter in list(self._waiters)[: max(0, available)]:
+            if not waiter.done():
+                waiter.set_result(None)
@@ -9,5 +9,8 @@ def print_if_not_json(*args, **kwargs):
     All arguments are passed directly to config.console.print
     """
     if not hasattr(config, "json") or not config.json_output:
-        if hasattr(config, "console") and config.console is not None:
+        # During a scan the lines are rendered in batches by the output thread
+        if config.output is not None:
+            config.output.print(*args, **kwargs)
+        elif hasattr(config, "console") and config.console is not None:
             config.console.print(*args, **kwargs)
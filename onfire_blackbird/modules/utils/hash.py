@@ -6,3 +6,12 @@ import json
 def hash_json(jsonData):
     jsonString = json.dumps(jsonData, sort_keys=True)
     return hashlib.md5(jsonString.encode("utf-8")).hexdigest()
+
+
+# Return SHA-256 HASH for given file contents
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
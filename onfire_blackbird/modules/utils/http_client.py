@@ -1,7 +1,21 @@
+import asyncio
+import socket
+import ssl
+import time
+from collections import OrderedDict
+from http.cookies import CookieError, SimpleCookie
+from json import loads
+from urllib.parse import urlsplit
+
+import aiohttp
 import chardet
 import requests
 
+from onfire_blackbird.modules.utils.concurrency import CONNECTION_ERROR, OK, THROTTLED, TIMEOUT
+from onfire_blackbird.modules.utils.console import print_if_not_json
 from onfire_blackbird.modules.utils.log import log_error
+from onfire_blackbird.modules.utils.retry import HEDGE_POLL_INTERVAL
+from onfire_blackbird.modules.utils.transport import AiohttpTransport, RequestTimeout
 
 requests.packages.urllib3.disable_warnings()
 
@@ -24,59 +38,375 @@ def do_sync_request(method, url, config, data=None, customHeaders=None, cookies=
             cookies=cookies,
         )
         if config.verbose:
-            config.console.print(f"  🆗 Sync HTTP Request completed [{method} - {response.status_code}] {url}")
+            print_if_not_json(f"  🆗 Sync HTTP Request completed [{method} - {response.status_code}] {url}")
         return response
     except Exception as e:
         if config.verbose:
-            config.console.print(f"  ❌ Error in Sync HTTP Request [{method}] {url}")
+            print_if_not_json(f"  ❌ Error in Sync HTTP Request [{method}] {url}")
         log_error(e, f"Error in Sync HTTP Request [{method}] {url}", config)
         return None
 
 
-# Perform an Async Request and return response details
-async def do_async_request(method, url, session, config, data=None, custom_headers=None):
-    headers = {"User-Agent": config.user_agent}
-    if custom_headers:
-        headers.update(custom_headers)
+# Statuses of a server shedding load
+THROTTLED_STATUSES = frozenset((429, 503))
+
+# Bytes pulled from the socket per read while streaming a response body
+STREAM_CHUNK_SIZE = 16384
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class TransferStats:
+    """Counts body bytes read and skipped by early decisions over a run."""
+
+    __slots__ = ("bytes_read", "bytes_skipped", "early_stops", "truncated")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bytes_read = 0
+        self.bytes_skipped = 0
+        self.early_stops = 0
+        self.truncated = 0
+
+    def summary(self) -> str:
+        return (
+            f"Read {format_bytes(self.bytes_read)}, skipped {format_bytes(self.bytes_skipped)} "
+            f"({self.early_stops} early decisions, {self.truncated} capped responses)"
+        )
+
+
+transfer_stats = TransferStats()
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+# Return the tightest of the per-site and global body size caps
+def resolve_max_bytes(site_max_bytes, config):
+    limits = [limit for limit in (site_max_bytes, config.max_response_bytes) if limit]
+    return min(limits) if limits else None
+
+
+# Bytes of a body inspected when the charset has to be detected
+CHARSET_SNIFF_BYTES = 65536
+
+_UNSET = object()
+
+# Hosts whose detected charset is remembered, and the confidence a detection needs to be remembered
+CHARSET_CACHE_SIZE = 1024
+CHARSET_MIN_CONFIDENCE = 0.5
+
+# Charset detected for hosts that don't declare one in Content-Type, least recently used first
+_host_charsets = OrderedDict()
+
+
+def cached_charset(host):
+    charset = _host_charsets.get(host)
+    if charset is not None:
+        _host_charsets.move_to_end(host)
+    return charset
+
+
+def detect_charset(body: bytes, host):
+    charset = cached_charset(host)
+    if charset is not None:
+        return charset
+    detected = chardet.detect(body[:CHARSET_SNIFF_BYTES])
+    charset = detected["encoding"] or "utf-8"
+    # A guess from a short or mixed body would mislead every later response of the host
+    if detected["encoding"] and detected["confidence"] >= CHARSET_MIN_CONFIDENCE:
+        _host_charsets[host] = charset
+        if len(_host_charsets) > CHARSET_CACHE_SIZE:
+            _host_charsets.popitem(last=False)
+    return charset
+
+
+class HttpResponse:
+    """
+    Response with the raw body kept as bytes.
+
+    The decoded text and the parsed JSON are only built the first time they are read, so
+    responses that are settled on status code or byte patterns never pay for either. Item
+    access (``response["content"]``) is kept for the code that treats responses as dicts.
+    """
+
+    __slots__ = ("url", "status_code", "headers", "body", "charset", "truncated", "host", "_text", "_json", "_cookies")
+
+    _KEYS = {"url", "status_code", "headers", "content", "json", "truncated"}
+
+    def __init__(self, url, status_code, headers, body: bytes, charset=None, truncated=False, host=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+        self.truncated = truncated
+        self.host = host
+        self._text = None
+        self._json = _UNSET
+        self._cookies = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            try:
+                self._text = self.body.decode(self.charset or "utf-8")
+            except (LookupError, UnicodeDecodeError):
+                self._text = self.body.decode(detect_charset(self.body, self.host), errors="replace")
+        return self._text
+
+    @property
+    def json(self):
+        if self._json is _UNSET:
+            self._json = None
+            if not self.truncated and "application/json" in self.headers.get("Content-Type", ""):
+                try:
+                    self._json = loads(self.body)
+                except ValueError:
+                    pass
+        return self._json
+
+    @property
+    def cookies(self) -> dict:
+        """Cookies set by the final response, by name."""
+        if self._cookies is None:
+            jar = SimpleCookie()
+            for header in self.headers.getall("Set-Cookie", ()):
+                try:
+                    jar.load(header)
+                except CookieError:
+                    continue
+            self._cookies = {name: morsel.value for name, morsel in jar.items()}
+        return self._cookies
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return self.text if key == "content" else getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+
+# Read a response body in chunks, stopping as soon as the matcher has settled or the cap is hit
+async def read_body(response, matcher, charset, max_bytes, config):
+    body = bytearray()
+    settled = matcher is not None and not matcher.start(response.status, charset)
+    capped = False
+
+    if not settled:
+        if not config.stream_responses:
+            body.extend(await response.read())
+        else:
+            async for chunk in response.iter_chunks(STREAM_CHUNK_SIZE):
+                if max_bytes and len(body) + len(chunk) > max_bytes:
+                    body.extend(chunk[: max_bytes - len(body)])
+                    capped = True
+                elif matcher is not None:
+                    body.extend(chunk)
+                    settled = not matcher.feed(body)
+                else:
+                    body.extend(chunk)
+                if settled or capped:
+                    break
+        if matcher is not None and not settled:
+            matcher.feed(body)
+
+    transfer_stats.bytes_read += len(body)
+    if settled or capped:
+        if settled:
+            transfer_stats.early_stops += 1
+        else:
+            transfer_stats.truncated += 1
+        if response.content_length and "Content-Encoding" not in response.headers:
+            transfer_stats.bytes_skipped += max(0, response.content_length - len(body))
+        await response.abort()
+    if matcher is not None:
+        matcher.finish(truncated=capped)
+    return body, settled or capped
+
+
+# Errors about the host itself rather than about load: names that don't resolve and broken TLS
+HOST_ERRORS = (socket.gaierror, aiohttp.ClientSSLError, ssl.SSLError)
+
+
+def classify_error(error: Exception):
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(error, HOST_ERRORS) or isinstance(getattr(error, "os_error", None), HOST_ERRORS):
+        return None
+    if isinstance(error, (aiohttp.ClientConnectionError, OSError)):
+        return CONNECTION_ERROR
+    return None
+
+
+# Report the latency and outcome of a request to the adaptive concurrency limiter
+def record_outcome(config, started: float, outcome, host=None):
+    limiter = config.concurrency_limiter
+    if limiter is not None and outcome is not None:
+        limiter.record(time.monotonic() - started, outcome, host)
+
+
+# Send one attempt of a request, raising on network errors
+async def _send(method, url, session, config, data, headers, matcher, max_bytes, timeout):
     proxy = config.proxy if config.proxy else None
+    host = urlsplit(url).hostname
+    started = time.monotonic()
+    if config.output is not None:
+        config.output.requests += 1
     try:
-        response = await session.request(
-            method,
-            url,
-            proxy=proxy,
-            timeout=config.timeout,
-            allow_redirects=True,
-            ssl=False,
-            data=data,
-            headers=headers,
-            max_redirects=10,
+        response = await session.send(method, url, headers, data, timeout, proxy)
+
+        charset = response.charset or cached_charset(response.host)
+        try:
+            body, truncated = await read_body(response, matcher, charset, resolve_max_bytes(max_bytes, config), config)
+        except asyncio.CancelledError:
+            # A hedge lost the race, drop the half-read connection instead of pooling it
+            await response.abort()
+            raise
+        finally:
+            await response.release()
+    except Exception as e:
+        record_outcome(config, started, classify_error(e), host)
+        raise
+
+    outcome = THROTTLED if response.status in THROTTLED_STATUSES else OK
+    record_outcome(config, started, outcome, host)
+    return HttpResponse(
+        url=url,
+        status_code=response.status,
+        headers=response.headers,
+        body=body,
+        charset=charset,
+        truncated=truncated,
+        host=response.host,
+    )
+
+
+# Send a request and, if it runs past the site's hedge threshold, a duplicate, keeping whichever answers first
+async def _send_hedged(method, url, session, config, data, headers, matcher, max_bytes, timeout, policy, site_key):
+    if policy is None or not policy.can_hedge(method, site_key):
+        return await _send(method, url, session, config, data, headers, matcher, max_bytes, timeout)
+
+    started = time.monotonic()
+    primary = asyncio.create_task(_send(method, url, session, config, data, headers, matcher, max_bytes, timeout))
+    tasks = {primary: matcher}
+    try:
+        while True:
+            # Requests sent before enough latencies were known still get hedged once they are
+            hedge_after = policy.hedge_after(site_key)
+            if hedge_after is None:
+                wait_for = HEDGE_POLL_INTERVAL
+            else:
+                wait_for = max(0.0, started + hedge_after - time.monotonic())
+            done, _ = await asyncio.wait(tasks, timeout=wait_for)
+            if done:
+                return await primary
+            if hedge_after is not None:
+                break
+        if not policy.take_hedge():
+            return await primary
+
+        hedge_matcher = matcher.clone() if matcher is not None else None
+        hedge = asyncio.create_task(
+            _send(method, url, session, config, data, headers, hedge_matcher, max_bytes, timeout)
         )
+        tasks[hedge] = hedge_matcher
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                if task is hedge:
+                    policy.hedges_won += 1
+                    if matcher is not None:
+                        matcher.adopt(hedge_matcher)
+                return task.result()
+        raise error
+    finally:
+        # The slower copy is no longer needed
+        for task in tasks:
+            task.cancel()
+
+
+# Connect/read timeout of a request, tightened from the site's history on the first attempt
+def request_timeout(config, site_key, attempt: int):
+    ledger = config.site_ledger
+    if ledger is None or site_key is None or attempt > 0:
+        return RequestTimeout(config.timeout)
+    site_timeout = ledger.timeout_for(site_key, config)
+    return RequestTimeout(config.timeout, connect=site_timeout, read=site_timeout)
 
-        json = None
+
+# Perform an Async Request and return response details
+async def do_async_request(
+    method, url, session, config, data=None, custom_headers=None, matcher=None, max_bytes=None, site_key=None
+):
+    headers = {"User-Agent": config.user_agent, "Accept-Encoding": ACCEPT_ENCODING}
+    if custom_headers:
+        headers.update(custom_headers)
+    if isinstance(session, aiohttp.ClientSession):
+        session = AiohttpTransport(session)
+    policy = config.retry_policy
+    ledger = config.site_ledger if site_key is not None else None
+    attempt = 0
+
+    while True:
+        if policy is not None:
+            policy.requests += 1
+        timeout = request_timeout(config, site_key, attempt)
+        started = time.monotonic()
         try:
-            content = await response.text()
-        except Exception:
-            binaryContent = await response.read()
-            encode = chardet.detect(binaryContent)["encoding"]
-            content = binaryContent.decode(encode)
-
-        if "Content-Type" in response.headers:
-            if "application/json" in response.headers["Content-Type"]:
-                json = await response.json()
-
-        responseData = {
-            "url": url,
-            "status_code": response.status,
-            "headers": response.headers,
-            "content": content,
-            "json": json,
-        }
+            response = await _send_hedged(
+                method, url, session, config, data, headers, matcher, max_bytes, timeout, policy, site_key
+            )
+        except Exception as e:
+            # Only timeouts and connection errors may go away, a dead domain or a bad URL never will
+            if policy is not None and classify_error(e) is not None and policy.should_retry(method, attempt):
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            if ledger is not None:
+                ledger.record_error(site_key, timed_out=isinstance(e, asyncio.TimeoutError))
+            if config.verbose:
+                print_if_not_json(f"  ❌ Error in Async HTTP Request [{method}] {url}")
+            log_error(
+                e,
+                f"Error in Async HTTP Request [{method}] {url}",
+                config,
+                site=site_key,
+                url=url,
+                latency=time.monotonic() - started,
+            )
+            return None
+
+        if policy is not None and policy.should_retry(method, attempt, response.status_code):
+            await asyncio.sleep(policy.delay(attempt, response.headers.get("Retry-After")))
+            attempt += 1
+            continue
+
+        latency = time.monotonic() - started
+        if site_key is not None:
+            if policy is not None:
+                policy.latencies.record(site_key, latency)
+            if ledger is not None:
+                ledger.record(site_key, latency, len(response.body))
 
         if config.verbose:
-            config.console.print(f"  🆗 Async HTTP Request completed [{method} - {response.status}] {url}")
-        return responseData
-    except Exception as e:
-        if config.verbose:
-            config.console.print(f"  ❌ Error in Async HTTP Request [{method}] {url}")
-        log_error(e, f"Error in Async HTTP Request [{method}] {url}", config)
-        return None
+            print_if_not_json(f"  🆗 Async HTTP Request completed [{method} - {response.status_code}] {url}")
+        return response
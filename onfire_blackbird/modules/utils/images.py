@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import io
+import os
+from typing import Optional
+
+from onfire_blackbird.modules.utils.http_client import do_async_request
+from onfire_blackbird.modules.utils.log import log_error
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGES_CACHE_DIRECTORY = "images"
+URL_INDEX_DIRECTORY = "by-url"
+
+# Images downloaded at once, apart from the scan's own concurrency limit
+IMAGE_DOWNLOAD_CONCURRENCY = 4
+IMAGE_MAX_BYTES = 5 * 1024 * 1024
+
+# The PDF report draws avatars at 35x35 points, stored at twice that for print sharpness
+THUMBNAIL_SIZE = (70, 70)
+
+# Extensions of the image types stored as downloaded when Pillow isn't installed
+IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp"}
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_thumbnail(content: bytes) -> Optional[bytes]:
+    """Downscale an image to THUMBNAIL_SIZE as JPEG, None if it isn't an image or Pillow isn't installed."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.thumbnail(THUMBNAIL_SIZE)
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=85)
+            return output.getvalue()
+    except Exception:
+        return None
+
+
+def stored_image(content: bytes, content_type: Optional[str]) -> Optional[tuple]:
+    """Return the bytes and extension an image is cached as, None for responses that aren't images."""
+    if Image is not None:
+        thumbnail = make_thumbnail(content)
+        return (thumbnail, "jpg") if thumbnail is not None else None
+    # Without Pillow the image is kept as downloaded, under the extension of its type
+    extension = IMAGE_EXTENSIONS.get((content_type or "").split(";")[0].strip().lower())
+    return (content, extension) if extension is not None else None
+
+
+def _write_atomic(path, data: bytes):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ImageCache:
+    """
+    Avatar thumbnails shared by every target and run, stored under the hash of their content.
+
+    A small index maps each image URL to its content hash, so a URL seen before (the same
+    Gravatar across email permutations, or in an earlier run) is never downloaded again, and
+    identical images served from different URLs are stored once. Concurrent requests for
+    the same URL share one download.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._semaphores = {}
+
+    def _limit(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores.clear()
+            self._semaphores[loop] = asyncio.Semaphore(IMAGE_DOWNLOAD_CONCURRENCY)
+        return self._semaphores[loop]
+
+    async def fetch(self, url: str, session, config):
+        """Return the path of the cached thumbnail for an image URL, or None if it couldn't be downloaded."""
+        directory = config.cache_path / IMAGES_CACHE_DIRECTORY
+        index_path = directory / URL_INDEX_DIRECTORY / _sha256(url.encode())
+        try:
+            name = index_path.read_text().strip()
+            # Entries written before other extensions were stored hold the bare content hash
+            path = directory / (name if "." in name else f"{name}.jpg")
+            if path.exists():
+                return path
+        except OSError:
+            pass
+
+        future = self._inflight.get(url)
+        if future is None:
+            future = self._inflight[url] = asyncio.ensure_future(self._download(url, index_path, session, config))
+            future.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def _download(self, url, index_path, session, config):
+        async with self._limit():
+            response = await do_async_request("GET", url, session, config, max_bytes=IMAGE_MAX_BYTES)
+        if response is None or response.status_code != 200 or response.truncated:
+            return None
+        try:
+            image = await asyncio.to_thread(stored_image, bytes(response.body), response.headers.get("Content-Type"))
+            if image is None:
+                return None
+            content, extension = image
+            name = f"{_sha256(content)}.{extension}"
+            path = index_path.parent.parent / name
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                _write_atomic(path, content)
+            _write_atomic(index_path, name.encode())
+            return path
+        except Exception as e:
+            log_error(e, f"Coudn't save image {url}", config)
+            return None
+
+
+image_cache = ImageCache()
+
+
+# Download the images found in a site's metadata and link their thumbnails into the items
+async def download_images(metadata: Optional[list], session, config):
+    items = [item for item in metadata or () if item.get("type") == "Image" and item.get("value")]
+    if not items:
+        return
+    paths = await asyncio.gather(*(image_cache.fetch(item["value"], session, config) for item in items))
+    for item, path in zip(items, paths):
+        if path is not None:
+            item["downloaded"] = True
+            item["image_path"] = str(path)
@@ -1,5 +1,7 @@
 import hashlib
 
+from onfire_blackbird.modules.utils.console import print_if_not_json
+
 
 def process_input(input, operation, config):
     if operation == "hash-sha256":
@@ -7,4 +9,4 @@ def process_input(input, operation, config):
         retValue = hashlib.sha256(email_bytes).hexdigest()
         return retValue
     else:
-        config.console.print(f" Invalid operation {input} [{operation}]")
+        print_if_not_json(f" Invalid operation {input} [{operation}]")
@@ -0,0 +1,137 @@
+import json
+import os
+from typing import Optional
+
+from onfire_blackbird.modules.utils.log import log_error
+
+LEDGER_VERSION = 1
+LEDGER_FILENAME = "site_stats.json"
+
+# Latency samples kept per site, and samples needed before its history is trusted
+LEDGER_WINDOW = 32
+MIN_HISTORY_SAMPLES = 3
+
+# Lowest connect/read timeout derived from history, in seconds
+MIN_SITE_TIMEOUT = 3.0
+
+
+def site_key(kind: str, name: str) -> str:
+    return f"{kind}/{name}"
+
+
+def _percentile(samples: list, percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class SiteLedger:
+    """
+    Per-site request history kept across runs: recent latencies, error counts and body sizes.
+
+    The history sets each site's connect/read timeout to a multiple of its p99 latency
+    (never above ``--timeout``) and orders the queue so historically slow sites are sent
+    first (longest processing time first), which keeps them from finishing last. What a
+    worker process recorded is handed to the coordinator through ``changes`` and ``merge``,
+    so the file is only written once per run.
+    """
+
+    def __init__(self, path, sites: Optional[dict] = None):
+        self.path = path
+        self.sites = sites or {}
+        self._changes = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path) -> "SiteLedger":
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == LEDGER_VERSION:
+                return cls(path, data["sites"])
+        except Exception:
+            pass
+        return cls(path)
+
+    def save(self, config):
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": LEDGER_VERSION, "sites": self.sites}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            log_error(e, "Coudn't save site statistics", config)
+
+    def record(self, key: str, latency: float, size: int):
+        self._add(key, {"latencies": [round(latency, 3)], "requests": 1, "errors": 0, "timeouts": 0, "bytes": size})
+
+    def record_error(self, key: str, timed_out: bool = False):
+        self._add(key, {"latencies": [], "requests": 1, "errors": 1, "timeouts": int(timed_out), "bytes": 0})
+
+    def changes(self) -> dict:
+        """Return what was recorded since the ledger was loaded, per site."""
+        return self._changes
+
+    def merge(self, changes: dict):
+        """Add what another process recorded, as returned by its ``changes``."""
+        for key, change in changes.items():
+            self._add(key, change)
+
+    def _add(self, key: str, change: dict):
+        for entries in (self.sites, self._changes):
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = {"latencies": [], "requests": 0, "errors": 0, "timeouts": 0, "bytes": 0}
+            for name in ("requests", "errors", "timeouts", "bytes"):
+                entry[name] += change[name]
+            latencies = entry["latencies"]
+            latencies.extend(change["latencies"])
+            if len(latencies) > LEDGER_WINDOW:
+                del latencies[: len(latencies) - LEDGER_WINDOW]
+        self._dirty = True
+
+    def percentile(self, key: str, percentile: float) -> Optional[float]:
+        entry = self.sites.get(key)
+        if entry is None or len(entry["latencies"]) < MIN_HISTORY_SAMPLES:
+            return None
+        return _percentile(entry["latencies"], percentile)
+
+    def error_rate(self, key: str) -> Optional[float]:
+        entry = self.sites.get(key)
+        if not entry or not entry["requests"]:
+            return None
+        return entry["errors"] / entry["requests"]
+
+    def timeout_for(self, key: str, config) -> float:
+        """Connect/read timeout of a site: its p99 latency times --timeout-multiplier, capped at --timeout."""
+        p99 = self.percentile(key, 99)
+        if p99 is None:
+            return config.timeout
+        return min(float(config.timeout), max(MIN_SITE_TIMEOUT, p99 * config.timeout_multiplier))
+
+    def expected_latency(self, key: str) -> Optional[float]:
+        return self.percentile(key, 50)
+
+    def longest_first(self, keys: list) -> list:
+        """Return the indexes of ``keys`` ordered slowest site first, unknown sites ranked at the median."""
+        expected = [self.expected_latency(key) for key in keys]
+        known = [latency for latency in expected if latency is not None]
+        default = _percentile(known, 50) if known else 0.0
+        return sorted(
+            range(len(keys)), key=lambda index: -(expected[index] if expected[index] is not None else default)
+        )
+
+
+_ledger: Optional[SiteLedger] = None
+
+
+# Return the site ledger, loading it from the cache directory on first use
+def get_ledger(config) -> SiteLedger:
+    global _ledger
+    path = config.cache_path / LEDGER_FILENAME
+    if _ledger is None or _ledger.path != path:
+        _ledger = SiteLedger.load(path)
+    return _ledger
@@ -1,18 +1,146 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
 
+from onfire_blackbird.modules.utils.console import print_if_not_json
 
-def log_error(e, message, config):
+# Records of the same error kept per window, the rest are counted and dropped
+LOG_DUPLICATE_WINDOW = 60.0
+LOG_DUPLICATE_BURST = 5
+
+# Record attributes written as fields of the JSON line
+STRUCTURED_FIELDS = ("site", "url", "error_class", "latency", "suppressed")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with the site, URL, error class and latency when known."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Let through the first ``burst`` records of the same error per ``window`` seconds.
+
+    Errors are the same when they share level, error class and site (or message without
+    a site). The first record let through after a window carries how many were dropped.
+    """
+
+    def __init__(self, window: float = LOG_DUPLICATE_WINDOW, burst: int = LOG_DUPLICATE_BURST):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        error_class = getattr(record, "error_class", None)
+        site = getattr(record, "site", None)
+        key = (record.levelno, error_class, site if site is not None else record.msg)
+        now = time.monotonic()
+        with self._lock:
+            started, count, dropped = self._seen.get(key, (now, 0, 0))
+            if now - started > self.window:
+                started, count = now, 0
+            count += 1
+            if count > self.burst:
+                self._seen[key] = (started, count, dropped + 1)
+                return False
+            self._seen[key] = (started, count, 0)
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+# Route logging through a queue to a writer thread appending JSON lines to a rotating log file
+def setup_logging(config) -> logging.handlers.QueueListener:
+    global _listener
+    if _listener is not None:
+        return _listener
+    config.log_path.parent.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        config.log_path, maxBytes=config.log_max_bytes, backupCount=config.log_backups, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    # Repeated errors are dropped before they are queued, so an incident costs no file writes
+    queue_handler.addFilter(DuplicateFilter())
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+# Send the records of a worker process to the coordinator, which writes them to its log file
+def forward_logging(records):
+    queue_handler = logging.handlers.QueueHandler(records)
+    queue_handler.addFilter(DuplicateFilter())
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    root.addHandler(queue_handler)
+
+
+# Write the records still queued and stop the writer thread
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# Return the handlers log records end up in, for records sent from other processes
+def log_handlers() -> tuple:
+    return _listener.handlers if _listener is not None else ()
+
+
+def log_error(e, message, config, site=None, url=None, latency=None):
     if str(e) != "":
         error = str(e)
     else:
         error = repr(e)
-    if "TimeoutError" in error:
-        logging.debug(f"{message} | {error}")
+    fields = {
+        "site": site,
+        "url": url,
+        "error_class": type(e).__name__ if isinstance(e, BaseException) else None,
+        "latency": round(latency, 3) if latency is not None else None,
+    }
+    if "TimeoutError" in error or isinstance(e, TimeoutError):
+        logging.debug(f"{message} | {error}", extra=fields)
     elif "Cannot connect to host" in error:
-        logging.debug(f"{message} | {error}")
+        logging.debug(f"{message} | {error}", extra=fields)
     else:
-        logging.error(f"{message} | {error}")
+        logging.error(f"{message} | {error}", extra=fields)
     if config.verbose:
-        config.console.print(f"⛔  {message}")
-        config.console.print("     | An error occurred:")
-        config.console.print(f"     | {error}")
+        print_if_not_json(f"⛔  {message}")
+        print_if_not_json("     | An error occurred:")
+        print_if_not_json(f"     | {error}")
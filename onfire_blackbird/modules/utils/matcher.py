@@ -0,0 +1,144 @@
+import codecs
+from functools import lru_cache
+
+FOUND = "FOUND"
+NOT_FOUND = "NOT-FOUND"
+INCONCLUSIVE = "ERROR"
+
+# Encodings e_string/m_string are pre-encoded in, covering the charsets the site list is served in
+COMMON_ENCODINGS = ("utf-8", "cp1252", "cp1251", "iso8859-2", "shift_jis", "euc_jp", "gbk", "euc_kr")
+
+
+def normalize_charset(charset):
+    try:
+        return codecs.lookup(charset).name
+    except (LookupError, TypeError):
+        return None
+
+
+# Encode a match string once per common encoding, keyed by codec name
+@lru_cache(maxsize=4096)
+def compile_pattern(text: str) -> dict:
+    patterns = {}
+    for encoding in COMMON_ENCODINGS:
+        try:
+            patterns[codecs.lookup(encoding).name] = text.encode(encoding)
+        except UnicodeEncodeError:
+            continue
+    return patterns
+
+
+def select_patterns(patterns: dict, text: str, charset) -> tuple:
+    """Return the byte patterns to look for in a body served with the given charset."""
+    variants = set(patterns.values())
+    if len(variants) == 1:
+        # ASCII strings encode identically everywhere
+        return tuple(variants)
+    charset = normalize_charset(charset)
+    if charset in patterns:
+        return (patterns[charset],)
+    if charset is not None:
+        try:
+            return (text.encode(charset),)
+        except (UnicodeEncodeError, LookupError):
+            pass
+    # Unknown charset, accept a match in any of the common encodings
+    return tuple(variants)
+
+
+class _BufferSearch:
+    """Search for any of a set of byte patterns in a growing buffer, scanning each byte once."""
+
+    __slots__ = ("patterns", "found", "_offset", "_overlap")
+
+    def __init__(self, patterns: tuple):
+        self.patterns = patterns
+        self.found = any(pattern == b"" for pattern in patterns)
+        self._offset = 0
+        self._overlap = max((len(pattern) for pattern in patterns), default=1) - 1
+
+    def feed(self, buffer) -> bool:
+        if not self.found:
+            for pattern in self.patterns:
+                if buffer.find(pattern, self._offset) != -1:
+                    self.found = True
+                    break
+            # Step back far enough to catch a pattern that straddles the next chunk boundary
+            self._offset = max(0, len(buffer) - self._overlap)
+        return self.found
+
+
+class SiteMatcher:
+    """
+    Incremental FOUND/NOT-FOUND decision for one site response.
+
+    The status code is checked as soon as the headers arrive and the raw body buffer is
+    searched for the pre-encoded e_string/m_string as it grows, so the body is never decoded
+    just to be matched and the caller can stop reading once the verdict can no longer change.
+
+    Args:
+        site: Site definition with e_code, e_string, m_code and m_string
+        strict_codes: Require the status code to differ from m_code even when m_code equals e_code
+    """
+
+    __slots__ = ("site", "strict_codes", "verdict", "settled", "_e_search", "_m_search")
+
+    def __init__(self, site, strict_codes: bool = False):
+        self.site = site
+        self.strict_codes = strict_codes
+        self.verdict = None
+        self.settled = False
+        self._e_search = None
+        self._m_search = None
+
+    def start(self, status_code: int, charset=None) -> bool:
+        """Check the status code and return True if the body is still needed."""
+        site = self.site
+        # A retried request starts over from a clean verdict
+        self.verdict = None
+        self.settled = False
+        # Compiled site specs carry their patterns, plain definitions go through the cache
+        e_patterns = getattr(site, "e_patterns", None) or compile_pattern(site["e_string"])
+        m_patterns = getattr(site, "m_patterns", None) or compile_pattern(site["m_string"])
+        self._e_search = _BufferSearch(select_patterns(e_patterns, site["e_string"], charset))
+        self._m_search = _BufferSearch(select_patterns(m_patterns, site["m_string"], charset))
+
+        if self.strict_codes or site["m_code"] != site["e_code"]:
+            codes_match = site["e_code"] == status_code and site["m_code"] != status_code
+        else:
+            codes_match = site["e_code"] == status_code
+        if not codes_match or self._m_search.found:
+            self._settle(NOT_FOUND)
+        return not self.settled
+
+    def feed(self, buffer) -> bool:
+        """Search the body read so far and return True if more of it is still needed."""
+        if not self.settled:
+            self._e_search.feed(buffer)
+            # A missing-account marker anywhere in the body settles the check immediately
+            if self._m_search.feed(buffer):
+                self._settle(NOT_FOUND)
+        return not self.settled
+
+    def finish(self, truncated: bool = False) -> str:
+        """Settle the verdict once the body (or as much of it as was read) is exhausted."""
+        if not self.settled:
+            if truncated:
+                # The missing-account marker may be in the part of the body that was never read
+                self._settle(INCONCLUSIVE)
+            else:
+                self._settle(FOUND if self._e_search is not None and self._e_search.found else NOT_FOUND)
+        return self.verdict
+
+    def clone(self) -> "SiteMatcher":
+        """Return an unstarted matcher for the same site, for a duplicate of the request."""
+        return SiteMatcher(self.site, self.strict_codes)
+
+    def adopt(self, other: "SiteMatcher"):
+        """Take over the verdict of the matcher that followed the response actually used."""
+        self.verdict = other.verdict
+        self.settled = other.settled
+
+    def _settle(self, verdict: str):
+        self.verdict = verdict
+        self.settled = True
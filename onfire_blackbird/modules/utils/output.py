@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+
+# Renders per second of queued lines and of the progress line
+OUTPUT_REFRESH_RATE = 10.0
+
+
+# Create the rich console, imported only here so silent runs never load it
+def create_console(config, **kwargs):
+    if config.silent:
+        return None
+    from rich.console import Console
+
+    return Console(**kwargs)
+
+
+class ConsoleOutput:
+    """
+    Console output rendered by a background thread instead of the event loop.
+
+    ``print`` only queues its arguments. The render thread drains the queue a few times a
+    second, writing each batch in one go, and redraws a progress line of checked, found
+    and failed sites and request rate below the output.
+
+    Args:
+        console: The rich console to render to
+        total: Site checks expected, for the progress line
+        progress: Show the live progress line
+        refresh_rate: Renders per second
+    """
+
+    def __init__(self, console, total: int = 0, progress: bool = True, refresh_rate: float = OUTPUT_REFRESH_RATE):
+        self.console = console
+        self.total = total
+        self.progress = progress
+        self.interval = 1.0 / max(1.0, refresh_rate)
+        self.done = 0
+        self.found = 0
+        self.errors = 0
+        self.requests = 0
+        self._queue = deque()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._live = None
+        self._started = None
+
+    def print(self, *args, **kwargs):
+        self._queue.append((args, kwargs))
+
+    def advance(self, status: str):
+        self.done += 1
+        if status == "FOUND":
+            self.found += 1
+        elif status == "ERROR":
+            self.errors += 1
+
+    def start(self):
+        self._started = time.monotonic()
+        if self.progress and self.console.is_terminal:
+            from rich.live import Live
+
+            self._live = Live(
+                get_renderable=self._progress_line, console=self.console, auto_refresh=False, transient=True
+            )
+            self._live.start()
+        self._thread = threading.Thread(target=self._run, name="blackbird-output", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._render()
+        if self._live is not None:
+            self._live.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._render()
+
+    def _render(self):
+        if self._queue:
+            # One buffered write per batch instead of one per line
+            with self.console:
+                while self._queue:
+                    args, kwargs = self._queue.popleft()
+                    self.console.print(*args, **kwargs)
+        if self._live is not None:
+            self._live.refresh()
+
+    def _progress_line(self):
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        total = f"/{self.total}" if self.total else ""
+        return (
+            f"[dim]{self.done}{total} checked · [green]{self.found} found[/green] · "
+            f"[red]{self.errors} errors[/red] · {self.requests / elapsed:.0f} req/s[/dim]"
+        )
+
+
+# Route console output through a render thread for the duration of a scan, None if there is nothing to render
+def start_output(config, total: int = 0):
+    if config.output is not None or config.console is None or config.json_output:
+        return None
+    output = config.output = ConsoleOutput(config.console, total=total, progress=config.progress)
+    output.start()
+    return output
+
+
+def stop_output(config, output):
+    if output is None:
+        return
+    config.output = None
+    output.stop()
@@ -22,40 +22,17 @@ def access_html_regex(data, pattern):
         return False
 
 
-def download_image(link, site, config):
-    if link:
-        try:
-            import requests
-
-            response = requests.get(link, headers={}, stream=True, timeout=5)
-
-            if response.status_code == 200:
-                from pathlib import Path
-
-                if config.currentUser:
-                    path = Path(config.saveDirectory) / f"images_{config.currentUser}" / f"{site}_image.jpg"
-                else:
-                    path = Path(config.saveDirectory) / f"images_{config.currentEmail}" / f"{site}_image.jpg"
-
-                with open(path, "wb") as file:
-                    for chunk in response:
-                        file.write(chunk)
-                return True
-        except Exception:
-            return False
-    return None
-
-
 def extract_metadata(metadata, response, site, config):
     extractedMetadata = []
     for params in metadata:
-        metadataReturn = params
+        # Params come from the shared site registry, so values go on a copy
+        metadataReturn = {key: value for key, value in params.items() if key != "regex"}
         prefix = params["prefix"] if "prefix" in params else False
 
         if params["schema"] == "JSON":
             returnValue = access_json_property(response["json"], params["path"])
         elif params["schema"] == "HTML":
-            returnValue = access_html_regex(response["content"], params["path"])
+            returnValue = access_html_regex(response["content"], params.get("regex") or params["path"])
         else:
             return None
 
@@ -82,8 +59,6 @@ def extract_metadata(metadata, response, site, config):
                 else:
                     metadataReturn["value"] = returnValue
                 print_if_not_json(f"      :right_arrow:  {metadataReturn['name']}: {metadataReturn['value']}")
-                if config.pdf:
-                    metadataReturn = download_image(metadataReturn, site, config)
             extractedMetadata.append(metadataReturn)
 
     return extractedMetadata
@@ -1,22 +1,97 @@
-from onfire_blackbird.modules.utils.http_client import do_sync_request
+import asyncio
+import time
 
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.http_client import do_async_request
 
-def perform_pre_check(precheck_params, headers, config):
+# Only the cookies of a pre-check response are used, its body is never read
+PRE_CHECK_MAX_BYTES = 1
+
+# Share of the TTL after which a cached value is refreshed in the background
+PRE_CHECK_REFRESH_AFTER = 0.8
+
+
+class PreCheckCache:
+    """
+    Values acquired by pre-checks (cookies, tokens), shared by every email checked against a site.
+
+    Each value is kept for a TTL and refreshed in the background once most of the TTL has
+    passed, so checks keep using the current value instead of waiting. Concurrent checks
+    that find no value wait on the same acquisition instead of each sending their own.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._inflight = {}
+
+    async def get(self, key, acquire, ttl: float):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at, refresh_at = entry
+            if now < expires_at:
+                if now >= refresh_at and key not in self._inflight:
+                    self._start(key, acquire, ttl)
+                return value
+        future = self._inflight.get(key) or self._start(key, acquire, ttl)
+        # A cancelled check must not cancel the acquisition others are waiting on
+        return await asyncio.shield(future)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _start(self, key, acquire, ttl: float):
+        future = self._inflight[key] = asyncio.ensure_future(self._acquire(key, acquire, ttl))
+        return future
+
+    async def _acquire(self, key, acquire, ttl: float):
+        try:
+            value = await acquire()
+        finally:
+            self._inflight.pop(key, None)
+        if value is not None:
+            now = time.monotonic()
+            self._entries[key] = (value, now + ttl, now + ttl * PRE_CHECK_REFRESH_AFTER)
+        return value
+
+
+pre_check_cache = PreCheckCache()
+
+
+async def acquire_cookie(precheck_params, session, config):
+    response = await do_async_request(
+        precheck_params["method"],
+        precheck_params["endpoint"],
+        session,
+        config,
+        precheck_params["data"],
+        precheck_params["headers"],
+        max_bytes=PRE_CHECK_MAX_BYTES,
+    )
+    if response is None:
+        return None
+    cookie_name = precheck_params["cookie_name"]
+    cookie_value = response.cookies.get(cookie_name)
+    if cookie_value and config.verbose:
+        print_if_not_json(f"🔑 Acquired cookie {cookie_name}: {cookie_value}")
+    return cookie_value
+
+
+# Return a copy of the site headers with the pre-check values filled in, or None if they couldn't be acquired
+async def perform_pre_check(precheck_params, headers, session, config):
     try:
-        method = precheck_params["method"]
-        url = precheck_params["endpoint"]
-        data = precheck_params["data"]
-        precheck_headers = precheck_params["headers"]
-        response = do_sync_request(method, url, config, data, precheck_headers)
-        if precheck_params["type"] == "cookie":
-            cookie_name = precheck_params["cookie_name"]
-            cookie_value = response.cookies.get(precheck_params["cookie_name"])
-            if cookie_value:
-                if config.verbose:
-                    config.console.print(f"🔑 Acquired cookie {cookie_name}: {cookie_value}")
-                for header in headers:
-                    headers[header] = headers[header].replace("{" + cookie_name + "_value}", cookie_value)
-
-        return headers
+        if precheck_params["type"] != "cookie":
+            return dict(headers) if headers else headers
+
+        cookie_name = precheck_params["cookie_name"]
+        key = (precheck_params["method"], precheck_params["endpoint"], cookie_name)
+        cookie_value = await pre_check_cache.get(
+            key, lambda: acquire_cookie(precheck_params, session, config), config.pre_check_ttl
+        )
+        if not cookie_value:
+            return None
+
+        placeholder = "{" + cookie_name + "_value}"
+        return {header: value.replace(placeholder, cookie_value) for header, value in (headers or {}).items()}
     except Exception:
         return None
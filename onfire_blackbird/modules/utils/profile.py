@@ -0,0 +1,125 @@
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.session import set_loop_factory
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+FAST = "fast"
+BALANCED = "balanced"
+POLITE = "polite"
+PROFILES = (FAST, BALANCED, POLITE)
+
+# Event loop implementations, "auto" picks uvloop when it is installed
+ASYNCIO_LOOP = "asyncio"
+UVLOOP = "uvloop"
+AUTO_LOOP = "auto"
+
+# Settings of each profile, the balanced one is the defaults of Config
+PROFILE_SETTINGS = {
+    FAST: {
+        "event_loop": AUTO_LOOP,
+        "max_concurrent_requests": 100,
+        "concurrency_ceiling": 300,
+        "connection_limit": 300,
+        "connection_limit_per_host": 16,
+        "max_requests_per_host": 8,
+        "host_rate_limit": 20.0,
+        "host_burst": 10,
+        "timeout": 15,
+        "retries": 1,
+        "hedge": True,
+    },
+    BALANCED: {
+        "event_loop": AUTO_LOOP,
+        "max_concurrent_requests": 30,
+        "concurrency_ceiling": 100,
+        "connection_limit": 100,
+        "connection_limit_per_host": 8,
+        "max_requests_per_host": 4,
+        "host_rate_limit": 5.0,
+        "host_burst": 5,
+        "timeout": 30,
+        "retries": 2,
+        "hedge": False,
+    },
+    POLITE: {
+        "event_loop": ASYNCIO_LOOP,
+        "max_concurrent_requests": 10,
+        "concurrency_ceiling": 20,
+        "connection_limit": 20,
+        "connection_limit_per_host": 2,
+        "max_requests_per_host": 1,
+        "host_rate_limit": 1.0,
+        "host_burst": 1,
+        "timeout": 45,
+        "retries": 3,
+        "hedge": False,
+    },
+}
+
+# File descriptors kept free for logs, caches, DNS and exports
+RESERVED_FILE_DESCRIPTORS = 64
+
+
+# Apply a runtime profile, leaving the settings that were set explicitly untouched
+def apply_profile(config, profile: str, explicit=()):
+    config.profile = profile
+    for name, value in PROFILE_SETTINGS[profile].items():
+        if name not in explicit:
+            setattr(config, name, value)
+
+
+# Run sync scans on uvloop when the profile asks for it and it is installed
+def install_event_loop(config):
+    use_uvloop = config.event_loop == UVLOOP or (config.event_loop == AUTO_LOOP and uvloop is not None)
+    if use_uvloop and uvloop is None:
+        print_if_not_json("⚠️  uvloop isn't installed, using the default asyncio event loop")
+        use_uvloop = False
+    set_loop_factory(uvloop.new_event_loop if use_uvloop else None)
+
+
+def file_descriptor_limit() -> int | None:
+    """Raise the soft RLIMIT_NOFILE as far as the hard limit allows and return it, None where it doesn't exist."""
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        target = hard if hard != resource.RLIM_INFINITY else max(soft, 65536)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+# Keep the connections a scan may open within the file descriptors the process is allowed
+def clamp_to_file_descriptors(config, limit: int | None = None):
+    limit = file_descriptor_limit() if limit is None else limit
+    if limit is None:
+        return
+    available = max(1, limit - RESERVED_FILE_DESCRIPTORS)
+    proxies = len(config.proxies) if config.proxies else 0
+    # Every proxy of a pool has a connection pool of its own
+    connections = config.proxy_concurrency * proxies if proxies else config.connection_limit
+    requests = max(config.max_concurrent_requests, config.concurrency_ceiling if config.adaptive_concurrency else 0)
+    if max(connections, requests) <= available:
+        return
+
+    print_if_not_json(
+        f"⚠️  The process may only open {limit} files, limiting concurrency to {available} requests "
+        f"(raise it with ulimit -n)"
+    )
+    config.max_concurrent_requests = min(config.max_concurrent_requests, available)
+    config.concurrency_ceiling = min(config.concurrency_ceiling, available)
+    config.concurrency_floor = min(config.concurrency_floor, config.max_concurrent_requests)
+    config.connection_limit = min(config.connection_limit, available)
+    if proxies:
+        config.proxy_concurrency = max(1, min(config.proxy_concurrency, available // proxies))
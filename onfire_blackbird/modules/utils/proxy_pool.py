@@ -0,0 +1,258 @@
+import asyncio
+import itertools
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from onfire_blackbird.modules.utils.transport import ProxyError, Transport, TransportResponse
+
+ROUND_ROBIN = "round-robin"
+LEAST_LOADED = "least-loaded"
+PROXY_STRATEGIES = (ROUND_ROBIN, LEAST_LOADED)
+
+# Status a proxy answers with when it, not the site, refused the request
+PROXY_FAILURE_STATUSES = frozenset((407,))
+
+# Errors raised when the proxy couldn't be reached or refused to connect, the rest are left to the retry policy
+PROXY_FAILURE_ERRORS = (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError, ProxyError)
+
+# Longest a proxy is ejected for after failing its probes again and again, in seconds
+MAX_EJECTION_SECONDS = 600.0
+
+
+class ProxyEndpoint:
+    """One proxy of the pool, with its load and health."""
+
+    __slots__ = ("url", "limit", "in_flight", "failures", "ejections", "ejected_until", "probing", "requests", "errors")
+
+    def __init__(self, url: str, limit: int):
+        self.url = url
+        self.limit = limit
+        self.in_flight = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / self.limit
+
+    def healthy(self, now: float) -> bool:
+        return self.ejections == 0 or (self.ejected_until <= now and not self.probing)
+
+
+class ProxyPool:
+    """
+    Spreads requests over several proxies, each with its own concurrency limit.
+
+    A proxy failing ``eject_after`` requests in a row is ejected for ``eject_seconds``.
+    Once that passes one request probes it again: success brings it back, another
+    failure ejects it for twice as long. With ``sticky`` every host keeps going through
+    the proxy it was first assigned, as long as that proxy stays healthy.
+
+    Args:
+        proxies: Proxy URLs
+        strategy: "round-robin" or "least-loaded"
+        concurrency: Requests in flight through each proxy at once
+        sticky: Keep sending each host through the same proxy
+        eject_after: Consecutive failures before a proxy is ejected
+        eject_seconds: Seconds a proxy is ejected for the first time
+    """
+
+    def __init__(
+        self,
+        proxies: list,
+        strategy: str = ROUND_ROBIN,
+        concurrency: int = 16,
+        sticky: bool = False,
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+    ):
+        if not proxies:
+            raise ValueError("A proxy pool needs at least one proxy")
+        self.endpoints = [ProxyEndpoint(url, max(1, concurrency)) for url in dict.fromkeys(proxies)]
+        self.strategy = strategy
+        self.sticky = sticky
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self._cycle = itertools.cycle(self.endpoints)
+        self._hosts = {}
+
+    def pick(self, host: Optional[str] = None) -> ProxyEndpoint:
+        now = time.monotonic()
+        if self.sticky and host:
+            endpoint = self._hosts.get(host)
+            if endpoint is not None and endpoint.healthy(now) and not endpoint.probing:
+                return self._take(endpoint, now)
+
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy(now)]
+        if not healthy:
+            # Every proxy is ejected, go through the one coming back soonest rather than failing
+            endpoint = min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)
+        elif self.strategy == LEAST_LOADED:
+            endpoint = min(healthy, key=lambda endpoint: endpoint.load)
+        else:
+            endpoint = next(self._cycle)
+            while endpoint not in healthy:
+                endpoint = next(self._cycle)
+
+        if self.sticky and host:
+            self._hosts[host] = endpoint
+        return self._take(endpoint, now)
+
+    def _take(self, endpoint: ProxyEndpoint, now: float) -> ProxyEndpoint:
+        if endpoint.ejections and endpoint.ejected_until <= now:
+            endpoint.probing = True
+        endpoint.requests += 1
+        return endpoint
+
+    def succeeded(self, endpoint: ProxyEndpoint):
+        endpoint.failures = 0
+        endpoint.ejections = 0
+        endpoint.probing = False
+
+    def failed(self, endpoint: ProxyEndpoint):
+        endpoint.errors += 1
+        # Requests sent before the proxy was ejected don't extend the ejection
+        if endpoint.ejected_until > time.monotonic() and not endpoint.probing:
+            return
+        endpoint.failures += 1
+        if endpoint.probing or endpoint.failures >= self.eject_after:
+            endpoint.ejections += 1
+            backoff = self.eject_seconds * 2 ** (endpoint.ejections - 1)
+            endpoint.ejected_until = time.monotonic() + min(MAX_EJECTION_SECONDS, backoff)
+            endpoint.failures = 0
+            endpoint.probing = False
+
+    def summary(self) -> str:
+        now = time.monotonic()
+        healthy = sum(1 for endpoint in self.endpoints if endpoint.healthy(now))
+        requests = ", ".join(f"{endpoint.requests}" for endpoint in self.endpoints)
+        return f"{healthy} of {len(self.endpoints)} proxies healthy, requests per proxy: {requests}"
+
+
+class _PooledResponse(TransportResponse):
+    __slots__ = ("_response", "_release")
+
+    def __init__(self, response: TransportResponse, release):
+        self._response = response
+        self._release = release
+        self.status = response.status
+        self.headers = response.headers
+        self.charset = response.charset
+        self.host = response.host
+        self.content_length = response.content_length
+
+    def iter_chunks(self, size: int):
+        return self._response.iter_chunks(size)
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def abort(self):
+        await self._response.abort()
+
+    async def release(self):
+        try:
+            await self._response.release()
+        finally:
+            self._release()
+
+
+class ProxyPoolTransport(Transport):
+    """
+    Sends every request through a proxy of the pool, over a transport of its own per proxy.
+
+    Each proxy gets a separate connection pool, and its concurrency slot is held until
+    the response was released.
+
+    Args:
+        pool: The proxy pool shared by every transport of the process
+        make_transport: Called with a proxy URL to create the transport sending through it
+    """
+
+    def __init__(self, pool: ProxyPool, make_transport):
+        self.pool = pool
+        self.name = None
+        self._transports = {}
+        self._slots = {}
+        for endpoint in pool.endpoints:
+            self._transports[endpoint.url] = transport = make_transport(endpoint.url)
+            self._slots[endpoint.url] = asyncio.Semaphore(endpoint.limit)
+            self.name = transport.name
+
+    async def send(self, method, url, headers, data, timeout, proxy=None) -> TransportResponse:
+        endpoint = self.pool.pick(urlsplit(url).hostname)
+        slot = self._slots[endpoint.url]
+        try:
+            await slot.acquire()
+        except asyncio.CancelledError:
+            # A probe that never went out doesn't settle the proxy's health
+            endpoint.probing = False
+            raise
+        endpoint.in_flight += 1
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                endpoint.in_flight -= 1
+                slot.release()
+
+        try:
+            response = await self._transports[endpoint.url].send(method, url, headers, data, timeout, endpoint.url)
+        except PROXY_FAILURE_ERRORS:
+            self.pool.failed(endpoint)
+            release()
+            raise
+        except BaseException:
+            # A site that failed says nothing about the proxy, let another request probe it
+            endpoint.probing = False
+            release()
+            raise
+        if response.status in PROXY_FAILURE_STATUSES:
+            self.pool.failed(endpoint)
+        else:
+            self.pool.succeeded(endpoint)
+        return _PooledResponse(response, release)
+
+    @property
+    def closed(self) -> bool:
+        return all(transport.closed for transport in self._transports.values())
+
+    async def close(self):
+        await asyncio.gather(*(transport.close() for transport in self._transports.values()))
+
+
+# Return True if requests go out through a proxy, so hosts are resolved by the proxy rather than locally
+def uses_proxy(config) -> bool:
+    return bool(config.proxy or config.proxies)
+
+
+# Return the process-wide proxy pool for --proxy-file/proxies, None without one
+def get_proxy_pool(config) -> Optional[ProxyPool]:
+    if not config.proxies:
+        config.proxy_pool = None
+        return None
+    pool = config.proxy_pool
+    if pool is None or [endpoint.url for endpoint in pool.endpoints] != list(dict.fromkeys(config.proxies)):
+        pool = config.proxy_pool = ProxyPool(
+            config.proxies,
+            strategy=config.proxy_strategy,
+            concurrency=config.proxy_concurrency,
+            sticky=config.proxy_sticky,
+            eject_after=config.proxy_eject_after,
+            eject_seconds=config.proxy_eject_seconds,
+        )
+    # Health and sticky assignments carry over between runs, the settings may not
+    pool.strategy = config.proxy_strategy
+    pool.sticky = config.proxy_sticky
+    pool.eject_after = max(1, config.proxy_eject_after)
+    pool.eject_seconds = config.proxy_eject_seconds
+    return pool
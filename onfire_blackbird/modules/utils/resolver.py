@@ -0,0 +1,191 @@
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import time
+from typing import Optional
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from onfire_blackbird.modules.utils.log import log_error
+
+DNS_CACHE_VERSION = 1
+DNS_CACHE_FILENAME = "dns.json"
+
+# Host lookups sent at once while prefetching
+DNS_PREFETCH_CONCURRENCY = 64
+
+# getaddrinfo errors meaning the name doesn't exist, as opposed to a lookup that failed
+NXDOMAIN_ERRORS = frozenset(
+    code for code in (getattr(socket, "EAI_NONAME", None), getattr(socket, "EAI_NODATA", None)) if code is not None
+)
+
+
+def is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class CachingResolver(AbstractResolver):
+    """
+    DNS resolver with a cache kept across targets and runs, including names that don't exist.
+
+    Answers are cached for ``ttl`` seconds and hosts that returned NXDOMAIN for
+    ``negative_ttl`` seconds, so requests to dead domains fail at once instead of waiting
+    on a lookup. Only answers are persisted, a missing name is remembered for the current
+    run, since a single failed lookup can be a broken resolver rather than a dead domain. Concurrent lookups of a host share one query, which lets ``prefetch``
+    resolve every host of a scan up front while the first requests join the same queries.
+    Worker processes hand their answers to the coordinator through ``answers`` and ``merge``.
+
+    Args:
+        path: File the cache is persisted to
+        ttl: Seconds an answer is reused
+        negative_ttl: Seconds a name that doesn't exist is remembered
+    """
+
+    def __init__(self, path, ttl: float, negative_ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._answers = {}
+        self._missing = {}
+        self._inflight = {}
+        self._resolver = None
+        self._loop = None
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path, ttl: float, negative_ttl: float) -> "CachingResolver":
+        resolver = cls(path, ttl, negative_ttl)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == DNS_CACHE_VERSION:
+                now = time.time()
+                resolver._answers = {
+                    (host, family): (expires, addresses)
+                    for host, family, expires, addresses in data["answers"]
+                    if expires > now
+                }
+        except Exception:
+            pass
+        return resolver
+
+    def answers(self) -> list:
+        """Return the answers that haven't expired, as [host, family, expires, addresses]."""
+        now = time.time()
+        return [
+            [host, family, expires, addresses]
+            for (host, family), (expires, addresses) in self._answers.items()
+            if expires > now
+        ]
+
+    def merge(self, answers: list):
+        """Add the answers another process looked up, as returned by its ``answers``."""
+        for host, family, expires, addresses in answers:
+            cached = self._answers.get((host, family))
+            if cached is None or cached[0] < expires:
+                self._answers[(host, family)] = (expires, addresses)
+                self._dirty = True
+
+    def save(self, config):
+        if not self._dirty:
+            return
+        data = {"version": DNS_CACHE_VERSION, "answers": self.answers()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            log_error(e, "Coudn't save DNS cache", config)
+
+    def is_missing(self, host: str) -> bool:
+        """Return True if the host is known not to exist."""
+        expires = self._missing.get(host)
+        return expires is not None and expires > time.time()
+
+    def is_cached(self, host: str, family=socket.AF_UNSPEC) -> bool:
+        if self.is_missing(host):
+            return True
+        cached = self._answers.get((host, int(family)))
+        return cached is not None and cached[0] > time.time()
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list:
+        if self.is_missing(host):
+            raise socket.gaierror(socket.EAI_NONAME, f"{host} does not exist (cached)")
+
+        key = (host, int(family))
+        cached = self._answers.get(key)
+        if cached is None or cached[0] <= time.time():
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = asyncio.ensure_future(self._lookup(host, family))
+                future.add_done_callback(lambda done: self._forget(key, done))
+            await asyncio.shield(future)
+            cached = self._answers[key]
+        return [{**address, "port": port} for address in cached[1]]
+
+    def _forget(self, key, future):
+        self._inflight.pop(key, None)
+        # Every waiter may have been cancelled, don't leave the error unretrieved
+        if not future.cancelled():
+            future.exception()
+
+    async def _lookup(self, host: str, family):
+        loop = asyncio.get_running_loop()
+        # The underlying resolver is bound to the loop it was created on
+        if self._resolver is None or self._loop is not loop:
+            self._resolver = DefaultResolver()
+            self._loop = loop
+        try:
+            addresses = await self._resolver.resolve(host, 0, family)
+        except socket.gaierror as e:
+            if e.errno in NXDOMAIN_ERRORS:
+                self._missing[host] = time.time() + self.negative_ttl
+            raise
+        self._answers[(host, int(family))] = (time.time() + self.ttl, [dict(address) for address in addresses])
+        self._dirty = True
+
+    async def prefetch(self, hosts, family=socket.AF_UNSPEC):
+        """Resolve hosts that aren't cached yet, a few dozen at a time."""
+        pending = [
+            host
+            for host in dict.fromkeys(hosts)
+            if host and not is_ip_address(host) and not self.is_cached(host, family)
+        ]
+        semaphore = asyncio.Semaphore(DNS_PREFETCH_CONCURRENCY)
+
+        async def resolve(host):
+            async with semaphore:
+                try:
+                    await self.resolve(host, 0, family)
+                except OSError:
+                    pass
+
+        await asyncio.gather(*(resolve(host) for host in pending))
+
+    async def close(self):
+        # Shared by every session of the process, the cache outlives each connector
+        pass
+
+
+_resolver: Optional[CachingResolver] = None
+
+
+# Return the process-wide caching resolver, loading the on-disk cache on first use
+def get_resolver(config) -> CachingResolver:
+    global _resolver
+    path = config.cache_path / DNS_CACHE_FILENAME
+    if _resolver is None or _resolver.path != path:
+        _resolver = CachingResolver.load(path, config.dns_cache_ttl, config.dns_negative_ttl)
+    _resolver.ttl = config.dns_cache_ttl
+    _resolver.negative_ttl = config.dns_negative_ttl
+    return _resolver
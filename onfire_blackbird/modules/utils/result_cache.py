@@ -0,0 +1,201 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from onfire_blackbird.modules.utils.log import log_error
+
+RESULT_CACHE_VERSION = 1
+RESULT_CACHE_FILENAME = "results.sqlite3"
+
+# Results kept decoded in memory, the rest are read back from disk
+RESULT_CACHE_MEMORY_ENTRIES = 4096
+
+# Results buffered before they are written to disk in one transaction
+RESULT_CACHE_WRITE_BATCH = 256
+
+
+def result_key(kind: str, site_name: str, method: str, url: str, data=None, variant: str = "") -> str:
+    """
+    Cache key of a site check. It depends on the request, not on the user agent or proxy
+    it went through.
+    """
+    request = json.dumps([kind, site_name, method, url, data, variant], ensure_ascii=False, default=str)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Site check results shared across targets and runs: a bounded in-memory LRU in front of
+    a SQLite store of zlib-compressed entries.
+
+    Each status is kept for its own TTL, so an account that was found can be trusted longer
+    than one that wasn't and errors are retried soon. Writes are buffered and go to disk in
+    batches.
+
+    Args:
+        path: SQLite database file
+        ttls: Seconds each status ("FOUND", "NOT-FOUND", "ERROR") is kept, 0 to not cache it
+        memory_entries: Results kept in the in-memory tier
+    """
+
+    def __init__(self, path, ttls: dict, memory_entries: int = RESULT_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttls = ttls
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._memory = OrderedDict()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._disabled = False
+
+    def _connect(self, config) -> Optional[sqlite3.Connection]:
+        # A connection can't be carried over into a forked process
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        if self._disabled:
+            return None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != RESULT_CACHE_VERSION:
+                connection.execute("DROP TABLE IF EXISTS results")
+                connection.execute(f"PRAGMA user_version={RESULT_CACHE_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires REAL NOT NULL, value BLOB NOT NULL)"
+            )
+            connection.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+            connection.commit()
+        except Exception as e:
+            log_error(e, "Coudn't open result cache, continuing without the disk tier", config)
+            self._disabled = True
+            return None
+        self._connection = connection
+        self._pid = os.getpid()
+        return connection
+
+    def get(self, key: str, config) -> Optional[dict]:
+        """Return a copy of the cached result, or None if there is none or it expired."""
+        result = self._get_memory(key)
+        if result is None:
+            result = self._get_disk(key, config)
+        return result
+
+    async def fetch(self, key: str, config) -> Optional[dict]:
+        """Like ``get``, with the disk tier read in a thread so the event loop never waits on SQLite."""
+        result = self._get_memory(key)
+        if result is None:
+            result = await asyncio.to_thread(self._get_disk, key, config)
+        return result
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is None or cached[0] <= time.time():
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(cached[1])
+
+    def _get_disk(self, key: str, config) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            result = None
+            connection = self._connect(config)
+            if connection is not None:
+                try:
+                    row = connection.execute(
+                        "SELECT expires, value FROM results WHERE key = ? AND expires > ?", (key, now)
+                    ).fetchone()
+                    if row is not None:
+                        result = json.loads(zlib.decompress(row[1]))
+                        self._remember(key, row[0], result)
+                except Exception as e:
+                    log_error(e, "Coudn't read result cache", config)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            return copy.deepcopy(result)
+
+    def put(self, key: str, result: dict, config):
+        ttl = self.ttls.get(result.get("status"), 0)
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires, copy.deepcopy(result))
+            value = zlib.compress(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+            self._pending.append((key, expires, value))
+            self.stores += 1
+            if len(self._pending) >= RESULT_CACHE_WRITE_BATCH:
+                self._flush(config)
+
+    def _remember(self, key, expires, result):
+        self._memory[key] = (expires, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def flush(self, config):
+        """Write the buffered results to disk."""
+        with self._lock:
+            self._flush(config)
+
+    def _flush(self, config):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        connection = self._connect(config)
+        if connection is None:
+            return
+        try:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", pending)
+        except Exception as e:
+            log_error(e, "Coudn't save result cache", config)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = f" ({self.hits / lookups:.0%})" if lookups else ""
+        return f"Cache answered {self.hits} of {lookups} checks{rate}, {self.disk_hits} from disk"
+
+
+_cache: Optional[ResultCache] = None
+
+
+def cache_ttls(config) -> dict:
+    return {
+        "FOUND": config.cache_ttl,
+        "NOT-FOUND": config.cache_not_found_ttl,
+        "ERROR": config.cache_error_ttl,
+    }
+
+
+# Return the result cache, opening the on-disk store in the cache directory on first use
+def get_result_cache(config) -> ResultCache:
+    global _cache
+    path = config.cache_path / RESULT_CACHE_FILENAME
+    if _cache is None or _cache.path != path:
+        _cache = ResultCache(path, cache_ttls(config))
+    _cache.ttls = cache_ttls(config)
+    return _cache
@@ -0,0 +1,133 @@
+import random
+from collections import deque
+from typing import Optional
+
+# Methods that can be sent twice without side effects
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Status codes worth another attempt, the server or a proxy in front of it was overloaded
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Latency samples kept per site, and samples needed before its percentile is trusted
+LATENCY_WINDOW = 64
+MIN_LATENCY_SAMPLES = 8
+
+# Seconds between looks at the hedge threshold while too few latencies are known to set it
+HEDGE_POLL_INTERVAL = 0.5
+
+
+class LatencyTracker:
+    """Recent request latencies per site and over the whole run, for hedging thresholds."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._sites = {}
+        self._overall = deque(maxlen=window * 8)
+
+    def record(self, key: str, latency: float):
+        samples = self._sites.get(key)
+        if samples is None:
+            samples = self._sites[key] = deque(maxlen=self.window)
+        samples.append(latency)
+        self._overall.append(latency)
+
+    def percentile(self, key: Optional[str], percentile: float) -> Optional[float]:
+        """Latency percentile of a site this run, or of the whole run when ``key`` is None."""
+        samples = self._overall if key is None else self._sites.get(key)
+        if samples is None or len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are sent again and when a slow one is duplicated.
+
+    Only idempotent requests are retried, after a timeout, a connection error or one of
+    ``RETRYABLE_STATUS_CODES``, waiting a fully jittered exponential backoff between
+    attempts. Retries and hedges draw from one budget per run (``budget`` times the
+    requests sent, plus a small allowance), so an outage can't multiply the load.
+
+    Args:
+        attempts: Retries allowed per request after the first attempt
+        backoff: Base delay in seconds, doubled on every retry
+        budget: Extra requests allowed, as a fraction of the requests sent
+        hedge: Duplicate idempotent requests that run past the hedge percentile
+        hedge_percentile: Latency percentile after which a request is hedged
+        history: Site latencies from earlier runs, used while a site has no samples in this run
+    """
+
+    def __init__(
+        self,
+        attempts: int = 2,
+        backoff: float = 0.5,
+        budget: float = 0.1,
+        hedge: bool = False,
+        hedge_percentile: float = 95.0,
+        max_backoff: float = 10.0,
+        min_budget: int = 10,
+        history=None,
+    ):
+        self.attempts = max(0, attempts)
+        self.backoff = backoff
+        self.budget = budget
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.max_backoff = max_backoff
+        self.min_budget = min_budget
+        self.history = history
+        self.latencies = LatencyTracker()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def _has_budget(self) -> bool:
+        return self.retries + self.hedges < self.min_budget + self.budget * self.requests
+
+    def should_retry(self, method: str, attempt: int, status_code: Optional[int] = None) -> bool:
+        """Return True if a failed attempt (``status_code`` None for errors) may be sent again."""
+        if attempt >= self.attempts or method.upper() not in IDEMPOTENT_METHODS:
+            return False
+        if status_code is not None and status_code not in RETRYABLE_STATUS_CODES:
+            return False
+        if not self._has_budget():
+            return False
+        self.retries += 1
+        return True
+
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Seconds to wait before retry number ``attempt``, honouring a short Retry-After."""
+        if retry_after is not None:
+            try:
+                seconds = float(retry_after)
+                if 0 <= seconds <= self.max_backoff:
+                    return seconds
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def can_hedge(self, method: str, key: Optional[str]) -> bool:
+        return self.hedge and key is not None and method.upper() in IDEMPOTENT_METHODS
+
+    def hedge_after(self, key: str) -> Optional[float]:
+        """Seconds after which a duplicate of the request should be sent, None while no latencies are known."""
+        threshold = self.latencies.percentile(key, self.hedge_percentile)
+        if threshold is None and self.history is not None:
+            threshold = self.history.percentile(key, self.hedge_percentile)
+        if threshold is None:
+            threshold = self.latencies.percentile(None, self.hedge_percentile)
+        return threshold
+
+    def take_hedge(self) -> bool:
+        if not self._has_budget():
+            return False
+        self.hedges += 1
+        return True
+
+    def summary(self) -> str:
+        summary = f"Retried {self.retries} of {self.requests} requests"
+        if self.hedge:
+            summary += f", hedged {self.hedges} ({self.hedges_won} won by the hedge)"
+        return summary
@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from onfire_blackbird.modules.utils.log import log_error
+
+SCAN_HISTORY_VERSION = 1
+SCAN_HISTORY_FILENAME = "scan_history.sqlite3"
+
+# Results buffered before they are written to disk in one transaction
+SCAN_HISTORY_WRITE_BATCH = 512
+
+# Only conclusive results are merged into a re-scan, anything else is checked again
+REUSABLE_STATUSES = frozenset(("FOUND", "NOT-FOUND"))
+
+
+class ScanHistory:
+    """
+    Latest result of every (target, site) pair checked, with the site definition it was
+    checked against.
+
+    A re-scan only queries the sites whose definition changed in the lists since, whose
+    result is older than ``--rescan-max-age`` or wasn't conclusive, and merges the rest.
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reused = 0
+        self.rescanned = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._disabled = False
+
+    def _connect(self, config) -> Optional[sqlite3.Connection]:
+        # A connection can't be carried over into a forked process
+        if self._connection is not None and self._pid == os.getpid():
+            return self._connection
+        if self._disabled:
+            return None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCAN_HISTORY_VERSION:
+                connection.execute("DROP TABLE IF EXISTS history")
+                connection.execute(f"PRAGMA user_version={SCAN_HISTORY_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS history (kind TEXT NOT NULL, target TEXT NOT NULL, site TEXT NOT NULL, "
+                "definition TEXT NOT NULL, checked_at REAL NOT NULL, value BLOB NOT NULL, "
+                "PRIMARY KEY (kind, target, site))"
+            )
+            connection.commit()
+        except Exception as e:
+            log_error(e, "Coudn't open scan history", config)
+            self._disabled = True
+            return None
+        self._connection = connection
+        self._pid = os.getpid()
+        return connection
+
+    def previous(self, kind: str, target: str, config) -> dict:
+        """Return the stored results of a target by site name, as (definition hash, checked at, result)."""
+        with self._lock:
+            # Results not written yet would be missed by the query
+            self._flush(config)
+            connection = self._connect(config)
+            if connection is None:
+                return {}
+            try:
+                rows = connection.execute(
+                    "SELECT site, definition, checked_at, value FROM history WHERE kind = ? AND target = ?",
+                    (kind, target),
+                ).fetchall()
+            except Exception as e:
+                log_error(e, "Coudn't read scan history", config)
+                return {}
+        return {site: (definition, checked_at, value) for site, definition, checked_at, value in rows}
+
+    def reusable(self, entry: Optional[tuple], site, max_age: float) -> Optional[dict]:
+        """Return the stored result if it can stand in for a new check of the site, otherwise None."""
+        if entry is None:
+            return None
+        definition, checked_at, value = entry
+        if definition != site.definition_hash or time.time() - checked_at > max_age:
+            return None
+        try:
+            result = json.loads(zlib.decompress(value))
+        except Exception:
+            return None
+        return result if result.get("status") in REUSABLE_STATUSES else None
+
+    def record(self, kind: str, target: str, site, result: dict, config):
+        value = zlib.compress(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+        with self._lock:
+            self._pending.append((kind, target, site.name, site.definition_hash, time.time(), value))
+            if len(self._pending) >= SCAN_HISTORY_WRITE_BATCH:
+                self._flush(config)
+
+    def flush(self, config):
+        """Write the buffered results to disk."""
+        with self._lock:
+            self._flush(config)
+
+    def _flush(self, config):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        connection = self._connect(config)
+        if connection is None:
+            return
+        try:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?)", pending)
+        except Exception as e:
+            log_error(e, "Coudn't save scan history", config)
+
+    def summary(self) -> str:
+        return f"Re-scan reused {self.reused} stored results and checked {self.rescanned} sites again"
+
+
+_history: Optional[ScanHistory] = None
+
+
+# Return the scan history, opening the on-disk store in the cache directory on first use
+def get_scan_history(config) -> ScanHistory:
+    global _history
+    path = config.cache_path / SCAN_HISTORY_FILENAME
+    if _history is None or _history.path != path:
+        _history = ScanHistory(path)
+    return _history
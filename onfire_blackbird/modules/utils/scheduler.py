@@ -0,0 +1,150 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        if self.rate <= 0:
+            return True
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Seconds until the next token is available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic() if now is None else now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Host:
+    __slots__ = ("name", "queue", "in_flight", "bucket")
+
+    def __init__(self, name: str, rate: float, burst: float):
+        self.name = name
+        self.queue = deque()
+        self.in_flight = 0
+        self.bucket = TokenBucket(rate, burst)
+
+
+class HostScheduler:
+    """
+    Hands out queued requests so that no host exceeds its rate or in-flight limit.
+
+    Requests are queued per host and hosts are served round-robin. A worker that just
+    finished a request for a host is offered the next request for the same host first,
+    so requests to one host run back to back over the same keep-alive connection. There
+    are no batches or sleeps: ``next()`` only waits when every queued host is throttled.
+
+    Args:
+        rate: Requests per second allowed per host, 0 disables rate limiting
+        burst: Requests a host may receive at once before the rate applies
+        max_in_flight: Concurrent requests allowed per host
+    """
+
+    def __init__(self, rate: float, burst: float, max_in_flight: int):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_in_flight = max(1, max_in_flight)
+        self.queued = 0
+        self._hosts = {}
+        self._rotation = deque()
+        self._closed = False
+        self._starving = 0
+        self._changed = asyncio.Event()
+
+    def add(self, host: str, item):
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = _Host(host, self.rate, self.burst)
+        if not entry.queue:
+            self._rotation.append(entry)
+        entry.queue.append(item)
+        self.queued += 1
+        self._changed.set()
+
+    def close(self):
+        """Signal that no more requests will be added."""
+        self._closed = True
+        self._changed.set()
+
+    def done(self, host: str):
+        """Release the in-flight slot taken by ``next()`` for a host."""
+        self._hosts[host].in_flight -= 1
+        self._changed.set()
+
+    async def wait_for_demand(self, low_watermark: int):
+        """Wait until the queue runs low or workers are idle because every queued host is throttled."""
+        while self.queued >= low_watermark and not self._starving:
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def next(self, prefer: Optional[str] = None):
+        """Return the next ``(host, item)`` allowed to run, or None once the queue is closed and drained."""
+        while True:
+            now = time.monotonic()
+            picked = self._pick(prefer, now)
+            if picked is not None:
+                return picked
+            if self._closed and self.queued == 0:
+                return None
+
+            # Every queued host is throttled, sleep until a token is due or something changes
+            delay = min((host.bucket.wait_time(now) for host in self._rotation if self._has_slot(host)), default=None)
+            self._starving += 1
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._starving -= 1
+
+    def _has_slot(self, host: _Host) -> bool:
+        return host.in_flight < self.max_in_flight
+
+    def _take(self, host: _Host, now: float):
+        if host.queue and self._has_slot(host) and host.bucket.try_acquire(now):
+            item = host.queue.popleft()
+            host.in_flight += 1
+            self.queued -= 1
+            return host.name, item
+        return None
+
+    def _pick(self, prefer: Optional[str], now: float):
+        # Host affinity, keep the warm connection busy with the same host
+        if prefer is not None and prefer in self._hosts:
+            host = self._hosts[prefer]
+            picked = self._take(host, now)
+            if picked is not None:
+                if not host.queue and host in self._rotation:
+                    self._rotation.remove(host)
+                return picked
+
+        for _ in range(len(self._rotation)):
+            host = self._rotation.popleft()
+            picked = self._take(host, now)
+            if host.queue:
+                self._rotation.append(host)
+            if picked is not None:
+                return picked
+        return None
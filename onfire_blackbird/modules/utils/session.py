@@ -0,0 +1,117 @@
+import asyncio
+import atexit
+from typing import Optional
+
+import aiohttp
+
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.proxy_pool import ProxyPoolTransport, get_proxy_pool
+from onfire_blackbird.modules.utils.resolver import get_resolver
+from onfire_blackbird.modules.utils.transport import (
+    HTTP2,
+    HTTP2_AVAILABLE,
+    AiohttpTransport,
+    Http2Transport,
+    Transport,
+)
+
+
+class SessionManager:
+    """
+    Owns a single transport (aiohttp session and TCP connector by default) shared by every target of a scan.
+
+    Reusing one connector keeps DNS answers, TCP connections and TLS sessions warm
+    between targets instead of paying the handshakes to every host again.
+    """
+
+    def __init__(self):
+        self._session: Optional[Transport] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get_session(self, config) -> Transport:
+        loop = asyncio.get_running_loop()
+        # A session is bound to the loop it was created on, so a new loop needs a new session
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._create_session(config)
+            self._loop = loop
+        return self._session
+
+    def _create_session(self, config) -> Transport:
+        use_http2 = config.transport == HTTP2 and HTTP2_AVAILABLE
+        if config.transport == HTTP2 and not HTTP2_AVAILABLE:
+            print_if_not_json("⚠️  HTTP/2 transport needs httpx[http2] installed, using aiohttp")
+        pool = get_proxy_pool(config)
+        if pool is not None:
+            # Every proxy gets its own connection pool, sized to its share of the requests
+            return ProxyPoolTransport(
+                pool, lambda proxy: self._create_transport(config, use_http2, proxy, config.proxy_concurrency)
+            )
+        return self._create_transport(config, use_http2)
+
+    def _create_transport(self, config, use_http2: bool, proxy=None, limit=None) -> Transport:
+        if use_http2:
+            return Http2Transport(config, proxy=proxy, limit=limit)
+        connector = aiohttp.TCPConnector(
+            limit=limit or config.connection_limit,
+            limit_per_host=config.connection_limit_per_host,
+            keepalive_timeout=config.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=config.dns_cache_ttl,
+            resolver=get_resolver(config),
+            ssl=False,
+        )
+        # The session outlives each target, cookies set by one target's checks must not reach the next
+        return AiohttpTransport(aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar()))
+
+    async def close(self):
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        # A session owned by another (possibly finished) loop can't be closed from here
+        if session is not None and not session.closed and loop is asyncio.get_running_loop():
+            await session.close()
+
+
+_session_manager = SessionManager()
+_runner: Optional[asyncio.Runner] = None
+_loop_factory = None
+
+
+# Return the shared transport for the running event loop
+async def get_session(config) -> Transport:
+    return await _session_manager.get_session(config)
+
+
+# Close the shared session and release all pooled connections
+async def close_session():
+    await _session_manager.close()
+
+
+# Choose the event loop implementation run_sync creates, None for the default asyncio loop
+def set_loop_factory(loop_factory):
+    global _loop_factory
+    if loop_factory is not _loop_factory:
+        _loop_factory = loop_factory
+        _shutdown()
+
+
+# Run a coroutine on a process-wide event loop so pooled connections survive between sync calls
+def run_sync(coroutine):
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner(loop_factory=_loop_factory)
+    return _runner.run(coroutine)
+
+
+def _shutdown():
+    global _runner
+    if _runner is None:
+        return
+    try:
+        _runner.run(close_session())
+    finally:
+        _runner.close()
+        _runner = None
+
+
+atexit.register(_shutdown)
@@ -0,0 +1,221 @@
+import asyncio
+import http.cookiejar
+from importlib.util import find_spec
+from typing import NamedTuple, Optional
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+
+# httpx is only imported once the HTTP/2 transport is used, importing it also loads rich
+HTTP2_AVAILABLE = find_spec("httpx") is not None and find_spec("h2") is not None
+httpx = None
+
+AIOHTTP = "aiohttp"
+HTTP2 = "http2"
+TRANSPORTS = (AIOHTTP, HTTP2)
+
+MAX_REDIRECTS = 10
+
+
+class ProxyError(ConnectionError):
+    """The proxy, not the site, failed the request."""
+
+
+class RequestTimeout(NamedTuple):
+    """Whole-request limit plus the connect and read limits, in seconds."""
+
+    total: float
+    connect: Optional[float] = None
+    read: Optional[float] = None
+
+
+class TransportResponse:
+    """
+    Streaming response handed to ``read_body`` by every transport.
+
+    ``status``, ``headers`` (case-insensitive multidict), ``charset``, ``host`` and
+    ``content_length`` are available as soon as the headers arrived, the body is pulled
+    with ``iter_chunks``/``read``. ``abort`` gives up on the rest of the body and
+    ``release`` hands the connection back once the response is done with.
+    """
+
+    __slots__ = ("status", "headers", "charset", "host", "content_length")
+
+    def iter_chunks(self, size: int):
+        raise NotImplementedError
+
+    async def read(self) -> bytes:
+        raise NotImplementedError
+
+    async def abort(self):
+        raise NotImplementedError
+
+    async def release(self):
+        raise NotImplementedError
+
+
+class Transport:
+    """Sends requests for ``do_async_request``, one instance shared by every target of a scan."""
+
+    name = None
+
+    async def send(self, method, url, headers, data, timeout: RequestTimeout, proxy=None) -> TransportResponse:
+        raise NotImplementedError
+
+    @property
+    def closed(self) -> bool:
+        raise NotImplementedError
+
+    async def close(self):
+        raise NotImplementedError
+
+
+class _AiohttpResponse(TransportResponse):
+    __slots__ = ("_response",)
+
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.status = response.status
+        self.headers = response.headers
+        self.charset = response.charset
+        self.host = response.url.host
+        self.content_length = response.content_length
+
+    def iter_chunks(self, size: int):
+        return self._response.content.iter_chunked(size)
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def abort(self):
+        # The rest of the body is never read, so the connection can't go back to the pool
+        self._response.close()
+
+    async def release(self):
+        self._response.release()
+
+
+class AiohttpTransport(Transport):
+    """HTTP/1.1 over the shared aiohttp session and its pooled TCP connector, the default."""
+
+    name = AIOHTTP
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+
+    async def send(self, method, url, headers, data, timeout: RequestTimeout, proxy=None) -> TransportResponse:
+        response = await self.session.request(
+            method,
+            url,
+            proxy=proxy,
+            timeout=aiohttp.ClientTimeout(total=timeout.total, sock_connect=timeout.connect, sock_read=timeout.read),
+            allow_redirects=True,
+            ssl=False,
+            data=data,
+            headers=headers,
+            max_redirects=MAX_REDIRECTS,
+        )
+        return _AiohttpResponse(response)
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    async def close(self):
+        await self.session.close()
+
+
+class _HttpxResponse(TransportResponse):
+    __slots__ = ("_response",)
+
+    def __init__(self, response):
+        self._response = response
+        self.status = response.status_code
+        self.headers = CIMultiDictProxy(CIMultiDict(response.headers.multi_items()))
+        self.charset = response.charset_encoding
+        self.host = response.url.host
+        length = response.headers.get("Content-Length")
+        self.content_length = int(length) if length and length.isdigit() else None
+
+    async def iter_chunks(self, size: int):
+        async for chunk in _translate_errors(self._response.aiter_bytes(size)):
+            yield chunk
+
+    async def read(self) -> bytes:
+        chunks = [chunk async for chunk in self.iter_chunks(65536)]
+        return b"".join(chunks)
+
+    async def abort(self):
+        # Over HTTP/2 only this stream is reset, the connection stays up for the others
+        await self._response.aclose()
+
+    async def release(self):
+        await self._response.aclose()
+
+
+async def _translate_errors(chunks):
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except httpx.TimeoutException as e:
+        raise asyncio.TimeoutError(str(e)) from e
+    except httpx.TransportError as e:
+        raise ConnectionError(str(e)) from e
+
+
+class Http2Transport(Transport):
+    """
+    httpx client negotiating HTTP/2 per origin through ALPN.
+
+    Origins that accept HTTP/2 get one connection each, with every concurrent request to
+    them multiplexed over it, the others fall back to HTTP/1.1. Needs ``httpx[http2]``.
+    """
+
+    name = HTTP2
+
+    def __init__(self, config, proxy=None, limit=None):
+        global httpx
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            http2=True,
+            verify=False,
+            proxy=proxy or config.proxy or None,
+            follow_redirects=True,
+            max_redirects=MAX_REDIRECTS,
+            # Like the aiohttp session, never carry cookies from one check to the next
+            cookies=http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])),
+            limits=httpx.Limits(
+                max_connections=limit or config.connection_limit,
+                max_keepalive_connections=limit or config.connection_limit,
+                keepalive_expiry=config.keepalive_timeout,
+            ),
+        )
+
+    async def send(self, method, url, headers, data, timeout: RequestTimeout, proxy=None) -> TransportResponse:
+        request = self.client.build_request(
+            method,
+            url,
+            headers=headers,
+            content=data.encode() if isinstance(data, str) else data,
+            timeout=httpx.Timeout(
+                timeout.total, connect=timeout.connect or timeout.total, read=timeout.read or timeout.total
+            ),
+        )
+        try:
+            # httpx has no overall deadline, so the total limit is enforced around the headers
+            response = await asyncio.wait_for(self.client.send(request, stream=True), timeout.total)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.ProxyError as e:
+            raise ProxyError(str(e)) from e
+        except httpx.TransportError as e:
+            raise ConnectionError(str(e)) from e
+        return _HttpxResponse(response)
+
+    @property
+    def closed(self) -> bool:
+        return self.client.is_closed
+
+    async def close(self):
+        await self.client.aclose()
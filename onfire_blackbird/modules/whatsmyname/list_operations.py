@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from typing import Optional
 
 from requests import Response
@@ -29,34 +30,106 @@ def read_list(option: str, config) -> dict | bool:
         return False
 
 
-# Download .JSON file list from defined URL
-def download_list(config):
-    response: Optional[Response] = do_sync_request("GET", USERNAME_LIST_URL, config)
-    if response and hasattr(response, "json"):
-        with open(config.username_list_path, "w", encoding="UTF-8") as f:
-            json.dump(response.json(), f, indent=4, ensure_ascii=False)
+# Load the conditional request state saved by the last update check
+def read_update_state(config) -> dict:
+    try:
+        with open(config.username_list_state_path, "r", encoding="UTF-8") as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except Exception:
+        return {}
 
 
-# Check for changes in remote list
+def _write_atomic(path, write):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="UTF-8") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def save_update_state(state: dict, config):
+    try:
+        _write_atomic(config.username_list_state_path, lambda f: json.dump(state, f, indent=4))
+    except Exception as e:
+        log_error(e, "Coudn't save list update state", config)
+
+
+# Download the list with a conditional request, at most once, and replace the local copy atomically
+def download_list(config, state: Optional[dict] = None) -> Optional[bool]:
+    """
+    Return True if the list was updated, False if the local copy is current and None if the
+    download failed. ``state`` holds the ETag/Last-Modified of the local copy, omit it to
+    download unconditionally.
+    """
+    headers = {}
+    if state:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+    response: Optional[Response] = do_sync_request("GET", USERNAME_LIST_URL, config, customHeaders=headers)
+    if response is None or response.status_code not in (200, 304):
+        return None
+
+    new_state = {
+        "etag": response.headers.get("ETag", (state or {}).get("etag")),
+        "last_modified": response.headers.get("Last-Modified", (state or {}).get("last_modified")),
+        "checked_at": time.time(),
+    }
+    if response.status_code == 304:
+        save_update_state({**(state or {}), **new_state}, config)
+        return False
+
+    data = response.json()
+    new_state["hash"] = hash_json(data)
+    updated = not state or state.get("hash") != new_state["hash"]
+    if updated:
+        _write_atomic(config.username_list_path, lambda f: json.dump(data, f, indent=4, ensure_ascii=False))
+    save_update_state(new_state, config)
+    return updated
+
+
+# Check for changes in remote list, at most once per --update-interval
 def check_updates(config):
-    if os.path.isfile(config.username_list_path):
-        print_if_not_json(":counterclockwise_arrows_button: Checking for updates...")
+    if not os.path.isfile(config.username_list_path):
+        print_if_not_json(":globe_with_meridians: Downloading site list")
+        _download_or_report(config, None)
+        return
+
+    state = read_update_state(config)
+    checked_at = state.get("checked_at")
+    if isinstance(checked_at, (int, float)) and 0 <= time.time() - checked_at < config.update_interval * 3600:
+        print_if_not_json("✔️  Sites List was checked recently, skipping update")
+        return
+
+    print_if_not_json(":counterclockwise_arrows_button: Checking for updates...")
+    if "hash" not in state:
+        # State written by an older version, or missing: compare against the local copy instead
         try:
-            data = read_list("username", config)
-            currentListHash = hash_json(data)
-            response: Optional[Response] = do_sync_request("GET", USERNAME_LIST_URL, config)
-            if response and hasattr(response, "json"):
-                remoteListHash = hash_json(response.json())
-                if currentListHash != remoteListHash:
-                    print_if_not_json(":counterclockwise_arrows_button: Updating...")
-                    download_list(config)
-                else:
-                    print_if_not_json("✔️  Sites List is up to date")
+            state = {**state, "hash": hash_json(read_list("username", config))}
         except Exception as e:
             print_if_not_json(":police_car_light: Coudn't read local list")
             print_if_not_json(":down_arrow: Downloading site list")
             log_error(e, "Coudn't read local list", config)
-            download_list(config)
-    else:
-        print_if_not_json(":globe_with_meridians: Downloading site list")
-        download_list(config)
+            _download_or_report(config, None)
+            return
+    _download_or_report(config, state)
+
+
+def _download_or_report(config, state: Optional[dict]):
+    try:
+        updated = download_list(config, state)
+    except Exception as e:
+        log_error(e, "Coudn't update site list", config)
+        updated = None
+    if updated is None:
+        print_if_not_json(":police_car_light: Coudn't update site list")
+    elif updated and state is not None:
+        print_if_not_json(":counterclockwise_arrows_button: Sites List updated")
+    elif not updated:
+        print_if_not_json("✔️  Sites List is up to date")
@@ -0,0 +1,251 @@
+import os
+import pickle
+import re
+from typing import Optional
+
+from onfire_blackbird.modules.utils.console import print_if_not_json
+from onfire_blackbird.modules.utils.filter import apply_filters
+from onfire_blackbird.modules.utils.hash import hash_file, hash_json
+from onfire_blackbird.modules.utils.log import log_error
+from onfire_blackbird.modules.utils.matcher import compile_pattern
+from onfire_blackbird.modules.whatsmyname.list_operations import read_list
+
+# Bump when SiteSpec or the snapshot layout changes so stale snapshots are rebuilt
+REGISTRY_VERSION = 2
+REGISTRY_SNAPSHOT_FILENAME = "registry.pickle"
+
+
+class SiteSpec:
+    """
+    Compiled site definition.
+
+    Hot fields are kept in slots with the URL/data templates pre-split on ``{account}``,
+    the match strings pre-encoded and the metadata regexes precompiled. The original
+    definition stays reachable through item access, so filters and exports that read
+    arbitrary list properties keep working. ``definition_hash`` changes whenever the site's
+    definition or metadata params do.
+    """
+
+    __slots__ = (
+        "name",
+        "cat",
+        "e_code",
+        "e_string",
+        "m_code",
+        "m_string",
+        "e_patterns",
+        "m_patterns",
+        "metadata",
+        "definition",
+        "definition_hash",
+        "_url_parts",
+        "_data_parts",
+    )
+
+    def __init__(self, definition: dict, metadata: Optional[list] = None):
+        self.definition = definition
+        self.definition_hash = hash_json({"definition": definition, "metadata": metadata})
+        self.name = definition["name"]
+        self.cat = definition["cat"]
+        self.e_code = definition["e_code"]
+        self.e_string = definition["e_string"]
+        self.m_code = definition["m_code"]
+        self.m_string = definition["m_string"]
+        self.e_patterns = compile_pattern(self.e_string)
+        self.m_patterns = compile_pattern(self.m_string)
+        self.metadata = compile_metadata(metadata)
+        self._url_parts = tuple(definition["uri_check"].split("{account}"))
+        data = definition.get("data")
+        self._data_parts = tuple(data.split("{account}")) if data else None
+
+    def url_for(self, account: str) -> str:
+        return account.join(self._url_parts)
+
+    def data_for(self, account: str) -> Optional[str]:
+        return account.join(self._data_parts) if self._data_parts else None
+
+    def __getitem__(self, key):
+        return self.definition[key]
+
+    def __contains__(self, key):
+        return key in self.definition
+
+    def get(self, key, default=None):
+        return self.definition.get(key, default)
+
+
+# Precompile the regexes of HTML metadata params
+def compile_metadata(metadata: Optional[list]) -> Optional[list]:
+    if not metadata:
+        return metadata
+    compiled = []
+    for params in metadata:
+        params = dict(params)
+        if params["schema"] == "HTML":
+            try:
+                params["regex"] = re.compile(params["path"])
+            except re.error:
+                pass
+        compiled.append(params)
+    return compiled
+
+
+def build_username_specs(sites: list, metadata_params: Optional[dict]) -> list:
+    metadata_sites = metadata_params["sites"] if metadata_params and "sites" in metadata_params else {}
+    return [site if isinstance(site, SiteSpec) else SiteSpec(site, metadata_sites.get(site["name"])) for site in sites]
+
+
+def build_email_specs(sites: list) -> list:
+    return [site if isinstance(site, SiteSpec) else SiteSpec(site, site.get("metadata")) for site in sites]
+
+
+class SiteRegistry:
+    """
+    Username and email site specs built once from the WhatsMyName lists.
+
+    The compiled registry is persisted as a snapshot keyed by the hashes of its source
+    files, so later processes load it instead of re-parsing the JSON lists.
+    """
+
+    def __init__(self, username_sites: list, email_sites: list, metadata_params: dict, sources: dict, complete=True):
+        self.username_sites = username_sites
+        self.email_sites = email_sites
+        self.metadata_params = metadata_params
+        self.sources = sources
+        self.complete = complete
+        self._filtered = {}
+
+    @classmethod
+    def build(cls, config, sources: dict) -> "SiteRegistry":
+        username_data = _read_sites_list("username", config)
+        metadata_params = _read_sites_list("metadata", config)
+        email_data = _read_sites_list("email", config)
+        complete = all((username_data, metadata_params, email_data))
+        # Like a list without sites, an unreadable list leaves its kind of search with nothing to check
+        username_sites = username_data["sites"] if username_data else []
+        email_sites = email_data["sites"] if email_data else []
+        metadata_params = metadata_params or {"sites": {}}
+        return cls(
+            username_sites=build_username_specs(username_sites, metadata_params),
+            email_sites=build_email_specs(email_sites),
+            metadata_params=metadata_params,
+            sources=sources,
+            complete=complete,
+        )
+
+    def filtered(self, option: str, config) -> list:
+        """Return the sites left after --filter and --no-nsfw, computed once per filter combination."""
+        key = (option, config.filter, config.no_nsfw)
+        if key not in self._filtered:
+            sites = self.username_sites if option == "username" else self.email_sites
+            self._filtered[key] = apply_filters(sites, config)
+        return self._filtered[key]
+
+    def __getstate__(self):
+        return {
+            "username_sites": self.username_sites,
+            "email_sites": self.email_sites,
+            "metadata_params": self.metadata_params,
+            "sources": self.sources,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.complete = True
+        self._filtered = {}
+
+
+# Read a sites list, None when it is missing, corrupt or not a sites list
+def _read_sites_list(option: str, config) -> Optional[dict]:
+    try:
+        data = read_list(option, config)
+    except Exception as e:
+        data = None
+        log_error(e, "Coudn't read local list", config)
+    if isinstance(data, dict) and isinstance(data.get("sites"), (list, dict)):
+        return data
+    print_if_not_json(f":police_car_light: Coudn't read local {option} list")
+    return None
+
+
+def source_paths(config) -> dict:
+    return {
+        "username": config.username_list_path,
+        "metadata": config.username_metadata_list_path,
+        "email": config.email_list_path,
+    }
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Return source fingerprints, rehashing only files whose mtime or size changed
+def fingerprint_sources(config, previous: Optional[dict] = None) -> dict:
+    sources = {}
+    for option, path in source_paths(config).items():
+        mtime, size = _stat(path)
+        known = previous.get(option) if previous else None
+        if mtime is None:
+            # A missing list is read as such by SiteRegistry.build
+            sources[option] = {"mtime": None, "size": None, "hash": None}
+        elif known and known["mtime"] == mtime and known["size"] == size:
+            sources[option] = known
+        else:
+            sources[option] = {"mtime": mtime, "size": size, "hash": hash_file(path)}
+    return sources
+
+
+def _same_contents(a: dict, b: dict) -> bool:
+    return a.keys() == b.keys() and all(a[option]["hash"] == b[option]["hash"] for option in a)
+
+
+def load_snapshot(path) -> Optional[SiteRegistry]:
+    try:
+        with open(path, "rb") as f:
+            version, registry = pickle.load(f)
+        return registry if version == REGISTRY_VERSION else None
+    except Exception:
+        return None
+
+
+def save_snapshot(path, registry: SiteRegistry, config):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((REGISTRY_VERSION, registry), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log_error(e, "Coudn't save site registry snapshot", config)
+
+
+_registry: Optional[SiteRegistry] = None
+
+
+# Return the site registry, rebuilding it only when a source list changed
+def get_registry(config) -> SiteRegistry:
+    global _registry
+    snapshot_path = config.cache_path / REGISTRY_SNAPSHOT_FILENAME
+
+    registry = _registry if _registry is not None else load_snapshot(snapshot_path)
+    previous = registry.sources if registry is not None else None
+    sources = fingerprint_sources(config, previous)
+
+    if registry is None or not _same_contents(sources, registry.sources):
+        registry = SiteRegistry.build(config, sources)
+        if not registry.complete:
+            # Built from missing or broken lists, read them again next time instead of caching this
+            return registry
+        save_snapshot(snapshot_path, registry, config)
+    elif sources != registry.sources:
+        # Files were touched without changing, remember the new mtimes
+        registry.sources = sources
+        save_snapshot(snapshot_path, registry, config)
+
+    _registry = registry
+    return registry
@@ -1,18 +1,35 @@
+import contextlib
 import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from rich.console import Console
+from pydantic import BaseModel, ConfigDict
 
 from onfire_blackbird.config import config
 from onfire_blackbird.modules.core.email import fetch_results as fetch_email_results
+from onfire_blackbird.modules.core.email import load_email_sites
+from onfire_blackbird.modules.core.scan import (
+    EMAIL,
+    SCAN_BUFFER,
+    USERNAME,
+    ScanTarget,
+    create_engine,
+    print_run_summary,
+    scan_stream,
+    scan_targets,
+)
 from onfire_blackbird.modules.core.username import fetch_results as fetch_username_results
+from onfire_blackbird.modules.core.username import load_username_sites
 from onfire_blackbird.modules.ner.entity_extraction import inialize_nlp_model
 from onfire_blackbird.modules.utils.console import print_if_not_json
-from onfire_blackbird.modules.utils.filter import apply_filters, filter_found_accounts
+from onfire_blackbird.modules.utils.filter import filter_found_accounts
+from onfire_blackbird.modules.utils.http_client import transfer_stats
+from onfire_blackbird.modules.utils.output import create_console
+from onfire_blackbird.modules.utils.profile import clamp_to_file_descriptors
+from onfire_blackbird.modules.utils.session import close_session
 from onfire_blackbird.modules.utils.user_agent import get_random_user_agent
-from onfire_blackbird.modules.whatsmyname.list_operations import check_updates, read_list
+from onfire_blackbird.modules.whatsmyname.list_operations import check_updates
 
 
 async def verify_username_async(username: str, config, sites_to_search=None, metadata_params=None):
@@ -21,20 +38,7 @@ async def verify_username_async(username: str, config, sites_to_search=None, met
     if not hasattr(config, "use_cache"):
         config.use_cache = True
 
-    if sites_to_search is None or metadata_params is None:
-        data = read_list("username", config)
-        if data and isinstance(data, dict):
-            sites_to_search = data["sites"]
-            config.metadata_params = read_list("metadata", config)
-        else:
-            # Handle the case where data is False or not a dict
-            sites_to_search = []
-            config.metadata_params = {}
-    else:
-        config.metadata_params = metadata_params
-
-    # Apply filters once before running queries
-    config.username_sites = apply_filters(sites_to_search, config)
+    load_username_sites(config, sites_to_search, metadata_params)
 
     print_if_not_json(f':play_button: Enumerating accounts with username "[cyan1]{username}[/cyan1]"')
     start_time = time.time()
@@ -61,14 +65,7 @@ async def verify_username_async(username: str, config, sites_to_search=None, met
 
 async def verify_email_async(email: str, config):
     """Async version of verify_email that doesn't use asyncio.run"""
-    data = read_list("email", config)
-    if data and isinstance(data, dict):
-        sites_to_search = data["sites"]
-    else:
-        # Handle the case where data is False or not a dict
-        sites_to_search = []
-
-    config.email_sites = apply_filters(sites_to_search, config)
+    load_email_sites(config)
 
     print_if_not_json(f':play_button: Enumerating accounts with email "[cyan1]{email}[/cyan1]"')
     start_time = time.time()
@@ -94,30 +91,42 @@ async def verify_email_async(email: str, config):
     return found_accounts
 
 
-async def run(
-    usernames: Optional[list[str]] = None,
-    emails: Optional[list[str]] = None,
-    json_output: bool = False,
-    no_nsfw: bool = False,
-    verbose: bool = False,
-    ai: bool = False,
-    timeout: int = 30,
-    max_concurrent_requests: int = 30,
-    no_update: bool = False,
-    dump: bool = False,
-    proxy: Optional[str] = None,
-    filter_param: Optional[str] = None,
-    permute: bool = False,
-    permuteall: bool = False,
-    use_cache: bool = True,
-    instagram_session_id: Optional[str] = None,
-) -> dict:
+# Format the found accounts of a target the way run() returns them
+def format_target_result(target: str, found_accounts: list, date: str) -> dict:
+    result = {
+        "date": date,
+        "target": target,
+        "total_found": len(found_accounts),
+        "accounts": [],
+    }
+
+    for account in found_accounts:
+        account_data = {
+            "name": account["name"],
+            "url": account["url"],
+            "category": account["category"],
+            "status": account["status"],
+        }
+
+        # Add metadata if available
+        if account["metadata"]:
+            metadata = {}
+            for data in account["metadata"]:
+                metadata[data["name"]] = data["value"]
+            account_data["metadata"] = metadata
+
+        result["accounts"].append(account_data)
+
+    return result
+
+
+class ScanOptions(BaseModel):
     """
-    Run Blackbird directly from Python code.
+    Options of a scan started from Python code, shared by run() and scan().
+
+    Unknown options and values of the wrong type are rejected.
 
     Args:
-        usernames: List of usernames to search for
-        emails: List of emails to search for
         json_output: Whether to format output as JSON
         no_nsfw: Removes NSFW sites from the search
         verbose: Show verbose output
@@ -130,18 +139,81 @@ async def run(
         filter_param: Filter sites to be searched by list property value (e.g. "cat=social")
         permute: Permute usernames, ignoring single elements
         permuteall: Permute usernames, all elements
-        use_cache: Use cache for HTTP requests
+        use_cache: Reuse and store site check results in the results cache
         instagram_session_id: Instagram session ID for Instagram-specific data
+        silent: Print nothing, without initializing the console
+        workers: Number of processes the scan is spread over, each with its own concurrency limits
+        adaptive_concurrency: Tune concurrency to latency and errors, starting from max_concurrent_requests
+        concurrency_floor: Lowest concurrency adaptive concurrency may back off to
+        concurrency_ceiling: Highest concurrency adaptive concurrency may grow to
+        site_history: Use per-site latency history for per-site timeouts and slowest-first ordering
+        retries: Retries of a GET request after a timeout, connection error or overload status
+        hedge: Send a duplicate of GET requests that run past the site's usual latency
+        max_requests_per_host: Maximum number of concurrent requests sent to the same host
+        host_rate_limit: Maximum requests per second sent to the same host, 0 for no limit
+        transport: HTTP client used for site checks, "aiohttp" or "http2" (needs httpx[http2])
+        connection_limit: Maximum number of pooled connections shared by all targets
+        connection_limit_per_host: Maximum number of pooled connections per host
+        update_interval: Hours between checks for a new sites list, 0 to check on every run
+        proxies: Proxies to spread HTTP requests over, ejecting the ones that keep failing
+        proxy_strategy: How a proxy is picked for each request, "round-robin" or "least-loaded"
+        proxy_sticky: Send every request to a host through the same proxy
+        cache_ttl: Seconds a found account is reused from the results cache
+        rescan: Keep results in cache/scan_history.sqlite3 and only check sites that changed, errored or are too old
+        rescan_max_age: Hours a stored result is reused by rescan
+    """
+
+    model_config = ConfigDict(extra="forbid")
+
+    json_output: bool = False
+    no_nsfw: bool = False
+    verbose: bool = False
+    ai: bool = False
+    timeout: int = 30
+    max_concurrent_requests: int = 30
+    no_update: bool = False
+    dump: bool = False
+    proxy: Optional[str] = None
+    filter_param: Optional[str] = None
+    permute: bool = False
+    permuteall: bool = False
+    use_cache: bool = True
+    instagram_session_id: Optional[str] = None
+    silent: bool = False
+    workers: int = 1
+    adaptive_concurrency: bool = True
+    concurrency_floor: int = 4
+    concurrency_ceiling: int = 100
+    site_history: bool = True
+    retries: int = 2
+    hedge: bool = False
+    max_requests_per_host: int = 4
+    host_rate_limit: float = 5.0
+    transport: str = "aiohttp"
+    connection_limit: int = 100
+    connection_limit_per_host: int = 8
+    update_interval: float = 24.0
+    proxies: Optional[list] = None
+    proxy_strategy: str = "round-robin"
+    proxy_sticky: bool = False
+    cache_ttl: int = 86400
+    rescan: bool = False
+    rescan_max_age: float = 168.0
+
+
+def configure(usernames: Optional[list[str]], emails: Optional[list[str]], options: ScanOptions) -> list:
+    """
+    Set up the config and targets of a scan started by run() or scan().
 
     Returns:
-        A dictionary containing the results
+        The targets to scan
     """
     # Initialize config with core parameters first
-    config.verbose = verbose
+    config.verbose = options.verbose
 
-    # Initialize console
-    console = Console()
-    config.console = console
+    # Initialize console, never created in silent mode
+    config.silent = options.silent
+    config.console = create_console(config)
 
     # Set user agent (requires verbose and console to be initialized)
     user_agent = get_random_user_agent(config)
@@ -150,19 +222,40 @@ async def run(
     # Now set all other config parameters
     config.username = usernames
     config.email = emails
-    config.json_output = json_output
-    config.no_nsfw = no_nsfw
-    config.ai = ai
-    config.timeout = timeout
-    config.max_concurrent_requests = max_concurrent_requests
-    config.no_update = no_update
-    config.dump = dump
-    config.proxy = proxy
-    config.filter = filter_param
-    config.permute = permute
-    config.permute_all = permuteall
-    config.use_cache = use_cache
-    config.instagram_session_id = instagram_session_id
+    config.json_output = options.json_output
+    config.no_nsfw = options.no_nsfw
+    config.ai = options.ai
+    config.timeout = options.timeout
+    config.max_concurrent_requests = options.max_concurrent_requests
+    config.workers = options.workers
+    config.adaptive_concurrency = options.adaptive_concurrency
+    config.concurrency_floor = options.concurrency_floor
+    config.concurrency_ceiling = options.concurrency_ceiling
+    config.concurrency_limiter = None
+    config.site_history = options.site_history
+    config.retries = options.retries
+    config.hedge = options.hedge
+    config.retry_policy = None
+    config.max_requests_per_host = options.max_requests_per_host
+    config.host_rate_limit = options.host_rate_limit
+    config.transport = options.transport
+    config.connection_limit = options.connection_limit
+    config.connection_limit_per_host = options.connection_limit_per_host
+    config.no_update = options.no_update
+    config.update_interval = options.update_interval
+    config.dump = options.dump
+    config.proxy = options.proxy
+    config.proxies = options.proxies
+    config.proxy_strategy = options.proxy_strategy
+    config.proxy_sticky = options.proxy_sticky
+    config.filter = options.filter_param
+    config.permute = options.permute
+    config.permute_all = options.permuteall
+    config.use_cache = options.use_cache
+    config.cache_ttl = options.cache_ttl
+    config.rescan = options.rescan
+    config.rescan_max_age = options.rescan_max_age
+    config.instagram_session_id = options.instagram_session_id
 
     # Initialize base directory and paths
     config.base_dir = Path(__file__).parent.parent
@@ -180,86 +273,134 @@ async def run(
     config.current_email = None
 
     # Update site lists if needed
-    if not no_update:
+    if not options.no_update:
         check_updates(config)
 
+    # Keep concurrency within the file descriptors the process may open
+    clamp_to_file_descriptors(config)
+
     # Initialize AI model if needed
-    if ai:
+    if options.ai:
         inialize_nlp_model(config)
         config.ai_model = True
 
-    combined_results = {"username_results": [], "email_results": []}
+    transfer_stats.reset()
 
-    # Process usernames
+    targets = []
     if usernames:
-        for username in usernames:
-            config.current_user = username
-            found_accounts = await verify_username_async(username, config)
-            if found_accounts:
-                result = {
-                    "date": date_pretty,
-                    "target": username,
-                    "total_found": len(found_accounts),
-                    "accounts": [],
-                }
-
-                for account in found_accounts:
-                    account_data = {
-                        "name": account["name"],
-                        "url": account["url"],
-                        "category": account["category"],
-                        "status": account["status"],
-                    }
-
-                    # Add metadata if available
-                    if account["metadata"]:
-                        metadata = {}
-                        for data in account["metadata"]:
-                            metadata[data["name"]] = data["value"]
-                        account_data["metadata"] = metadata
-
-                    result["accounts"].append(account_data)
-
-                combined_results["username_results"].append(result)
-
-            # Reset for next username
-            config.current_user = None
-            config.username_found_accounts = None
-
-    # Process emails
+        load_username_sites(config)
+        targets.extend(ScanTarget(USERNAME, username, config.username_sites) for username in usernames)
     if emails:
-        for email in emails:
-            config.current_email = email
-            found_accounts = await verify_email_async(email, config)
-            if found_accounts:
-                result = {
-                    "date": date_pretty,
-                    "target": email,
-                    "total_found": len(found_accounts),
-                    "accounts": [],
-                }
-
-                for account in found_accounts:
-                    account_data = {
-                        "name": account["name"],
-                        "url": account["url"],
-                        "category": account["category"],
-                        "status": account["status"],
-                    }
-
-                    # Add metadata if available
-                    if account["metadata"]:
-                        metadata = {}
-                        for data in account["metadata"]:
-                            metadata[data["name"]] = data["value"]
-                        account_data["metadata"] = metadata
-
-                    result["accounts"].append(account_data)
-
-                combined_results["email_results"].append(result)
-
-            # Reset for next email
-            config.current_email = None
-            config.email_found_accounts = None
+        load_email_sites(config)
+        targets.extend(ScanTarget(EMAIL, email, config.email_sites) for email in emails)
+    return targets
+
+
+async def scan(
+    usernames: Optional[list[str]] = None, emails: Optional[list[str]] = None, *, buffer: int = SCAN_BUFFER, **options
+):
+    """
+    Search for accounts from Python code, yielding each site check as soon as it completes.
+
+    Results are ScanResult tuples of kind, target, site, status, metadata, URL and category,
+    in completion order rather than site order.
+
+    Args:
+        usernames: List of usernames to search for
+        emails: List of emails to search for
+        buffer: Results waiting to be consumed before checks wait for the consumer
+        **options: Options of the scan, the fields of ScanOptions
+
+    Yields:
+        A ScanResult for each site check
+    """
+    targets = configure(usernames, emails, ScanOptions(**options))
+    try:
+        async with contextlib.aclosing(scan_stream(create_engine(config), targets, buffer)) as results:
+            async for result in results:
+                yield result
+    finally:
+        # Release the connections shared by every target of this run
+        await close_session()
+    print_run_summary(config)
+
+
+async def run(
+    usernames: Optional[list[str]] = None,
+    emails: Optional[list[str]] = None,
+    json_output: bool = False,
+    no_nsfw: bool = False,
+    verbose: bool = False,
+    ai: bool = False,
+    timeout: int = 30,
+    max_concurrent_requests: int = 30,
+    no_update: bool = False,
+    dump: bool = False,
+    proxy: Optional[str] = None,
+    filter_param: Optional[str] = None,
+    permute: bool = False,
+    permuteall: bool = False,
+    use_cache: bool = True,
+    instagram_session_id: Optional[str] = None,
+    **options,
+) -> dict:
+    """
+    Run Blackbird directly from Python code.
+
+    Args:
+        usernames: List of usernames to search for
+        emails: List of emails to search for
+        json_output: Whether to format output as JSON
+        no_nsfw: Removes NSFW sites from the search
+        verbose: Show verbose output
+        ai: Extract metadata with AI
+        timeout: Timeout in seconds for each HTTP request
+        max_concurrent_requests: Maximum number of concurrent requests allowed
+        no_update: Don't update sites lists
+        dump: Dump HTML content for found accounts
+        proxy: Proxy to send HTTP requests through
+        filter_param: Filter sites to be searched by list property value (e.g. "cat=social")
+        permute: Permute usernames, ignoring single elements
+        permuteall: Permute usernames, all elements
+        use_cache: Use cache for HTTP requests
+        instagram_session_id: Instagram session ID for Instagram-specific data
+        **options: Further options, keyword only, the other fields of ScanOptions
+
+    Returns:
+        A dictionary containing the results
+    """
+    options = ScanOptions(
+        json_output=json_output,
+        no_nsfw=no_nsfw,
+        verbose=verbose,
+        ai=ai,
+        timeout=timeout,
+        max_concurrent_requests=max_concurrent_requests,
+        no_update=no_update,
+        dump=dump,
+        proxy=proxy,
+        filter_param=filter_param,
+        permute=permute,
+        permuteall=permuteall,
+        use_cache=use_cache,
+        instagram_session_id=instagram_session_id,
+        **options,
+    )
+    targets = configure(usernames, emails, options)
+    try:
+        # Usernames and emails are checked together under one concurrency budget
+        await scan_targets(targets, config)
+    finally:
+        # Release the connections shared by every target of this run
+        await close_session()
+
+    combined_results = {"username_results": [], "email_results": []}
+    for target in targets:
+        found_accounts = target.found_accounts
+        if found_accounts:
+            result = format_target_result(target.value, found_accounts, config.date_pretty)
+            combined_results[f"{target.kind}_results"].append(result)
+
+    print_run_summary(config)
 
     return combined_results
@@ -0,0 +1,67 @@
+import asyncio
+import contextlib
+
+import pytest
+from aiohttp import web
+
+
+class FakeEngine:
+    """
+    Puts results in the queue the way ScanEngine does: one target after the other, each
+    site after its delay, and a completion item after a target's last site when asked to.
+
+    Args:
+        statuses: Status of each site index, FOUND for all by default
+        delays: Seconds each site index takes, none by default
+    """
+
+    def __init__(self, statuses=None, delays=None):
+        self.statuses = statuses
+        self.delays = delays
+        self.results = None
+        self.completions = False
+        self.stopped = False
+        self.published = 0
+
+    def stop(self):
+        self.stopped = True
+
+    async def run(self, targets):
+        async def check(target, index):
+            await asyncio.sleep(self.delays[index] if self.delays else 0)
+            status = self.statuses[index] if self.statuses else "FOUND"
+            result = {"name": f"site{index}", "url": None, "category": "social", "status": status, "metadata": None}
+            await self.results.put((target, index, result))
+            self.published += 1
+
+        for target in targets:
+            target.start()
+            await asyncio.gather(*(check(target, index) for index in range(len(target.sites))))
+            if self.completions:
+                await self.results.put((target, None, None))
+        return targets
+
+
+@pytest.fixture
+def fake_engine():
+    return FakeEngine
+
+
+@pytest.fixture
+def local_server():
+    """Serve aiohttp GET handlers on a free local port, as ``async with local_server(routes) as port``."""
+
+    @contextlib.asynccontextmanager
+    async def serve(routes: dict):
+        app = web.Application()
+        for path, handler in routes.items():
+            app.router.add_get(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        try:
+            yield runner.addresses[0][1]
+        finally:
+            await runner.cleanup()
+
+    return serve
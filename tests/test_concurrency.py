@@ -0,0 +1,40 @@
+import socket
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+from onfire_blackbird.modules.utils.concurrency import OK, TIMEOUT, AdaptiveLimiter
+from onfire_blackbird.modules.utils.http_client import classify_error, record_outcome
+
+
+def test_limiter_grows_on_healthy_responses():
+    limiter = AdaptiveLimiter(initial=4, floor=2, ceiling=6)
+    for _ in range(40):
+        limiter.record(0.1, OK)
+    assert limiter.limit == 6
+    assert limiter.peak == 6
+
+
+def test_limiter_backs_off_once_per_incident():
+    limiter = AdaptiveLimiter(initial=10, floor=2, ceiling=20)
+    for _ in range(5):
+        limiter.record(0.1, TIMEOUT)
+    assert limiter.limit == 7
+    assert limiter.backoffs == 1
+
+
+def test_limiter_ignores_dead_hosts():
+    limiter = AdaptiveLimiter(initial=10, floor=2, ceiling=20)
+    config = SimpleNamespace(concurrency_limiter=limiter)
+    dns_error = aiohttp.ClientConnectorDNSError(None, socket.gaierror(socket.EAI_NONAME, "Name or service not known"))
+    for index in range(20):
+        record_outcome(config, time.monotonic(), classify_error(dns_error), f"dead{index}.example")
+        record_outcome(config, time.monotonic(), classify_error(socket.gaierror()), f"dead{index}.example")
+        # Refused by a host that never answered, e.g. a domain parked without a web server
+        record_outcome(config, time.monotonic(), classify_error(ConnectionRefusedError()), f"parked{index}.example")
+    assert limiter.limit == 10 and limiter.backoffs == 0
+
+    limiter.record(0.1, OK, "live.example")
+    limiter.record(0.1, classify_error(ConnectionResetError()), "live.example")
+    assert limiter.backoffs == 1
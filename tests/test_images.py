@@ -0,0 +1,26 @@
+import io
+
+from PIL import Image
+
+from onfire_blackbird.modules.utils import images
+from onfire_blackbird.modules.utils.images import THUMBNAIL_SIZE, make_thumbnail, stored_image
+
+
+def test_make_thumbnail_downscales_to_report_size():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (400, 400), "red").save(buffer, format="PNG")
+    thumbnail = Image.open(io.BytesIO(make_thumbnail(buffer.getvalue())))
+    assert thumbnail.format == "JPEG"
+    assert thumbnail.size == THUMBNAIL_SIZE
+
+
+def test_make_thumbnail_rejects_non_images():
+    assert make_thumbnail(b"<html>not an image</html>") is None
+
+
+def test_stored_image_without_pillow_keeps_the_type(monkeypatch):
+    monkeypatch.setattr(images, "Image", None)
+    assert stored_image(b"png bytes", "image/png") == (b"png bytes", "png")
+    assert stored_image(b"jpeg bytes", "image/jpeg; charset=binary") == (b"jpeg bytes", "jpg")
+    assert stored_image(b"<html>error</html>", "text/html") is None
+    assert stored_image(b"unknown", None) is None
@@ -0,0 +1,28 @@
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.utils.ledger import MIN_SITE_TIMEOUT, SiteLedger
+
+
+def test_ledger_round_trip(tmp_path):
+    ledger = SiteLedger(tmp_path / "site_stats.json")
+    ledger.record("username/Site", 0.5, 100)
+    ledger.record_error("username/Site", timed_out=True)
+    ledger.save(Config())
+
+    loaded = SiteLedger.load(tmp_path / "site_stats.json")
+    assert loaded.sites["username/Site"]["latencies"] == [0.5]
+    assert loaded.error_rate("username/Site") == 0.5
+
+
+def test_ledger_timeouts_and_longest_first(tmp_path):
+    config = Config(timeout=30, timeout_multiplier=4)
+    ledger = SiteLedger(tmp_path / "site_stats.json")
+    for _ in range(3):
+        ledger.record("fast", 0.1, 0)
+        ledger.record("slow", 5.0, 0)
+        ledger.record("stuck", 25.0, 0)
+
+    assert ledger.timeout_for("fast", config) == MIN_SITE_TIMEOUT
+    assert ledger.timeout_for("slow", config) == 20.0
+    assert ledger.timeout_for("stuck", config) == 30
+    assert ledger.timeout_for("unknown", config) == 30
+    assert ledger.longest_first(["fast", "unknown", "stuck", "slow"]) == [2, 1, 3, 0]
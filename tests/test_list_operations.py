@@ -0,0 +1,52 @@
+import json
+
+from rich.console import Console
+
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.whatsmyname import list_operations
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_check_updates_conditional_and_interval(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    config = Config(base_dir=tmp_path, console=Console(quiet=True), update_interval=0)
+    sent = []
+    responses = [
+        FakeResponse(200, {"sites": [1]}, {"ETag": '"v1"'}),
+        FakeResponse(304),
+        FakeResponse(200, {"sites": [1, 2]}, {"ETag": '"v2"'}),
+    ]
+
+    def fake_request(method, url, config, customHeaders=None):
+        sent.append(customHeaders)
+        return responses.pop(0)
+
+    monkeypatch.setattr(list_operations, "do_sync_request", fake_request)
+
+    list_operations.check_updates(config)
+    assert sent[0] == {}
+    assert json.loads(config.username_list_path.read_text()) == {"sites": [1]}
+
+    # The second check revalidates with the stored ETag and keeps the list on 304
+    list_operations.check_updates(config)
+    assert sent[1] == {"If-None-Match": '"v1"'}
+    assert json.loads(config.username_list_path.read_text()) == {"sites": [1]}
+
+    list_operations.check_updates(config)
+    assert json.loads(config.username_list_path.read_text()) == {"sites": [1, 2]}
+    assert list_operations.read_update_state(config)["etag"] == '"v2"'
+
+    # Within the interval no request is sent at all
+    config.update_interval = 24
+    list_operations.check_updates(config)
+    assert len(sent) == 3
+    assert not list(tmp_path.glob("data/*.tmp"))
@@ -0,0 +1,36 @@
+import json
+import logging
+import time
+
+from onfire_blackbird.modules.utils.log import DuplicateFilter, JsonLinesFormatter
+
+
+def make_record(message="Error in Async HTTP Request", **fields):
+    record = logging.LogRecord("root", logging.ERROR, __file__, 1, message, None, None)
+    for name, value in fields.items():
+        setattr(record, name, value)
+    return record
+
+
+def test_json_lines_formatter_writes_structured_fields():
+    record = make_record(site="username/GitHub", url="https://github.com/x", error_class="TimeoutError", latency=1.5)
+    entry = json.loads(JsonLinesFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert entry["site"] == "username/GitHub"
+    assert entry["url"] == "https://github.com/x"
+    assert entry["error_class"] == "TimeoutError"
+    assert entry["latency"] == 1.5
+    assert "suppressed" not in entry
+
+
+def test_duplicate_filter_drops_repeated_errors_and_counts_them():
+    duplicates = DuplicateFilter(window=0.05, burst=2)
+    passed = [duplicates.filter(make_record(site="a", error_class="TimeoutError")) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Other sites are counted separately
+    assert duplicates.filter(make_record(site="b", error_class="TimeoutError"))
+
+    time.sleep(0.06)
+    record = make_record(site="a", error_class="TimeoutError")
+    assert duplicates.filter(record)
+    assert record.suppressed == 3
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+from onfire_blackbird.modules.utils.http_client import read_body
+from onfire_blackbird.modules.utils.matcher import FOUND, INCONCLUSIVE, NOT_FOUND, SiteMatcher
+
+site = {"e_code": 200, "e_string": "profile of", "m_code": 404, "m_string": "not found"}
+
+
+def test_matcher_found_across_chunks():
+    matcher = SiteMatcher(site)
+    body = bytearray()
+    assert matcher.start(200)
+    body.extend(b"<html>prof")
+    assert matcher.feed(body)
+    body.extend(b"ile of p1ngul1n0</html>")
+    assert matcher.feed(body)
+    assert matcher.finish() == FOUND
+
+
+def test_matcher_settles_on_missing_string():
+    matcher = SiteMatcher(site)
+    assert matcher.start(200)
+    assert not matcher.feed(bytearray(b"<h1>User not found</h1>"))
+    assert matcher.settled
+    assert matcher.finish() == NOT_FOUND
+
+
+def test_matcher_settles_on_status_code():
+    matcher = SiteMatcher(site)
+    assert not matcher.start(404)
+    assert matcher.finish() == NOT_FOUND
+
+
+def test_matcher_strict_codes():
+    same_codes = dict(site, m_code=200)
+    assert SiteMatcher(same_codes).start(200)
+    assert not SiteMatcher(same_codes, strict_codes=True).start(200)
+
+
+def test_matcher_uses_declared_charset():
+    cyrillic = dict(site, e_string="Профиль", m_string="не найден")
+    matcher = SiteMatcher(cyrillic)
+    assert matcher.start(200, "windows-1251")
+    matcher.feed(bytearray("<h1>Профиль</h1>".encode("cp1251")))
+    assert matcher.finish() == FOUND
+
+    matcher = SiteMatcher(cyrillic)
+    assert matcher.start(200)
+    assert not matcher.feed(bytearray("Пользователь не найден".encode("utf-8")))
+
+
+class ChunkedResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.status = 200
+        self.headers = {}
+        self.content_length = None
+
+    async def iter_chunks(self, size):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def abort(self):
+        pass
+
+
+def test_read_body_capped_before_the_verdict_settled_is_inconclusive():
+    config = SimpleNamespace(stream_responses=True)
+    matcher = SiteMatcher(site)
+    response = ChunkedResponse([b"profile of john", b" " * 20, b"not found"])
+    body, truncated = asyncio.run(read_body(response, matcher, None, 30, config))
+    assert truncated and len(body) == 30
+    assert matcher.verdict == INCONCLUSIVE
+
+    # A body of exactly the cap was read whole
+    matcher = SiteMatcher(site)
+    body, truncated = asyncio.run(read_body(ChunkedResponse([b"profile of john"]), matcher, None, 15, config))
+    assert not truncated and matcher.verdict == FOUND
@@ -0,0 +1,59 @@
+import asyncio
+import io
+import json
+from types import SimpleNamespace
+
+from onfire_blackbird.modules.core.scan import USERNAME, ScanTarget
+from onfire_blackbird.modules.export.ndjson_output import NdjsonWriter, stream_ndjson
+
+
+class ClosedPipe(io.StringIO):
+    def write(self, text):
+        raise BrokenPipeError
+
+
+def test_ndjson_writer_flushes_in_batches():
+    stream = io.StringIO()
+    writer = NdjsonWriter(stream, batch=3, interval=60)
+    writer.write({"n": 1})
+    writer.write({"n": 2})
+    assert stream.getvalue() == ""
+    writer.write({"n": 3})
+    assert [json.loads(line)["n"] for line in stream.getvalue().splitlines()] == [1, 2, 3]
+
+    closed = NdjsonWriter(ClosedPipe(), batch=1)
+    closed.write({"n": 1})
+    assert closed.closed
+
+
+def test_stream_ndjson_writes_found_accounts_then_the_target(fake_engine):
+    stream = io.StringIO()
+    targets = [ScanTarget(USERNAME, "john", [None] * 3), ScanTarget(USERNAME, "jane", [None] * 3)]
+    config = SimpleNamespace(verbose=False, date_pretty="today")
+    asyncio.run(stream_ndjson(fake_engine(statuses=["FOUND", "NOT-FOUND", "FOUND"]), targets, config, stream))
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(entry["type"], entry["target"]) for entry in entries] == [
+        ("result", "john"),
+        ("result", "john"),
+        ("target", "john"),
+        ("result", "jane"),
+        ("result", "jane"),
+        ("target", "jane"),
+    ]
+    assert entries[2]["total_found"] == 2 and entries[2]["sites"] == 3
+
+
+def test_stream_ndjson_writes_targets_without_sites(fake_engine):
+    stream = io.StringIO()
+    targets = [ScanTarget(USERNAME, "john", []), ScanTarget(USERNAME, "jane", [None])]
+    config = SimpleNamespace(verbose=False, date_pretty="today")
+    asyncio.run(stream_ndjson(fake_engine(), targets, config, stream))
+
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(entry["type"], entry["target"]) for entry in entries] == [
+        ("target", "john"),
+        ("result", "jane"),
+        ("target", "jane"),
+    ]
+    assert entries[0]["sites"] == 0 and entries[0]["total_found"] == 0
@@ -0,0 +1,19 @@
+import io
+
+from rich.console import Console
+
+from onfire_blackbird.modules.utils.output import ConsoleOutput
+
+
+def test_console_output_renders_queued_lines_in_order():
+    stream = io.StringIO()
+    output = ConsoleOutput(Console(file=stream, width=120), total=3)
+    output.start()
+    for index in range(100):
+        output.print(f"line {index}")
+    for status in ("FOUND", "NOT-FOUND", "ERROR"):
+        output.advance(status)
+    output.stop()
+
+    assert stream.getvalue().splitlines() == [f"line {index}" for index in range(100)]
+    assert (output.done, output.found, output.errors) == (3, 1, 1)
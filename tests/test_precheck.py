@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.utils import precheck
+from onfire_blackbird.modules.utils.precheck import PreCheckCache, acquire_cookie
+
+
+def test_pre_check_cache_single_flight_and_ttl():
+    calls = []
+
+    async def acquire():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return f"token{len(calls)}"
+
+    async def scenario():
+        cache = PreCheckCache()
+        values = await asyncio.gather(*(cache.get("site", acquire, ttl=60) for _ in range(20)))
+        assert values == ["token1"] * 20
+        assert await cache.get("site", acquire, ttl=60) == "token1"
+
+        # Once expired the next check acquires a fresh value
+        await asyncio.sleep(0.02)
+        assert await cache.get("expiring", acquire, ttl=0) == "token2"
+        assert await cache.get("expiring", acquire, ttl=0) == "token3"
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+
+
+def test_acquire_cookie_verbose_without_console(monkeypatch):
+    async def fake_request(*args, **kwargs):
+        return SimpleNamespace(cookies={"session": "abc"})
+
+    # --silent never creates the console, --verbose must not print to it
+    monkeypatch.setattr(precheck, "do_async_request", fake_request)
+    monkeypatch.setattr(config, "console", None)
+    monkeypatch.setattr(config, "output", None)
+    monkeypatch.setattr(config, "verbose", True)
+    params = {
+        "method": "GET",
+        "endpoint": "https://example.com/",
+        "data": None,
+        "headers": {},
+        "cookie_name": "session",
+    }
+    assert asyncio.run(acquire_cookie(params, None, config)) == "abc"
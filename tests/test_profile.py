@@ -0,0 +1,28 @@
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.utils.profile import (
+    FAST,
+    POLITE,
+    RESERVED_FILE_DESCRIPTORS,
+    apply_profile,
+    clamp_to_file_descriptors,
+)
+
+
+def test_apply_profile_keeps_explicit_settings():
+    config = Config(timeout=60)
+    apply_profile(config, POLITE, explicit={"timeout"})
+    assert config.timeout == 60
+    assert config.max_requests_per_host == 1
+
+    apply_profile(config, FAST)
+    assert config.timeout == 15 and config.hedge
+
+
+def test_concurrency_clamped_to_file_descriptors():
+    config = Config(max_concurrent_requests=500, concurrency_ceiling=1000, connection_limit=1000)
+    clamp_to_file_descriptors(config, limit=RESERVED_FILE_DESCRIPTORS + 200)
+    assert config.max_concurrent_requests == config.concurrency_ceiling == config.connection_limit == 200
+
+    pooled = Config(proxies=["http://a:1", "http://b:1"], proxy_concurrency=500)
+    clamp_to_file_descriptors(pooled, limit=RESERVED_FILE_DESCRIPTORS + 200)
+    assert pooled.proxy_concurrency == 100
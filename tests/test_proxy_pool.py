@@ -0,0 +1,72 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+from onfire_blackbird.modules.utils.proxy_pool import LEAST_LOADED, ProxyPool, ProxyPoolTransport
+from onfire_blackbird.modules.utils.transport import ProxyError, RequestTimeout
+
+PROXIES = ["http://a:8080", "http://b:8080", "http://c:8080"]
+
+
+def test_proxy_pool_ejects_and_probes_failing_proxies():
+    pool = ProxyPool(PROXIES, eject_after=2, eject_seconds=60)
+    assert [pool.pick().url for _ in range(4)] == PROXIES + PROXIES[:1]
+
+    a = pool.endpoints[0]
+    pool.failed(a)
+    pool.failed(a)
+    assert {pool.pick().url for _ in range(6)} == set(PROXIES[1:])
+
+    # Once the ejection ran out a single request probes the proxy
+    a.ejected_until = 0
+    picked = [pool.pick().url for _ in range(6)]
+    assert picked.count(a.url) == 1 and a.probing
+
+    # A failed probe ejects it for twice as long, a successful one brings it back
+    pool.failed(a)
+    assert a.ejections == 2 and a.url not in {pool.pick().url for _ in range(6)}
+    a.ejected_until = 0
+    while pool.pick() is not a:
+        pass
+    pool.succeeded(a)
+    assert a.ejections == 0 and a.healthy(0)
+
+
+def test_proxy_pool_least_loaded_and_sticky():
+    pool = ProxyPool(PROXIES, strategy=LEAST_LOADED, concurrency=2)
+    pool.endpoints[0].in_flight = 2
+    pool.endpoints[1].in_flight = 1
+    assert pool.pick().url == PROXIES[2]
+
+    sticky = ProxyPool(PROXIES, sticky=True)
+    first = sticky.pick("example.com")
+    assert all(sticky.pick("example.com") is first for _ in range(5))
+    assert sticky.pick("example.org") is not first
+
+
+def test_proxy_pool_transport_counts_only_proxy_failures():
+    class FakeTransport:
+        name = "fake"
+
+        def __init__(self, error):
+            self.error = error
+
+        async def send(self, method, url, headers, data, timeout, proxy=None):
+            raise self.error
+
+    async def scenario():
+        errors = [asyncio.TimeoutError(), ConnectionResetError(), ProxyError("refused")]
+        errors.append(aiohttp.ClientHttpProxyError(None, (), status=407))
+        pool = ProxyPool(PROXIES[:1], eject_after=2)
+        transport = ProxyPoolTransport(pool, lambda url: FakeTransport(None))
+        endpoint = pool.endpoints[0]
+        for error in errors:
+            transport._transports[endpoint.url].error = error
+            with pytest.raises(type(error)):
+                await transport.send("GET", "https://example.com/", {}, None, RequestTimeout(5))
+            assert endpoint.in_flight == 0
+        # Only the 407 from the proxy and the HTTP/2 proxy error count, which ejects it
+        assert endpoint.errors == 2 and endpoint.ejections == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from onfire_blackbird.config import BASE_DIR, LIST_DIRECTORY, Config
+from onfire_blackbird.modules.whatsmyname import registry
+
+
+@pytest.fixture
+def setup_config(tmp_path):
+    shutil.copytree(Path(BASE_DIR) / LIST_DIRECTORY, tmp_path / LIST_DIRECTORY)
+    registry._registry = None
+    yield Config(base_dir=tmp_path)
+    registry._registry = None
+
+
+def test_registry_snapshot(setup_config):
+    built = registry.get_registry(setup_config)
+    assert (setup_config.cache_path / registry.REGISTRY_SNAPSHOT_FILENAME).exists()
+
+    registry._registry = None
+    loaded = registry.get_registry(setup_config)
+    assert loaded is not built
+    assert [site.name for site in loaded.username_sites] == [site.name for site in built.username_sites]
+    assert loaded.username_sites[0].url_for("p1ngul1n0") == built.username_sites[0].url_for("p1ngul1n0")
+
+
+def test_registry_rebuilds_on_change(setup_config):
+    registry.get_registry(setup_config)
+
+    with open(setup_config.email_list_path, "r", encoding="UTF-8") as f:
+        data = json.load(f)
+    data["sites"] = data["sites"][:1]
+    with open(setup_config.email_list_path, "w", encoding="UTF-8") as f:
+        json.dump(data, f)
+
+    assert len(registry.get_registry(setup_config).email_sites) == 1
+
+
+def test_registry_with_broken_lists(setup_config):
+    with open(setup_config.username_list_path, "w", encoding="UTF-8") as f:
+        f.write('{"sites": [')
+    setup_config.email_list_path.unlink()
+
+    broken = registry.get_registry(setup_config)
+    assert broken.username_sites == [] and broken.email_sites == []
+    assert not (setup_config.cache_path / registry.REGISTRY_SNAPSHOT_FILENAME).exists()
+
+    # Once the lists are readable again the registry is built from them
+    shutil.copy(Path(BASE_DIR) / LIST_DIRECTORY / setup_config.username_list_path.name, setup_config.username_list_path)
+    shutil.copy(Path(BASE_DIR) / LIST_DIRECTORY / setup_config.email_list_path.name, setup_config.email_list_path)
+    assert registry.get_registry(setup_config).username_sites
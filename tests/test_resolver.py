@@ -0,0 +1,22 @@
+import time
+
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.utils.resolver import CachingResolver
+
+
+def test_resolver_cache_persists_answers_but_not_missing_hosts(tmp_path):
+    path = tmp_path / "dns.json"
+    resolver = CachingResolver(path, ttl=60, negative_ttl=60)
+    address = {"hostname": "example.com", "host": "93.184.216.34", "port": 0, "family": 2, "proto": 6, "flags": 4}
+    resolver._answers[("example.com", 0)] = (time.time() + 60, [address])
+    resolver._answers[("stale.com", 0)] = (time.time() - 1, [address])
+    resolver._missing["dead.invalid"] = time.time() + 60
+    resolver._dirty = True
+    resolver.save(Config())
+
+    loaded = CachingResolver.load(path, ttl=60, negative_ttl=60)
+    # A failed lookup isn't trusted beyond the run it happened in
+    assert not loaded.is_missing("dead.invalid")
+    assert loaded.is_cached("example.com")
+    assert not loaded.is_cached("stale.com")
+    assert not loaded.is_missing("example.com")
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.utils.result_cache import ResultCache, result_key
+
+TTLS = {"FOUND": 60, "NOT-FOUND": 60, "ERROR": 0}
+
+
+def result(name, status):
+    return {"name": name, "url": f"https://{name}", "category": "social", "status": status, "metadata": None}
+
+
+def test_result_cache_tiers_and_ttls(tmp_path):
+    config = Config(base_dir=tmp_path)
+    path = tmp_path / "results.sqlite3"
+    cache = ResultCache(path, TTLS, memory_entries=2)
+    key = result_key("username", "a", "GET", "https://a/john")
+    assert key == result_key("username", "a", "GET", "https://a/john")
+    assert key != result_key("email", "a", "GET", "https://a/john")
+
+    cache.put(key, result("a", "FOUND"), config)
+    cache.put("b", result("b", "NOT-FOUND"), config)
+    cache.put("c", result("c", "ERROR"), config)
+    assert cache.get(key, config)["status"] == "FOUND"
+    assert cache.get("c", config) is None
+
+    # Results are copies, changing one doesn't change the cache
+    cache.get(key, config)["status"] = "NONE"
+    assert cache.get(key, config)["status"] == "FOUND"
+
+    # A second process reads the flushed results back from disk
+    cache.flush(config)
+    other = ResultCache(path, TTLS)
+    assert other.get("b", config) == result("b", "NOT-FOUND")
+    assert (other.hits, other.disk_hits, other.misses) == (1, 1, 0)
+
+    # Expired results aren't returned from either tier
+    expiring = ResultCache(path, {"FOUND": 0.05})
+    expiring.put("d", result("d", "FOUND"), config)
+    expiring.flush(config)
+    time.sleep(0.1)
+    assert expiring.get("d", config) is None
+    expiring._memory.clear()
+    assert expiring.get("d", config) is None
+
+
+def test_result_cache_memory_is_bounded(tmp_path):
+    config = Config(base_dir=tmp_path)
+    cache = ResultCache(tmp_path / "results.sqlite3", TTLS, memory_entries=2)
+    for name in "abc":
+        cache.put(name, result(name, "FOUND"), config)
+    assert list(cache._memory) == ["b", "c"]
+    cache.flush(config)
+    assert cache.get("a", config)["name"] == "a"
+    assert cache.disk_hits == 1
+
+
+def test_result_cache_fetch_reads_the_disk_tier(tmp_path):
+    config = Config(base_dir=tmp_path)
+    cache = ResultCache(tmp_path / "results.sqlite3", TTLS)
+    cache.put("a", result("a", "FOUND"), config)
+    cache.flush(config)
+    cache.clear_memory()
+    assert asyncio.run(cache.fetch("a", config))["status"] == "FOUND"
+    assert asyncio.run(cache.fetch("a", config))["status"] == "FOUND"
+    assert asyncio.run(cache.fetch("b", config)) is None
+    assert (cache.hits, cache.disk_hits, cache.misses) == (2, 1, 1)
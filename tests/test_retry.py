@@ -0,0 +1,101 @@
+import asyncio
+import socket
+import time
+
+import aiohttp
+from aiohttp import web
+
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.utils.http_client import do_async_request
+from onfire_blackbird.modules.utils.retry import MIN_LATENCY_SAMPLES, RetryPolicy
+from onfire_blackbird.modules.utils.session import SessionManager
+
+
+def test_retries_only_idempotent_transient_failures():
+    policy = RetryPolicy(attempts=2)
+    assert policy.should_retry("GET", 0)
+    assert policy.should_retry("GET", 1, 503)
+    assert not policy.should_retry("GET", 2)
+    assert not policy.should_retry("POST", 0)
+    assert not policy.should_retry("GET", 0, 404)
+
+
+def test_retry_budget_is_shared_per_run():
+    policy = RetryPolicy(attempts=5, budget=0.0, min_budget=2)
+    assert policy.should_retry("GET", 0)
+    assert policy.should_retry("GET", 0)
+    assert not policy.should_retry("GET", 0)
+    assert policy.retries == 2
+
+
+def test_hedge_threshold_falls_back_to_run_latencies():
+    policy = RetryPolicy(hedge=True, hedge_percentile=50)
+    assert policy.hedge_after("Site") is None
+    for latency in range(MIN_LATENCY_SAMPLES):
+        policy.latencies.record("Other", latency)
+    assert policy.hedge_after("Site") == MIN_LATENCY_SAMPLES // 2
+    assert not policy.can_hedge("POST", "Site")
+
+
+def test_hedge_is_sent_and_can_win(tmp_path, monkeypatch, local_server):
+    calls = []
+
+    async def slow_first(request):
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(1.5)
+        return web.Response(text="profile")
+
+    async def scenario():
+        policy = RetryPolicy(attempts=0, hedge=True, hedge_percentile=50)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            policy.latencies.record("Site", 0.05)
+        monkeypatch.setattr(config, "retry_policy", policy)
+        async with local_server({"/user": slow_first}) as port:
+            transport = SessionManager()._create_transport(config, use_http2=False)
+            try:
+                started = time.monotonic()
+                response = await do_async_request(
+                    "GET", f"http://127.0.0.1:{port}/user", transport, config, site_key="Site"
+                )
+                elapsed = time.monotonic() - started
+            finally:
+                await transport.close()
+        return response, elapsed, policy
+
+    monkeypatch.setattr(config, "base_dir", tmp_path)
+    monkeypatch.setattr(config, "site_ledger", None)
+    monkeypatch.setattr(config, "concurrency_limiter", None)
+    monkeypatch.setattr(config, "user_agent", "test")
+    response, elapsed, policy = asyncio.run(scenario())
+    assert response is not None and response.status_code == 200
+    assert len(calls) == 2
+    assert policy.hedges == 1 and policy.hedges_won == 1
+    assert elapsed < 1
+
+
+def test_permanent_errors_are_not_retried(tmp_path, monkeypatch):
+    class FailingTransport:
+        def __init__(self, error):
+            self.error = error
+            self.sent = 0
+
+        async def send(self, method, url, headers, data, timeout, proxy=None):
+            self.sent += 1
+            raise self.error
+
+    monkeypatch.setattr(config, "base_dir", tmp_path)
+    monkeypatch.setattr(config, "site_ledger", None)
+    monkeypatch.setattr(config, "concurrency_limiter", None)
+    monkeypatch.setattr(config, "user_agent", "test")
+    policy = RetryPolicy(attempts=2, backoff=0)
+    monkeypatch.setattr(config, "retry_policy", policy)
+    for error, retried in (
+        (socket.gaierror(socket.EAI_NONAME, "does not exist (cached)"), False),
+        (aiohttp.InvalidURL("http://"), False),
+        (ConnectionResetError(), True),
+    ):
+        transport = FailingTransport(error)
+        assert asyncio.run(do_async_request("GET", "http://example.com/", transport, config)) is None
+        assert transport.sent == (3 if retried else 1)
+    assert policy.retries == 2
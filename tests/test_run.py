@@ -0,0 +1,42 @@
+import asyncio
+import inspect
+
+import pydantic
+import pytest
+
+from onfire_blackbird import ScanOptions, run
+
+BASELINE_PARAMETERS = [
+    "usernames",
+    "emails",
+    "json_output",
+    "no_nsfw",
+    "verbose",
+    "ai",
+    "timeout",
+    "max_concurrent_requests",
+    "no_update",
+    "dump",
+    "proxy",
+    "filter_param",
+    "permute",
+    "permuteall",
+    "use_cache",
+    "instagram_session_id",
+]
+
+
+def test_run_keeps_its_positional_parameters():
+    parameters = inspect.signature(run).parameters.values()
+    positional = [parameter.name for parameter in parameters if parameter.kind is parameter.POSITIONAL_OR_KEYWORD]
+    assert positional == BASELINE_PARAMETERS
+    # Every parameter of run() is an option, apart from the targets
+    assert set(BASELINE_PARAMETERS[2:]) <= set(ScanOptions.model_fields)
+
+
+def test_unknown_options_are_rejected():
+    with pytest.raises(pydantic.ValidationError):
+        asyncio.run(run(["john"], workerz=2))
+    with pytest.raises(pydantic.ValidationError):
+        ScanOptions(workers="many")
+    assert ScanOptions(workers=2, hedge=True).workers == 2
@@ -0,0 +1,27 @@
+import asyncio
+
+from onfire_blackbird.modules.core.scan import USERNAME, ScanTarget, scan_stream
+
+
+def test_scan_stream_yields_in_completion_order(fake_engine):
+    async def scenario():
+        target = ScanTarget(USERNAME, "john", [None] * 3)
+        results = [result async for result in scan_stream(fake_engine(delays=[0.03, 0.0, 0.01]), [target])]
+        assert [result.site for result in results] == ["site1", "site2", "site0"]
+        assert results[0].target == "john" and results[0].status == "FOUND"
+
+    asyncio.run(scenario())
+
+
+def test_scan_stream_holds_back_and_cancels_when_closed_early(fake_engine):
+    async def scenario():
+        engine = fake_engine()
+        stream = scan_stream(engine, [ScanTarget(USERNAME, "john", [None] * 20)], buffer=2)
+        await stream.__anext__()
+        await asyncio.sleep(0.01)
+        # The consumer fell behind, checks wait once the buffer is full
+        assert engine.published <= 4
+        await stream.aclose()
+        assert engine.stopped
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+from onfire_blackbird.config import Config
+from onfire_blackbird.modules.utils.scan_history import ScanHistory
+from onfire_blackbird.modules.whatsmyname.registry import SiteSpec
+
+
+def site(name, e_string="profile"):
+    return SiteSpec(
+        {
+            "name": name,
+            "cat": "social",
+            "uri_check": f"https://{name}/{{account}}",
+            "e_code": 200,
+            "e_string": e_string,
+            "m_code": 404,
+            "m_string": "missing",
+        }
+    )
+
+
+def result(name, status):
+    return {"name": name, "url": f"https://{name}/john", "category": "social", "status": status, "metadata": None}
+
+
+def test_rescan_reuses_only_current_results(tmp_path):
+    config = Config(base_dir=tmp_path)
+    history = ScanHistory(tmp_path / "history.sqlite3")
+    found, missing, failed = site("found"), site("missing"), site("failed")
+    history.record("username", "john", found, result("found", "FOUND"), config)
+    history.record("username", "john", missing, result("missing", "NOT-FOUND"), config)
+    history.record("username", "john", failed, result("failed", "ERROR"), config)
+    history.flush(config)
+
+    previous = ScanHistory(history.path).previous("username", "john", config)
+    assert history.previous("username", "jane", config) == {}
+    assert history.reusable(previous["found"], found, max_age=3600) == result("found", "FOUND")
+    assert history.reusable(previous["missing"], missing, max_age=3600)["status"] == "NOT-FOUND"
+
+    # Errors, changed definitions and old results are checked again
+    assert history.reusable(previous["failed"], failed, max_age=3600) is None
+    assert history.reusable(previous["found"], site("found", e_string="account"), max_age=3600) is None
+    assert history.reusable(previous["found"], found, max_age=-1) is None
+    assert history.reusable(previous.get("new"), site("new"), max_age=3600) is None
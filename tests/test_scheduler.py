@@ -0,0 +1,52 @@
+import asyncio
+
+from onfire_blackbird.modules.utils.scheduler import HostScheduler, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.try_acquire(now=bucket.updated)
+    assert bucket.try_acquire(now=bucket.updated)
+    assert not bucket.try_acquire(now=bucket.updated)
+    assert bucket.wait_time(now=bucket.updated) == 0.5
+    assert bucket.try_acquire(now=bucket.updated + 0.5)
+
+
+def test_scheduler_limits_in_flight_per_host():
+    async def scenario():
+        scheduler = HostScheduler(rate=0, burst=1, max_in_flight=1)
+        for item in range(2):
+            scheduler.add("a.com", item)
+        scheduler.add("b.com", "b")
+        scheduler.close()
+
+        first = await scheduler.next()
+        second = await scheduler.next()
+        assert {first[0], second[0]} == {"a.com", "b.com"}
+
+        # a.com is still busy, so its second request waits for the slot to be released
+        waiting = asyncio.create_task(scheduler.next())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        scheduler.done("a.com")
+        assert await waiting == ("a.com", 1)
+
+        scheduler.done("a.com")
+        scheduler.done("b.com")
+        assert await scheduler.next() is None
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_prefers_same_host():
+    async def scenario():
+        scheduler = HostScheduler(rate=0, burst=1, max_in_flight=4)
+        for host in ("a.com", "b.com", "a.com", "b.com"):
+            scheduler.add(host, host)
+        scheduler.close()
+
+        host, _ = await scheduler.next()
+        scheduler.done(host)
+        assert (await scheduler.next(prefer=host))[0] == host
+
+    asyncio.run(scenario())
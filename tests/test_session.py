@@ -0,0 +1,38 @@
+import asyncio
+
+from aiohttp import web
+
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.utils.session import SessionManager
+from onfire_blackbird.modules.utils.transport import RequestTimeout
+
+
+def test_shared_session_does_not_carry_cookies_between_requests(tmp_path, local_server):
+    async def set_cookie(request):
+        response = web.Response(text="set")
+        response.set_cookie("session", "target-one")
+        return response
+
+    async def echo_cookie(request):
+        return web.Response(text=request.headers.get("Cookie", ""))
+
+    async def scenario():
+        async with local_server({"/set": set_cookie, "/echo": echo_cookie}) as port:
+            transport = SessionManager()._create_transport(config, use_http2=False)
+            try:
+                for path in ("set", "echo"):
+                    response = await transport.send(
+                        "GET", f"http://localhost:{port}/{path}", {}, None, RequestTimeout(5)
+                    )
+                    body = await response.read()
+                    await response.release()
+                assert body == b""
+            finally:
+                await transport.close()
+
+    base_dir = config.base_dir
+    config.base_dir = tmp_path
+    try:
+        asyncio.run(scenario())
+    finally:
+        config.base_dir = base_dir
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from aiohttp import web
+
+from onfire_blackbird.config import config
+from onfire_blackbird.modules.core.scan import USERNAME, ScanTarget
+from onfire_blackbird.modules.core.username import load_username_sites
+from onfire_blackbird.modules.core.workers import ParallelScanEngine, plan_units
+from onfire_blackbird.modules.utils.ledger import LEDGER_FILENAME
+from onfire_blackbird.modules.utils.resolver import DNS_CACHE_FILENAME
+
+
+def test_plan_units_splits_sites_only_when_targets_are_few():
+    sites = list(range(10))
+    many = [ScanTarget(USERNAME, f"user{index}", sites) for index in range(4)]
+    assert plan_units(many, 4) == [(index, 0, 10) for index in range(4)]
+
+    few = [ScanTarget(USERNAME, "john", sites), ScanTarget(USERNAME, "jane", [])]
+    units = plan_units(few, 4)
+    assert [unit for unit in units if unit[0] == 0] == [(0, 0, 3), (0, 3, 6), (0, 6, 9), (0, 9, 10)]
+    assert (1, 0, 0) in units
+
+
+def test_parallel_scan_merges_worker_state_and_survives_a_dead_worker(tmp_path, monkeypatch, local_server):
+    engine = None
+
+    async def profile(request):
+        if request.match_info["user"] == "victim":
+            # Kill the worker checking this target in the middle of its checks
+            engine._processes[1].kill()
+            await asyncio.sleep(1)
+        return web.Response(text=f"profile of {request.match_info['user']}")
+
+    async def scenario():
+        nonlocal engine
+        async with local_server({"/{site}/{user}": profile}) as port:
+            sites = [
+                {
+                    "name": f"Site{index}",
+                    "uri_check": f"http://localhost:{port}/{index}/{{account}}",
+                    "e_code": 200,
+                    "e_string": "profile of",
+                    "m_code": 404,
+                    "m_string": "missing",
+                    "cat": "social",
+                }
+                for index in range(3)
+            ]
+            (tmp_path / "data").mkdir()
+            (tmp_path / "data" / "wmn-data.json").write_text(json.dumps({"sites": sites}))
+            (tmp_path / "data" / "wmn-metadata.json").write_text(json.dumps({"sites": {}}))
+            (tmp_path / "data" / "email-data.json").write_text(json.dumps({"sites": []}))
+            (tmp_path / "cache").mkdir()
+            seeded = {"requests": 5, "errors": 0, "timeouts": 0, "bytes": 0, "latencies": [0.1] * 5}
+            (tmp_path / "cache" / LEDGER_FILENAME).write_text(
+                json.dumps({"version": 1, "sites": {"username/Site0": seeded, "username/Other": seeded}})
+            )
+
+            load_username_sites(config)
+            targets = [ScanTarget(USERNAME, user, config.username_sites) for user in ("john", "victim", "jane")]
+            engine = ParallelScanEngine(config, 3, announce=False)
+            await engine.run(targets)
+        return targets
+
+    monkeypatch.setattr(config, "base_dir", tmp_path)
+    monkeypatch.setattr(config, "console", None)
+    monkeypatch.setattr(config, "user_agent", "test")
+    monkeypatch.setattr(config, "workers", 3)
+    monkeypatch.setattr(config, "timeout", 10)
+    monkeypatch.setattr(config, "site_history", True)
+    monkeypatch.setattr(config, "use_cache", False)
+    monkeypatch.setattr(config, "rescan", False)
+    monkeypatch.setattr(config, "host_rate_limit", 0)
+    monkeypatch.setattr(config, "site_ledger", None)
+    monkeypatch.setattr(config, "retry_policy", None)
+    monkeypatch.setattr(config, "concurrency_limiter", None)
+    targets = asyncio.run(scenario())
+
+    john, victim, jane = targets
+    assert [result["status"] for result in john.results + jane.results] == ["FOUND"] * 6
+    # The sites of the dead worker are reported as errors
+    assert [result["status"] for result in victim.results] == ["ERROR"] * 3
+
+    # Both surviving workers' requests are on disk, added to what was there before the run
+    sites = json.loads((tmp_path / "cache" / LEDGER_FILENAME).read_text())["sites"]
+    assert sites["username/Site0"]["requests"] == 5 + 2
+    assert sites["username/Site1"]["requests"] == sites["username/Site2"]["requests"] == 2
+    assert sites["username/Other"]["requests"] == 5
+    answers = json.loads((tmp_path / "cache" / DNS_CACHE_FILENAME).read_text())["answers"]
+    assert "localhost" in {answer[0] for answer in answers}